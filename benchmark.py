@@ -0,0 +1,364 @@
+# Autor: Gutierrez Chavero David
+# Descripción:
+# Script de medición de rendimiento. Mide sobre señales sintéticas tipo
+# magnetometría el tiempo y la memoria máxima de cada filtro, del evaluador
+# Monte Carlo y de cada filtro optimizado de extremo a extremo, guarda los
+# resultados en JSON y los compara contra una línea base para detectar
+# regresiones. También compara el filtro de Kalman original, que recorre la
+# señal una vez por candidato, contra el motor vectorizado FiltroKalmanLote, y
+# las búsquedas con evaluación multifidelidad contra la evaluación completa, y
+# verifica que los optimizadores den el mismo resultado con cualquier ejecutor.
+
+import argparse  # Módulo estándar para análisis de argumentos desde la línea de comandos.
+import json      # Resultados en formato legible por máquina.
+import platform  # Versión de Python de la corrida.
+import sys       # Código de salida al detectar regresiones.
+import time      # Medición de tiempos de ejecución.
+import tracemalloc  # Memoria máxima de cada medición.
+
+import numpy as np
+import scipy
+
+from filtro_kalman import FiltroKalman, FiltroKalmanLote, FiltroKalmanEstacionario
+from filtro_kalman import FiltroKalmanOptimizado
+from filtro_mediana import FiltroMediana, FiltroMedianaOptimizado
+from filtro_arima import FiltroARIMA, FiltroARIMAOptimizado
+from genetico import Fidelidad, crear_ejecutor
+from hibrido import FiltroHibrido
+from montecarlo import EvaluadorMonteCarlo
+
+# ------------------------------------------------------------------------------
+# Función: senal_sintetica
+# Descripción:
+#   Genera una señal tipo magnetometría: deriva de caminata aleatoria, picos
+#   aislados (spikes) y ruido blanco gaussiano.
+# Entradas:
+#   - n: número de muestras.
+#   - semilla: semilla del generador aleatorio.
+#   - picos: fracción de muestras con un pico.
+# Salidas:
+#   - Un arreglo numpy (float32) con la señal generada.
+# ------------------------------------------------------------------------------
+def senal_sintetica(n, semilla=0, picos=0.002):
+    rng = np.random.default_rng(semilla)
+    deriva = np.cumsum(rng.normal(0, 0.05, n))
+    ruido = rng.normal(0, 0.5, n)
+    senal = deriva + ruido
+    posiciones = rng.choice(n, size=int(n * picos), replace=False)
+    senal[posiciones] += rng.choice([-1, 1], size=len(posiciones)) * rng.uniform(5, 10, len(posiciones))
+    return senal.astype(np.float32)
+
+# ------------------------------------------------------------------------------
+# Función: benchmark_kalman
+# Descripción:
+#   Filtra la misma población de candidatos (Q, R) con el bucle por candidato y
+#   con el motor en lote, reportando tiempos, aceleración y la diferencia máxima
+#   entre ambas salidas.
+# Entradas:
+#   - n: número de muestras de la señal sintética.
+#   - poblacion: número de candidatos (Q, R) por generación.
+# ------------------------------------------------------------------------------
+def benchmark_kalman(n, poblacion):
+    datos = senal_sintetica(n)
+    rng = np.random.default_rng(1)
+    Q = rng.uniform(1e-5, 1, poblacion)
+    R = rng.uniform(1e-5, 1, poblacion)
+
+    inicio = time.perf_counter()
+    bucle = np.array([FiltroKalman(datos, q, r).aplicar() for q, r in zip(Q, R)])
+    t_bucle = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    lote = FiltroKalmanLote(datos, Q, R).aplicar()
+    t_lote = time.perf_counter() - inicio
+
+    print(f"Kalman: {n} muestras, población {poblacion}")
+    print(f"  Bucle por candidato: {t_bucle:.3f} s")
+    print(f"  Motor en lote:       {t_lote:.3f} s")
+    print(f"  Aceleración:         {t_bucle / t_lote:.1f}x")
+    print(f"  Diferencia máxima:   {np.max(np.abs(bucle - lote)):.3e}")
+
+# ------------------------------------------------------------------------------
+# Función: benchmark_fidelidad
+# Descripción:
+#   Ejecuta cada filtro optimizado con evaluación completa y con evaluación
+#   multifidelidad sobre la misma señal, y reporta tiempos, parámetros
+#   elegidos y la diferencia de puntaje final (ambos puntuados sobre la serie
+#   completa; positiva si la multifidelidad eligió peor).
+# Entradas:
+#   - n: número de muestras de la señal sintética.
+#   - fidelidad: genetico.Fidelidad a comparar.
+#   - max_arima: longitud máxima en la que se incluye ARIMA.
+# ------------------------------------------------------------------------------
+def benchmark_fidelidad(n, fidelidad, max_arima):
+    datos = senal_sintetica(n)
+    evaluador = EvaluadorMonteCarlo(datos)
+    clases = [FiltroKalmanOptimizado, FiltroMedianaOptimizado]
+    if n <= max_arima:
+        clases.append(FiltroARIMAOptimizado)
+
+    print(f"Multifidelidad: {n} muestras, fracciones {list(fidelidad.fracciones)}, "
+          f"sustituto {fidelidad.sustituto}")
+    for clase in clases:
+        filas = []
+        for argumentos in ({}, {"fidelidad": fidelidad}):
+            filtro = clase(datos, semilla=0, **argumentos)
+            inicio = time.perf_counter()
+            salida = filtro.ejecutar()
+            filas.append((time.perf_counter() - inicio, filtro.parametros, evaluador.puntuar(salida)))
+        (t_completa, p_completa, s_completa), (t_fidelidad, p_fidelidad, s_fidelidad) = filas
+        print(f"  {clase.__name__}")
+        print(f"    Completa:       {t_completa:8.2f} s  parámetros {p_completa}  puntaje {s_completa:.6g}")
+        print(f"    Multifidelidad: {t_fidelidad:8.2f} s  parámetros {p_fidelidad}  puntaje {s_fidelidad:.6g}")
+        print(f"    Aceleración {t_completa / t_fidelidad:.1f}x, diferencia de puntaje "
+              f"{s_fidelidad - s_completa:+.3g} ({(s_fidelidad - s_completa) / abs(s_completa):+.2%})")
+
+# ------------------------------------------------------------------------------
+# Función: verificar_ejecutores
+# Descripción:
+#   Ejecuta cada filtro optimizado con la misma semilla en serie, con hilos y
+#   con procesos, y comprueba que los parámetros elegidos y las señales
+#   filtradas sean idénticos.
+# Entradas:
+#   - n: número de muestras de la señal sintética.
+#   - trabajadores: listas de trabajadores a probar con hilos y procesos.
+# Salidas:
+#   - Lista de textos, uno por diferencia encontrada (vacía si todo coincide).
+# ------------------------------------------------------------------------------
+def verificar_ejecutores(n, trabajadores=(2, 3)):
+    datos = senal_sintetica(n)
+    configuraciones = [("serie", 1)] + [(tipo, t) for tipo in ("hilos", "procesos") for t in trabajadores]
+    diferencias = []
+    for clase, argumentos in ((FiltroKalmanOptimizado, {"estacionario": True}),
+                              (FiltroMedianaOptimizado, {}), (FiltroARIMAOptimizado, {})):
+        referencia = None
+        for tipo, t in configuraciones:
+            ejecutor = crear_ejecutor(tipo, t)
+            filtro = clase(datos, ejecutor=ejecutor, semilla=0, **argumentos)
+            try:
+                salida = filtro.ejecutar()
+            finally:
+                if ejecutor is not None:
+                    ejecutor.shutdown()
+            print(f"  {clase.__name__:<26} {tipo:>8} x{t}: parámetros {filtro.parametros}")
+            if referencia is None:
+                referencia = (filtro.parametros, salida)
+                continue
+            desviacion = float(np.max(np.abs(salida - referencia[1])))
+            if filtro.parametros != referencia[0] or desviacion > 0:
+                diferencias.append(f"{clase.__name__} con {tipo} x{t}: {filtro.parametros} "
+                                   f"frente a {referencia[0]} en serie (desviación {desviacion:.3g})")
+    return diferencias
+
+# ------------------------------------------------------------------------------
+# Función: medir
+# Descripción:
+#   Ejecuta una función varias veces y devuelve el menor tiempo de reloj, la
+#   memoria máxima asignada (MB) y el valor que devolvió.
+# Entradas:
+#   - funcion: función sin argumentos.
+#   - repeticiones: número de ejecuciones cronometradas.
+#   - memoria: si es True, mide la memoria con tracemalloc en una ejecución
+#     adicional, aparte de las cronometradas.
+# Notas:
+#   - NumPy informa sus asignaciones a tracemalloc, así que el máximo incluye
+#     los arreglos intermedios.
+# ------------------------------------------------------------------------------
+def medir(funcion, repeticiones=1, memoria=True):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        valor = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return min(tiempos), pico, valor
+
+# ------------------------------------------------------------------------------
+# Función: casos
+# Descripción:
+#   Lista los componentes a medir para una señal de n muestras.
+# Entradas:
+#   - datos: señal sintética.
+#   - max_arima: longitud máxima para ajustar ARIMA (el ajuste por máxima
+#     verosimilitud de series muy largas tarda minutos).
+#   - max_optimizado: longitud máxima para los filtros optimizados.
+# Salidas:
+#   - Lista de tuplas (componente, tipo, función sin argumentos). Los filtros
+#     optimizados devuelven el objeto, para leer después su reporte.
+# ------------------------------------------------------------------------------
+def casos(datos, max_arima, max_optimizado):
+    n = len(datos)
+    rng = np.random.default_rng(1)
+    Q = rng.uniform(1e-5, 1, 30)
+    R = rng.uniform(1e-5, 1, 30)
+    evaluador = EvaluadorMonteCarlo(datos)
+    filtrada = FiltroMediana(datos, 7).aplicar()
+
+    lista = [
+        ("FiltroKalman.aplicar", "filtro", lambda: FiltroKalman(datos, 0.01, 0.1).aplicar()),
+        ("FiltroKalmanLote.aplicar[30]", "filtro", lambda: FiltroKalmanLote(datos, Q, R).aplicar()),
+        ("FiltroKalmanEstacionario.aplicar", "filtro", lambda: FiltroKalmanEstacionario(datos, 0.01, 0.1).aplicar()),
+        ("FiltroMediana.aplicar", "filtro", lambda: FiltroMediana(datos, 7).aplicar()),
+        ("FiltroMediana.aplicar[301]", "filtro", lambda: FiltroMediana(datos, 301).aplicar()),
+        ("EvaluadorMonteCarlo.evaluar", "evaluador", lambda: EvaluadorMonteCarlo.evaluar(datos, filtrada)),
+        ("EvaluadorMonteCarlo.puntuar", "evaluador", lambda: evaluador.puntuar(filtrada)),
+    ]
+    if n <= max_arima:
+        lista.append(("FiltroARIMA.aplicar", "filtro", lambda: FiltroARIMA(datos, 1, 1, 1).aplicar()))
+
+    if n <= max_optimizado:
+        def optimizado(clase, **kwargs):
+            def ejecutar():
+                filtro = clase(datos, semilla=0, **kwargs)
+                filtro.ejecutar()
+                return filtro
+            return ejecutar
+
+        def hibrido():
+            señales = [FiltroKalman(datos, 0.01, 0.1).aplicar(), filtrada,
+                       FiltroKalmanEstacionario(datos, 0.1, 0.5).aplicar()]
+            filtro = FiltroHibrido(señales, semilla=0)
+            filtro.ejecutar()
+            return filtro
+
+        lista += [
+            ("FiltroKalmanOptimizado.ejecutar", "optimizado", optimizado(FiltroKalmanOptimizado)),
+            ("FiltroMedianaOptimizado.ejecutar", "optimizado", optimizado(FiltroMedianaOptimizado)),
+            ("FiltroHibrido.ejecutar", "optimizado", hibrido),
+        ]
+        if n <= max_arima:
+            lista.append(("FiltroARIMAOptimizado.ejecutar", "optimizado", optimizado(FiltroARIMAOptimizado)))
+    return lista
+
+# ------------------------------------------------------------------------------
+# Función: ejecutar_suite
+# Descripción:
+#   Mide todos los componentes para cada tamaño de señal.
+# Entradas:
+#   - tamanos: lista de números de muestras.
+#   - repeticiones: ejecuciones cronometradas de filtros y evaluador (de los
+#     optimizados se cronometra una sola).
+#   - memoria, max_arima, max_optimizado: ver medir y casos.
+# Salidas:
+#   - Diccionario con metadatos de la corrida y la lista "resultados"; cada
+#     resultado tiene componente, tipo, muestras, segundos, pico_memoria_mb y,
+#     en los optimizados, las evaluaciones de fitness completas y parciales.
+# ------------------------------------------------------------------------------
+def ejecutar_suite(tamanos, repeticiones=3, memoria=True, max_arima=100000, max_optimizado=10000):
+    resultados = []
+    for n in tamanos:
+        datos = senal_sintetica(n)
+        for componente, tipo, funcion in casos(datos, max_arima, max_optimizado):
+            veces = repeticiones if tipo != "optimizado" else 1
+            segundos, pico, valor = medir(funcion, veces, memoria)
+            registro = {"componente": componente, "tipo": tipo, "muestras": n,
+                        "segundos": segundos, "pico_memoria_mb": pico}
+
+            reporte = getattr(valor, "reporte", None)
+            if reporte is not None:
+                registro["evaluaciones"] = reporte["evaluaciones"]
+                registro["evaluaciones_parciales"] = reporte["evaluaciones_parciales"]
+
+            resultados.append(registro)
+            memoria_texto = f"{pico:9.1f} MB" if pico is not None else ""
+            print(f"  {componente:<36} {n:>8} muestras {segundos:10.4f} s {memoria_texto}")
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "resultados": resultados,
+    }
+
+# ------------------------------------------------------------------------------
+# Función: comparar
+# Descripción:
+#   Compara una corrida contra una línea base y marca como regresión cada
+#   componente (del mismo tamaño) cuyo tiempo o memoria crece más que la
+#   tolerancia, o que hace más evaluaciones de fitness que antes.
+# Entradas:
+#   - actual, base: diccionarios devueltos por ejecutar_suite.
+#   - tolerancia: aumento relativo permitido (0.2 = 20 %).
+#   - minimo: diferencia absoluta en segundos por debajo de la cual no se
+#     marca regresión de tiempo (evita ruido en mediciones muy cortas).
+# Salidas:
+#   - Lista de textos, uno por regresión detectada.
+# ------------------------------------------------------------------------------
+def comparar(actual, base, tolerancia=0.2, minimo=0.005):
+    referencia = {(r["componente"], r["muestras"]): r for r in base["resultados"]}
+    regresiones = []
+    for r in actual["resultados"]:
+        b = referencia.get((r["componente"], r["muestras"]))
+        if b is None:
+            continue
+        nombre = f"{r['componente']} ({r['muestras']} muestras)"
+
+        if r["segundos"] > b["segundos"] * (1 + tolerancia) and r["segundos"] - b["segundos"] > minimo:
+            regresiones.append(f"{nombre}: tiempo {b['segundos']:.4f} s → {r['segundos']:.4f} s "
+                               f"({r['segundos'] / b['segundos']:.2f}x)")
+        if r.get("pico_memoria_mb") and b.get("pico_memoria_mb") and \
+                r["pico_memoria_mb"] > b["pico_memoria_mb"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: memoria {b['pico_memoria_mb']:.1f} MB → {r['pico_memoria_mb']:.1f} MB")
+        for clave in ("evaluaciones", "evaluaciones_parciales"):
+            if clave in r and clave in b and r[clave] > b[clave]:
+                regresiones.append(f"{nombre}: {clave} {b[clave]} → {r[clave]}")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide el rendimiento de los filtros, el evaluador y los optimizadores.")
+    parser.add_argument("--kalman-lote", action="store_true", help="Solo compara el bucle de Kalman por candidato contra FiltroKalmanLote")
+    parser.add_argument("--muestras", "-n", type=int, default=20000, help="Número de muestras de la señal sintética (con --kalman-lote)")
+    parser.add_argument("--poblacion", "-p", type=int, default=30, help="Candidatos (Q, R) por generación (con --kalman-lote)")
+    parser.add_argument("--ejecutores", action="store_true", help="Solo verifica que los filtros optimizados den el mismo resultado en serie, con hilos y con procesos, sobre --muestras muestras")
+    parser.add_argument("--fidelidad", type=float, nargs="+", metavar="FRACCION", help="Solo compara los filtros optimizados con evaluación completa y multifidelidad con estas fracciones, sobre --muestras muestras")
+    parser.add_argument("--sustituto", choices=list(Fidelidad.SUSTITUTOS), default="ventanas", help="Fitness sustituta con --fidelidad")
+    parser.add_argument("--subventanas", type=int, default=8, help="Subventanas por nivel con --fidelidad y --sustituto ventanas")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="Longitudes de las señales sintéticas de la suite")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Ejecuciones cronometradas de cada filtro y del evaluador (se reporta la menor)")
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir la memoria máxima (evita la ejecución adicional con tracemalloc)")
+    parser.add_argument("--max-arima", type=int, default=100000, help="Longitud máxima en la que se mide ARIMA")
+    parser.add_argument("--max-optimizado", type=int, default=10000, help="Longitud máxima en la que se miden los filtros optimizados")
+    parser.add_argument("--salida", type=str, default="benchmark.json", help="Archivo JSON donde guardar los resultados (benchmark.json, por defecto, está excluido del repositorio)")
+    parser.add_argument("--comparar", type=str, help="Archivo JSON de línea base contra el cual buscar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Aumento relativo permitido antes de marcar una regresión (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.kalman_lote:
+        benchmark_kalman(args.muestras, args.poblacion)
+        sys.exit(0)
+    if args.ejecutores:
+        diferencias = verificar_ejecutores(args.muestras)
+        for texto in diferencias:
+            print(f"  - {texto}")
+        print("Resultados idénticos con todos los ejecutores." if not diferencias else
+              f"{len(diferencias)} diferencias entre ejecutores.")
+        sys.exit(1 if diferencias else 0)
+    if args.fidelidad:
+        benchmark_fidelidad(args.muestras, Fidelidad(args.fidelidad, args.sustituto, args.subventanas),
+                            args.max_arima)
+        sys.exit(0)
+
+    corrida = ejecutar_suite(args.tamanos, args.repeticiones, not args.sin_memoria,
+                             args.max_arima, args.max_optimizado)
+    with open(args.salida, "w") as f:
+        json.dump(corrida, f, indent=2)
+    print(f"Resultados guardados en {args.salida}.")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)
+        regresiones = comparar(corrida, base, args.tolerancia)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones frente a {args.comparar}:")
+            for texto in regresiones:
+                print(f"  - {texto}")
+            sys.exit(1)
+        print(f"\nSin regresiones frente a {args.comparar}.")
@@ -1,15 +1,123 @@
 import numpy as np
 import warnings
 
-from statsmodels.tools.sm_exceptions import ConvergenceWarning
+from statsmodels.tools.sm_exceptions import ConvergenceWarning, EstimationWarning
 from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.statespace.tools import is_invertible
 
-from genetico import AlgoritmoGenetico
-from montecarlo import EvaluadorMonteCarlo
+from genetico import AlgoritmoGenetico, CacheFitness, Presupuesto
+from montecarlo import EvaluadorMonteCarlo, EvaluadorSubventanas
 
 # Ignorar advertencias de convergencia de ARIMA
 warnings.filterwarnings("ignore", category=UserWarning, module="statsmodels")
 warnings.simplefilter("ignore", ConvergenceWarning)
+warnings.simplefilter("ignore", EstimationWarning)
+
+# ------------------------------------------------------------------------------
+# Clase: AjusteARIMA
+# Descripción:
+#   Motor de ajuste de modelos ARIMA que comparte trabajo entre los distintos
+#   órdenes (p, d, q) probados sobre una misma serie.
+#
+# Métodos:
+#   - __init__(datos):
+#       Serie original sobre la que se ajustan todos los órdenes.
+#
+#   - diferenciada(d):
+#       Serie diferenciada d veces; se calcula una sola vez por cada d.
+#
+#   - estimar(p, d, q, longitud=None):
+#       Estimación rápida de Hannan-Rissanen sobre los primeros `longitud` datos:
+#       un AR largo (calculado una vez por d y longitud, y reutilizado para
+#       todos los órdenes p, q) aproxima las innovaciones, y una regresión por mínimos
+#       cuadrados de la serie sobre sus rezagos y los de esas innovaciones da los
+#       coeficientes AR y MA. Devuelve el vector de parámetros en el orden de
+#       statsmodels ([const,] ar..., ma..., sigma2), o None si el resultado no
+#       es estacionario o invertible.
+#
+#   - cribar(p, d, q, longitud=None):
+#       Valores ajustados con los parámetros de estimar(), obtenidos con una sola
+#       pasada del filtro de Kalman del modelo de espacio de estados (sin
+#       optimización). Sirve para descartar órdenes antes del ajuste completo.
+#
+#   - ajustar(p, d, q):
+#       Ajuste por máxima verosimilitud sobre la serie completa, partiendo de
+#       la estimación de Hannan-Rissanen del mismo orden. Los parámetros
+#       ajustados se guardan en self.parametros y un segundo ajuste del mismo
+#       orden solo vuelve a filtrar.
+#
+# Notas:
+#   - Con d = 0 statsmodels incluye una constante (media del proceso); con
+#     d > 0 no hay término de tendencia.
+#   - El punto de partida del ajuste depende solo del orden y de los datos, no
+#     de qué otros órdenes se ajustaron antes en el mismo proceso, así que el
+#     óptimo local es el mismo sin importar cómo un ejecutor reparta los
+#     candidatos entre procesos.
+# ------------------------------------------------------------------------------
+class AjusteARIMA:
+    def __init__(self, datos):
+        self.datos = np.asarray(datos, dtype=float)
+        self.diferenciadas = {}
+        self.innovaciones = {}
+        self.parametros = {}
+
+    def diferenciada(self, d):
+        if d not in self.diferenciadas:
+            self.diferenciadas[d] = np.diff(self.datos, d)
+        return self.diferenciadas[d]
+
+    def _innovaciones(self, d, w):
+        # Primer paso de Hannan-Rissanen: AR largo de orden ~log(n)², una vez por
+        # cada d y longitud de tramo
+        if (d, len(w)) not in self.innovaciones:
+            w = w - w.mean()
+            m = max(1, min(int(np.log(len(w)) ** 2), len(w) // 4))
+            rezagos = np.column_stack([w[m - i:len(w) - i] for i in range(1, m + 1)])
+            coef = np.linalg.lstsq(rezagos, w[m:], rcond=None)[0]
+            e = np.zeros(len(w))
+            e[m:] = w[m:] - rezagos @ coef
+            self.innovaciones[d, len(w)] = (m, e)
+        return self.innovaciones[d, len(w)]
+
+    def estimar(self, p, d, q, longitud=None):
+        w = self.diferenciada(d)[:None if longitud is None else longitud - d]
+        m, e = self._innovaciones(d, w)
+        media = w.mean()
+        w = w - media
+
+        inicio = max(p, m + q)
+        if len(w) - inicio <= p + q:
+            return None
+        columnas = ([w[inicio - i:len(w) - i] for i in range(1, p + 1)] +
+                    [e[inicio - j:len(w) - j] for j in range(1, q + 1)])
+        objetivo = w[inicio:]
+        if columnas:
+            regresores = np.column_stack(columnas)
+            coef = np.linalg.lstsq(regresores, objetivo, rcond=None)[0]
+            residuo = objetivo - regresores @ coef
+        else:
+            coef, residuo = np.empty(0), objetivo
+
+        ar, ma = coef[:p], coef[p:]
+        if not all(len(c) == 0 or is_invertible(np.r_[1, c]) for c in (-ar, ma)):
+            return None
+        constante = [media] if d == 0 else []
+        return np.r_[constante, ar, ma, np.mean(residuo ** 2)]
+
+    def cribar(self, p, d, q, longitud=None):
+        modelo = ARIMA(self.datos[:longitud], order=(p, d, q))
+        params = self.estimar(p, d, q, longitud)
+        if params is None:
+            params = modelo.start_params  # Estimación inicial propia de statsmodels
+        return modelo.filter(params).fittedvalues
+
+    def ajustar(self, p, d, q):
+        modelo = ARIMA(self.datos, order=(p, d, q))
+        if (p, d, q) in self.parametros:
+            return modelo.filter(self.parametros[(p, d, q)]).fittedvalues
+        resultado = modelo.fit(start_params=self.estimar(p, d, q))
+        self.parametros[(p, d, q)] = resultado.params
+        return resultado.fittedvalues
 
 # ------------------------------------------------------------------------------
 # Clase: FiltroARIMA
@@ -20,6 +128,11 @@ warnings.simplefilter("ignore", ConvergenceWarning)
 # Entradas:
 #   - datos: señal original (serie temporal).
 #   - p, d, q: parámetros del modelo ARIMA.
+#   - ajuste: AjusteARIMA opcional sobre los mismos datos, para reutilizar
+#     diferencias, estimaciones y órdenes ya ajustados.
+#   - coeficientes: vector de parámetros opcional en el orden de statsmodels
+#     ([const,] ar..., ma..., sigma2), por ejemplo los de una ejecución
+#     anterior; con él se filtra directamente, sin ajuste.
 # Salidas:
 #   - Método aplicar() devuelve la señal suavizada con el modelo ajustado.
 # Notas:
@@ -29,17 +142,102 @@ warnings.simplefilter("ignore", ConvergenceWarning)
 #   - Se ignoran advertencias de convergencia para evitar ruido en consola.
 # ------------------------------------------------------------------------------
 class FiltroARIMA:
-    def __init__(self, datos, p, d, q):
+    def __init__(self, datos, p, d, q, ajuste=None, coeficientes=None):
         self.datos = datos
         self.p = int(p)
         self.d = int(d)
         self.q = int(q)
+        self.ajuste = ajuste
+        self.coeficientes = coeficientes
 
     def aplicar(self):
+        if self.coeficientes is not None:
+            modelo = ARIMA(np.asarray(self.datos, dtype=float), order=(self.p, self.d, self.q))
+            return modelo.filter(np.asarray(self.coeficientes, dtype=float)).fittedvalues
+        if self.ajuste is not None:
+            return self.ajuste.ajustar(self.p, self.d, self.q)
         modelo = ARIMA(self.datos, order=(self.p, self.d, self.q))
         resultado = modelo.fit()
         return resultado.fittedvalues
 
+# ------------------------------------------------------------------------------
+# Función: discretizar_orden
+# Descripción:
+#   Convierte los parámetros continuos del optimizador en un orden (p, d, q).
+# ------------------------------------------------------------------------------
+def discretizar_orden(params):
+    return tuple(map(int, params))
+
+# ------------------------------------------------------------------------------
+# Clase: FitnessARIMA
+# Descripción:
+#   Función fitness de FiltroARIMAOptimizado definida como clase a nivel de
+#   módulo para que pueda serializarse y evaluarse en otros procesos.
+# Métodos:
+#   - __call__(params): ajusta el orden por máxima verosimilitud sobre la serie
+#     completa y lo evalúa.
+#   - parcial(params, fraccion): evalúa sobre el tramo inicial de la serie con
+#     la estimación rápida de AjusteARIMA.cribar (sin máxima verosimilitud),
+#     para descartar órdenes claramente dominados antes del ajuste completo. El
+#     evaluador de cada longitud de tramo se construye una vez.
+#   - subventanas(params, fraccion, ventanas=8, semilla=0): igual que parcial,
+#     pero promediando sobre subventanas al azar (ver
+#     montecarlo.EvaluadorSubventanas). Cada subventana tiene su propio
+#     AjusteARIMA, compartido por todos los órdenes.
+#   - tramo(fraccion), evaluador_subventanas(fraccion, ventanas, semilla):
+#     longitud del tramo de parcial y subventanas de subventanas.
+# Notas:
+#   - Todas las llamadas comparten un AjusteARIMA, de modo que las diferencias
+#     de la serie y las innovaciones de Hannan-Rissanen se reutilizan.
+# ------------------------------------------------------------------------------
+class FitnessARIMA:
+    version = 1  # Versión de los puntajes en la caché en disco: incrementar al cambiarlos
+    muestras_minimas = 100  # Longitud mínima del tramo en evaluaciones parciales
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.evaluador = EvaluadorMonteCarlo(datos)
+        self.evaluadores_tramo = {}
+        self.subventanas_tramo = {}
+        self.ajustes_tramo = {}
+        self.ajuste = AjusteARIMA(datos)
+
+    def __call__(self, params):
+        p, d, q = discretizar_orden(params)
+        salida = FiltroARIMA(self.datos, p, d, q, ajuste=self.ajuste).aplicar()
+        return self.evaluador.puntuar(salida)
+
+    def tramo(self, fraccion):
+        n = len(self.datos)
+        return max(int(n * fraccion), min(n, self.muestras_minimas))
+
+    def evaluador_subventanas(self, fraccion, ventanas=8, semilla=0):
+        clave = (fraccion, ventanas, semilla)
+        if clave not in self.subventanas_tramo:
+            self.subventanas_tramo[clave] = EvaluadorSubventanas(self.datos, fraccion, ventanas,
+                                                                 self.muestras_minimas, semilla)
+        return self.subventanas_tramo[clave]
+
+    def parcial(self, params, fraccion):
+        m = self.tramo(fraccion)
+        tramo = self.datos[:m]
+        if m not in self.evaluadores_tramo:
+            self.evaluadores_tramo[m] = EvaluadorMonteCarlo(tramo)
+        p, d, q = discretizar_orden(params)
+        salida = self.ajuste.cribar(p, d, q, longitud=m)
+        return self.evaluadores_tramo[m].puntuar(salida)
+
+    def subventanas(self, params, fraccion, ventanas=8, semilla=0):
+        evaluador = self.evaluador_subventanas(fraccion, ventanas, semilla)
+        p, d, q = discretizar_orden(params)
+
+        def puntuar(a, b, evaluador):
+            if (a, b) not in self.ajustes_tramo:
+                self.ajustes_tramo[a, b] = AjusteARIMA(self.datos[a:b])
+            return evaluador.puntuar(self.ajustes_tramo[a, b].cribar(p, d, q))
+
+        return evaluador.promediar(puntuar)
+
 # ------------------------------------------------------------------------------
 # Clase: FiltroARIMAOptimizado
 # Descripción:
@@ -47,23 +245,84 @@ class FiltroARIMA:
 #   algoritmo genético y evaluación basada en simulaciones Monte Carlo.
 # Entradas:
 #   - datos: señal original (serie temporal).
+#   - ruta_cache: directorio opcional para persistir las evaluaciones de fitness.
+#   - cache_solo_lectura: si es True, el respaldo en ruta_cache solo se consulta
+#     (ver genetico.CacheFitness); para cuando varios procesos comparten la ruta.
+#   - ejecutor: ejecutor opcional (ver genetico.crear_ejecutor) para ajustar los
+#     candidatos en paralelo.
+#   - semilla: semilla del optimizador.
+#   - inicial: orden (p, d, q) opcional alrededor del cual buscar (±1 en cada
+#     componente), por ejemplo el óptimo de un segmento anterior.
+#   - presupuesto: genetico.Presupuesto opcional (en rejilla solo cuenta el
+#     límite de tiempo); por defecto, presupuesto_defecto, sin límites.
+#   - fidelidad: genetico.Fidelidad opcional con las fracciones y el sustituto
+#     (tramos iniciales o subventanas) de las rondas de cribado.
 # Salidas:
 #   - Método ejecutar() devuelve la señal suavizada con parámetros óptimos.
+#   - Atributo parametros: orden (p, d, q) óptimo.
+#   - Atributo coeficientes: parámetros ajustados de ese orden (ver el
+#     argumento coeficientes de FiltroARIMA).
+#   - Atributo cache: CacheFitness usada en la búsqueda (aciertos/fallos).
+#   - Atributo reporte: evaluaciones realizadas y ahorradas por el optimizador;
+#     "cache" tiene los aciertos y fallos de la caché (CacheFitness.estadisticas).
+#     Cada etapa de cribado incluye además "segundos_mle_estimados" (lo que
+#     habría costado ajustar sus candidatos por máxima verosimilitud, estimado
+#     con el tiempo medio de la etapa final escalado por la fracción) y
+#     "ahorro_segundos".
 # Notas:
 #   - Esta clase automatiza el uso de ARIMA sin intervención manual,
 #     como parte del enfoque híbrido.
 #   - Utiliza un optimizador evolutivo (genético) y validación estocástica.
+#   - Los 90 órdenes (p, d, q) enteros se recorren como rejilla con reducción
+#     sucesiva: se evalúan sobre tramos iniciales cada vez más largos y solo los
+#     mejores llegan al ajuste sobre la serie completa. Las rondas de cribado
+#     usan la estimación de Hannan-Rissanen; solo los finalistas se ajustan por
+#     máxima verosimilitud, partiendo de su estimación de Hannan-Rissanen.
+#   - Con ruta_cache, las ejecuciones repetidas sobre el mismo CSV no vuelven a
+#     ajustar los modelos durante la búsqueda.
 # ------------------------------------------------------------------------------
 class FiltroARIMAOptimizado:
-    def __init__(self, datos):
+    presupuesto_defecto = Presupuesto()
+
+    def __init__(self, datos, ruta_cache=None, ejecutor=None, semilla=None, inicial=None,
+                 presupuesto=None, fidelidad=None, cache_solo_lectura=False):
         self.datos = datos
+        self.ruta_cache = ruta_cache
+        self.cache_solo_lectura = cache_solo_lectura
+        self.ejecutor = ejecutor
+        self.semilla = semilla
+        self.inicial = inicial
+        self.presupuesto = presupuesto if presupuesto is not None else self.presupuesto_defecto
+        self.fidelidad = fidelidad
+        self.cache = None
+        self.reporte = None
+        self.parametros = None
+        self.coeficientes = None
 
     def ejecutar(self):
-        def fitness(params):
-            p, d, q = map(int, params)
-            salida = FiltroARIMA(self.datos, p, d, q).aplicar()
-            return EvaluadorMonteCarlo.evaluar(self.datos, salida)
-
-        genetico = AlgoritmoGenetico(bounds=[(1, 5), (0, 2), (0, 5)])
-        p_opt, d_opt, q_opt = genetico.optimizar(fitness)
-        return FiltroARIMA(self.datos, p_opt, d_opt, q_opt).aplicar()
+        fitness = FitnessARIMA(self.datos)
+        self.cache = CacheFitness(self.datos, discretizar_orden, "arima", ruta=self.ruta_cache,
+                                  version=FitnessARIMA.version, solo_lectura=self.cache_solo_lectura)
+        genetico = AlgoritmoGenetico(bounds=[(1, 5), (0, 2), (0, 5)], cache=self.cache,
+                                     discretizar=discretizar_orden,
+                                     ejecutor=self.ejecutor, semilla=self.semilla,
+                                     inicial=self.inicial, presupuesto=self.presupuesto,
+                                     fidelidad=self.fidelidad)
+        parcial = fitness.parcial if self.fidelidad is None else self.fidelidad.parcial(fitness)
+        try:
+            p_opt, d_opt, q_opt = genetico.optimizar(fitness, fitness_parcial=parcial)
+        finally:
+            self.cache.cerrar()
+        self.reporte = {**genetico.reporte, "cache": self.cache.estadisticas()}
+        self.parametros = discretizar_orden((p_opt, d_opt, q_opt))
+
+        # Tiempo ahorrado por cada etapa de cribado frente al ajuste completo
+        final = self.reporte["etapas"][-1]
+        por_ajuste = final["segundos"] / max(1, final["candidatos"])
+        for etapa in self.reporte["etapas"][:-1]:
+            etapa["segundos_mle_estimados"] = etapa["candidatos"] * etapa["fraccion"] * por_ajuste
+            etapa["ahorro_segundos"] = etapa["segundos_mle_estimados"] - etapa["segundos"]
+
+        senal = FiltroARIMA(self.datos, p_opt, d_opt, q_opt, ajuste=fitness.ajuste).aplicar()
+        self.coeficientes = [float(c) for c in fitness.ajuste.parametros[self.parametros]]
+        return senal
@@ -1,7 +1,10 @@
 import numpy as np
 
-from genetico import AlgoritmoGenetico
-from montecarlo import EvaluadorMonteCarlo
+from scipy.linalg import solve_discrete_are
+from scipy.signal import lfilter, lfiltic, ss2tf
+
+from genetico import AlgoritmoGenetico, Presupuesto
+from montecarlo import EvaluadorMonteCarlo, EvaluadorSubventanas
 
 # ------------------------------------------------------------------------------
 # Clase: FiltroKalman
@@ -14,17 +17,62 @@ from montecarlo import EvaluadorMonteCarlo
 #   - R: varianza de la observación (ruido de medición).
 # Salidas:
 #   - Método aplicar() devuelve la señal suavizada (posición estimada).
+#   - Métodos actualizar(muestra) y actualizar_bloque(bloque) filtran en flujo:
+#     conservan el estado entre llamadas y devuelven la posición estimada de
+#     cada muestra recibida, sin retardo (latencia 0).
+#   - Método finalizar() existe por simetría con los demás filtros en flujo y
+#     devuelve un arreglo vacío.
 # Notas:
 #   - Esta implementación sigue el modelo clásico de Kalman para sistemas lineales,
 #     discretos y con ruido gaussiano blanco.
 #   - Código escrito por Gutierrez Chavero David con base en formulaciones estándar
 #     de la literatura.
+#   - Para el modo en flujo, datos puede ser None; el estado se inicializa con la
+#     primera muestra recibida, igual que aplicar().
 # ------------------------------------------------------------------------------
 class FiltroKalman:
+    latencia = 0
+
     def __init__(self, datos, Q, R):
         self.datos = datos
         self.Q = Q * np.eye(2)  # 2x2 covariance
         self.R = R
+        self.estado = None  # (x0, x1, p00, p01, p11) del modo en flujo
+
+    def actualizar(self, muestra):
+        return self.actualizar_bloque([muestra])[0]
+
+    def actualizar_bloque(self, bloque):
+        q, r = float(self.Q[0, 0]), float(self.R)
+        if self.estado is None:
+            self.estado = (float(bloque[0]), 0.0, 1.0, 0.0, 1.0)
+        x0, x1, p00, p01, p11 = self.estado
+
+        # Mismas expresiones escalares cerradas que FiltroKalmanLote
+        salida = np.empty(len(bloque))
+        for i, z in enumerate(bloque):
+            x0 = x0 + x1
+            pp00 = p00 + 2.0 * p01 + p11 + q
+            pp01 = p01 + p11
+            pp11 = p11 + q
+
+            S = pp00 + r
+            k0 = pp00 / S
+            k1 = pp01 / S
+            y = float(z) - x0
+
+            x0 = x0 + k0 * y
+            x1 = x1 + k1 * y
+            p00 = (1.0 - k0) * pp00
+            p01 = (1.0 - k0) * pp01
+            p11 = pp11 - k1 * pp01
+            salida[i] = x0
+
+        self.estado = (x0, x1, p00, p01, p11)
+        return salida
+
+    def finalizar(self):
+        return np.empty(0)
 
     def aplicar(self):
         n = len(self.datos)
@@ -54,6 +102,247 @@ class FiltroKalman:
 
         return np.array(resultados)
 
+# ------------------------------------------------------------------------------
+# Clase: FiltroKalmanLote
+# Descripción:
+#   Motor vectorizado del filtro de Kalman que procesa una población completa de
+#   pares (Q, R) en una sola pasada sobre la señal. Cada candidato evoluciona de
+#   forma independiente; el estado y la covarianza se guardan como arreglos de
+#   forma (población,).
+# Entradas:
+#   - datos: señal original a filtrar.
+#   - Q: escalar o arreglo con las covarianzas del proceso de cada candidato.
+#   - R: escalar o arreglo con las varianzas de observación de cada candidato.
+# Salidas:
+#   - Método aplicar() devuelve un arreglo (población, n) con la posición
+#     estimada por cada candidato.
+# Notas:
+#   - Usa las expresiones escalares cerradas del modelo posición-velocidad
+#     (A = [[1, 1], [0, 1]], H = [1, 0], Q·I), equivalentes a FiltroKalman pero
+#     sin productos matriciales 2x2 ni asignaciones de np.eye por muestra.
+#   - La covarianza P es simétrica, por lo que solo se guardan p00, p01 y p11.
+# ------------------------------------------------------------------------------
+class FiltroKalmanLote:
+    def __init__(self, datos, Q, R):
+        self.datos = datos
+        self.Q, self.R = np.broadcast_arrays(np.atleast_1d(np.asarray(Q, dtype=float)),
+                                             np.atleast_1d(np.asarray(R, dtype=float)))
+
+    def aplicar(self):
+        n = len(self.datos)
+        m = len(self.Q)
+        q, r = self.Q, self.R
+
+        # Estado inicial [posición, velocidad] y P = I para cada candidato
+        x0 = np.full(m, float(self.datos[0]))
+        x1 = np.zeros(m)
+        p00 = np.ones(m)
+        p01 = np.zeros(m)
+        p11 = np.ones(m)
+
+        resultados = np.empty((n, m))
+
+        for k, z in enumerate(self.datos):
+            # Predicción: x = A x, P = A P Aᵀ + Q
+            x0 = x0 + x1
+            pp00 = p00 + 2.0 * p01 + p11 + q
+            pp01 = p01 + p11
+            pp11 = p11 + q
+
+            # Corrección
+            S = pp00 + r
+            k0 = pp00 / S        # Ganancia de Kalman
+            k1 = pp01 / S
+            y = z - x0           # Innovación
+
+            x0 = x0 + k0 * y
+            x1 = x1 + k1 * y
+            p00 = (1.0 - k0) * pp00
+            p01 = (1.0 - k0) * pp01
+            p11 = pp11 - k1 * pp01
+
+            resultados[k] = x0   # Solo guardamos la posición
+
+        return np.ascontiguousarray(resultados.T)
+
+# ------------------------------------------------------------------------------
+# Clase: FiltroKalmanEstacionario
+# Descripción:
+#   Variante del filtro de Kalman con ganancia en estado estacionario. Resuelve
+#   una vez la ecuación algebraica discreta de Riccati y, cuando la covarianza P
+#   del filtro exacto converge a esa solución, procesa el resto de la serie como
+#   un filtro IIR de ganancia fija mediante scipy.signal.lfilter.
+# Entradas:
+#   - datos: señal original a filtrar.
+#   - Q: covarianza del proceso (ruido de sistema).
+#   - R: varianza de la observación (ruido de medición).
+#   - tol: tolerancia relativa para declarar convergida la covarianza P.
+# Salidas:
+#   - Método aplicar() devuelve la señal suavizada (posición estimada).
+#   - Método desviacion_maxima() devuelve la máxima diferencia absoluta contra
+#     el filtro exacto variante en el tiempo (FiltroKalmanLote).
+#   - Atributo transitorio: número de muestras procesadas con el filtro exacto
+#     antes de cambiar a la ganancia fija (disponible tras aplicar()).
+# Notas:
+#   - Con ganancia fija K, el filtro es x_k = F x_{k-1} + K z_k con
+#     F = (I - K H) A, un sistema lineal invariante de orden 2 cuya función de
+#     transferencia se obtiene con ss2tf.
+#   - La salida tras el transitorio es la respuesta a estado cero (lfilter sobre
+#     las muestras restantes) más la respuesta a entrada cero desde el estado
+#     alcanzado, ambas calculadas sin operaciones matriciales por muestra.
+# ------------------------------------------------------------------------------
+class FiltroKalmanEstacionario:
+    def __init__(self, datos, Q, R, tol=1e-12):
+        self.datos = datos
+        self.Q = float(Q)
+        self.R = float(R)
+        self.tol = tol
+        self.transitorio = None
+
+    def _solucion_riccati(self):
+        A = np.array([[1.0, 1.0],
+                      [0.0, 1.0]])
+        H = np.array([[1.0, 0.0]])
+
+        # Covarianza de predicción en estado estacionario
+        P_pred = solve_discrete_are(A.T, H.T, self.Q * np.eye(2), np.array([[self.R]]))
+        K = P_pred @ H.T / (P_pred[0, 0] + self.R)
+        P = (np.eye(2) - K @ H) @ P_pred
+        return A, H, K, P
+
+    def aplicar(self):
+        A, H, K, P_ss = self._solucion_riccati()
+        n = len(self.datos)
+        q, r = self.Q, self.R
+        escala = self.tol * max(1.0, np.max(np.abs(P_ss)))
+
+        # Transitorio: filtro exacto hasta que P converge a la solución de Riccati
+        x0, x1 = float(self.datos[0]), 0.0
+        p00, p01, p11 = 1.0, 0.0, 1.0
+        resultados = np.empty(n)
+        m = 0
+        while m < n:
+            z = float(self.datos[m])
+            x0 = x0 + x1
+            pp00 = p00 + 2.0 * p01 + p11 + q
+            pp01 = p01 + p11
+            pp11 = p11 + q
+
+            S = pp00 + r
+            k0 = pp00 / S
+            k1 = pp01 / S
+            y = z - x0
+
+            x0 = x0 + k0 * y
+            x1 = x1 + k1 * y
+            p00 = (1.0 - k0) * pp00
+            p01 = (1.0 - k0) * pp01
+            p11 = pp11 - k1 * pp01
+
+            resultados[m] = x0
+            m += 1
+
+            if (abs(p00 - P_ss[0, 0]) <= escala and abs(p01 - P_ss[0, 1]) <= escala
+                    and abs(p11 - P_ss[1, 1]) <= escala):
+                break
+
+        self.transitorio = m
+        resto = n - m
+        if resto == 0:
+            return resultados
+
+        # Ganancia fija: x_k = F x_{k-1} + K z_k, salida y_k = C x_k
+        F = (np.eye(2) - K @ H) @ A
+        C = np.array([[1.0, 0.0]])
+        b, a = ss2tf(F, K, C @ F, C @ K)
+        b = b[0]
+
+        # Respuesta a estado cero sobre las muestras restantes
+        z_resto = np.asarray(self.datos[m:], dtype=float)
+        salida = lfilter(b, a, z_resto)
+
+        # Respuesta a entrada cero desde el estado alcanzado: s_j = C F^j x_m
+        x = np.array([x0, x1])
+        libre = np.empty(resto)
+        libre[0] = (C @ F @ x)[0]
+        if resto > 1:
+            s2 = (C @ F @ F @ x)[0]
+            zi = lfiltic([1.0], a, [s2, libre[0]])
+            libre[1] = s2
+            libre[2:] = lfilter([1.0], a, np.zeros(resto - 2), zi=zi)[0]
+
+        resultados[m:] = salida + libre
+        return resultados
+
+    def desviacion_maxima(self):
+        exacta = FiltroKalmanLote(self.datos, self.Q, self.R).aplicar()[0]
+        return float(np.max(np.abs(self.aplicar() - exacta)))
+
+# ------------------------------------------------------------------------------
+# Clases: FitnessKalman, FitnessKalmanLote
+# Descripción:
+#   Funciones fitness de FiltroKalmanOptimizado definidas como clases a nivel de
+#   módulo para que puedan serializarse y evaluarse en otros procesos.
+#   FitnessKalman evalúa un par (Q, R) con FiltroKalmanEstacionario;
+#   FitnessKalmanLote recibe params (2, población), filtra toda la población
+#   en una sola pasada con FiltroKalmanLote y la puntúa en un solo lote.
+#   Ambas construyen el EvaluadorMonteCarlo una sola vez para la señal.
+# Métodos:
+#   - __call__(params): filtra la serie completa y la evalúa.
+#   - parcial(params, fraccion): evalúa solo el tramo inicial de la serie (el
+#     filtro es causal, así que sus salidas son las de la serie completa).
+#   - subventanas(params, fraccion, ventanas=8, semilla=0): promedio sobre
+#     subventanas al azar (ver montecarlo.EvaluadorSubventanas); cada
+#     subventana se filtra desde su primera muestra.
+#   - tramo(fraccion), evaluador_subventanas(fraccion, ventanas, semilla):
+#     longitud del tramo de parcial y subventanas de subventanas; permiten
+#     contar las muestras que puntúa cada nivel de fidelidad.
+#   Los evaluadores de cada tramo y de cada sorteo de subventanas se
+#   construyen una vez.
+# ------------------------------------------------------------------------------
+class FitnessKalman:
+    muestras_minimas = 64  # Longitud mínima de tramos y subventanas
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.evaluador = EvaluadorMonteCarlo(datos)
+        self.evaluadores_tramo = {}
+        self.subventanas_tramo = {}
+
+    def puntuar(self, datos, evaluador, params):
+        Q, R = params
+        return evaluador.puntuar(FiltroKalmanEstacionario(datos, Q, R).aplicar())
+
+    def __call__(self, params):
+        return self.puntuar(self.datos, self.evaluador, params)
+
+    def tramo(self, fraccion):
+        n = len(self.datos)
+        return max(int(n * fraccion), min(n, self.muestras_minimas))
+
+    def evaluador_subventanas(self, fraccion, ventanas=8, semilla=0):
+        clave = (fraccion, ventanas, semilla)
+        if clave not in self.subventanas_tramo:
+            self.subventanas_tramo[clave] = EvaluadorSubventanas(self.datos, fraccion, ventanas,
+                                                                 self.muestras_minimas, semilla)
+        return self.subventanas_tramo[clave]
+
+    def parcial(self, params, fraccion):
+        m = self.tramo(fraccion)
+        if m not in self.evaluadores_tramo:
+            self.evaluadores_tramo[m] = EvaluadorMonteCarlo(self.datos[:m])
+        return self.puntuar(self.datos[:m], self.evaluadores_tramo[m], params)
+
+    def subventanas(self, params, fraccion, ventanas=8, semilla=0):
+        return self.evaluador_subventanas(fraccion, ventanas, semilla).promediar(
+            lambda a, b, evaluador: self.puntuar(self.datos[a:b], evaluador, params))
+
+
+class FitnessKalmanLote(FitnessKalman):
+    def puntuar(self, datos, evaluador, params):
+        Q, R = params
+        return evaluador.puntuar_lote(FiltroKalmanLote(datos, Q, R).aplicar())
+
 # ------------------------------------------------------------------------------
 # Clase: FiltroKalmanOptimizado
 # Descripción:
@@ -61,23 +350,63 @@ class FiltroKalman:
 #   parámetros Q y R mediante un algoritmo genético y evaluación Monte Carlo.
 # Entradas:
 #   - datos: señal original a filtrar.
+#   - estacionario: si es True, usa FiltroKalmanEstacionario (ganancia fija tras
+#     el transitorio) tanto en la búsqueda como en el filtrado final.
+#   - ejecutor: ejecutor opcional (ver genetico.crear_ejecutor) para evaluar la
+#     población en paralelo; solo aplica al modo estacionario.
+#   - semilla: semilla de la evolución diferencial.
+#   - inicial: (Q, R) opcional con que sembrar la población inicial, por
+#     ejemplo el óptimo de un segmento anterior.
+#   - presupuesto: genetico.Presupuesto opcional; por defecto,
+#     presupuesto_defecto (parada tras 10 generaciones sin mejora).
+#   - fidelidad: genetico.Fidelidad opcional; la evolución diferencial corre
+#     sobre la fitness sustituta y solo los mejores de la población final se
+#     evalúan sobre la serie completa.
 # Salidas:
 #   - Método ejecutar() devuelve la señal suavizada con los parámetros óptimos.
+#   - Atributo parametros: (Q, R) óptimos.
+#   - Atributo reporte: evaluaciones realizadas por el optimizador.
 # Notas:
 #   - La función de evaluación compara la señal filtrada contra la original usando
 #     métodos de simulación Monte Carlo.
+#   - Cada generación de la evolución diferencial se evalúa en bloque con
+#     FiltroKalmanLote en lugar de recorrer la señal una vez por candidato.
 # ------------------------------------------------------------------------------
 class FiltroKalmanOptimizado:
-    def __init__(self, datos):
+    presupuesto_defecto = Presupuesto(paciencia=10)
+
+    def __init__(self, datos, estacionario=False, ejecutor=None, semilla=None, inicial=None,
+                 presupuesto=None, fidelidad=None):
         self.datos = datos
+        self.estacionario = estacionario
+        self.ejecutor = ejecutor
+        self.semilla = semilla
+        self.inicial = inicial
+        self.presupuesto = presupuesto if presupuesto is not None else self.presupuesto_defecto
+        self.fidelidad = fidelidad
+        self.parametros = None
+        self.reporte = None
 
     def ejecutar(self):
-        def fitness(params):
-            Q, R = params
-            filtro = FiltroKalman(self.datos, Q, R)
-            salida = filtro.aplicar()
-            return EvaluadorMonteCarlo.evaluar(self.datos, salida)
-
-        genetico = AlgoritmoGenetico(bounds=[(1e-5, 1), (1e-5, 1)])
-        Q_opt, R_opt = genetico.optimizar(fitness)
+        if self.estacionario:
+            genetico = AlgoritmoGenetico(bounds=[(1e-5, 1), (1e-5, 1)], ejecutor=self.ejecutor,
+                                         semilla=self.semilla, inicial=self.inicial,
+                                         presupuesto=self.presupuesto, fidelidad=self.fidelidad)
+            fitness = FitnessKalman(self.datos)
+            Q_opt, R_opt = genetico.optimizar(fitness, fitness_parcial=self._parcial(fitness))
+            self.reporte = genetico.reporte
+            self.parametros = (float(Q_opt), float(R_opt))
+            return FiltroKalmanEstacionario(self.datos, Q_opt, R_opt).aplicar()
+
+        genetico = AlgoritmoGenetico(bounds=[(1e-5, 1), (1e-5, 1)], semilla=self.semilla,
+                                     inicial=self.inicial, presupuesto=self.presupuesto,
+                                     fidelidad=self.fidelidad)
+        fitness = FitnessKalmanLote(self.datos)
+        Q_opt, R_opt = genetico.optimizar(fitness, vectorizado=True,
+                                          fitness_parcial=self._parcial(fitness))
+        self.reporte = genetico.reporte
+        self.parametros = (float(Q_opt), float(R_opt))
         return FiltroKalman(self.datos, Q_opt, R_opt).aplicar()
+
+    def _parcial(self, fitness):
+        return None if self.fidelidad is None else self.fidelidad.parcial(fitness)
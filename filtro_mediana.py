@@ -1,9 +1,106 @@
+import heapq
+
+from collections import deque
+
 import numpy as np
 
-from scipy.signal import medfilt
+from scipy.ndimage import median_filter
+
+from genetico import AlgoritmoGenetico, CacheFitness, Presupuesto
+from montecarlo import EvaluadorMonteCarlo, EvaluadorSubventanas
+
+# ------------------------------------------------------------------------------
+# Clase: MedianaMovil
+# Descripción:
+#   Mediana de una ventana deslizante mediante dos montículos (heaps): uno de
+#   máximos con la mitad inferior y otro de mínimos con la mitad superior. Las
+#   muestras que salen de la ventana se eliminan de forma diferida (lazy
+#   deletion) cuando llegan a la cima de su montículo.
+# Entradas:
+#   - ventana: tamaño de la ventana (impar).
+# Métodos:
+#   - agregar(valor): inserta una muestra y retira la más antigua si la ventana
+#     está llena. O(log w) amortizado.
+#   - _compactar(): reconstruye ambos montículos con las muestras de la ventana
+#     cuando las entradas pendientes de eliminar superan `ventana`; así la
+#     memoria queda acotada por O(w) sin importar la longitud del flujo.
+#   - llena(): indica si la ventana contiene `ventana` muestras.
+#   - mediana(): devuelve la mediana de la ventana actual. O(1).
+# ------------------------------------------------------------------------------
+class MedianaMovil:
+    def __init__(self, ventana):
+        self.ventana = ventana
+        self.bajos = []   # Montículo de máximos (valores negados)
+        self.altos = []   # Montículo de mínimos
+        self.tam_bajos = 0
+        self.tam_altos = 0
+        self.pendientes = {}  # Valores por eliminar de forma diferida y su número
+        self.recientes = deque()
+
+    def _podar(self, monticulo, signo):
+        while monticulo:
+            valor = signo * monticulo[0]
+            cuenta = self.pendientes.get(valor, 0)
+            if not cuenta:
+                break
+            if cuenta == 1:
+                del self.pendientes[valor]
+            else:
+                self.pendientes[valor] = cuenta - 1
+            heapq.heappop(monticulo)
+
+    def _compactar(self):
+        valores = sorted(self.recientes)
+        mitad = (len(valores) + 1) // 2
+        self.bajos = [-v for v in reversed(valores[:mitad])]  # Ya ordenado como montículo
+        self.altos = valores[mitad:]
+        self.tam_bajos = mitad
+        self.tam_altos = len(valores) - mitad
+        self.pendientes = {}
 
-from genetico import AlgoritmoGenetico
-from montecarlo import EvaluadorMonteCarlo
+    def _equilibrar(self):
+        if self.tam_bajos > self.tam_altos + 1:
+            heapq.heappush(self.altos, -heapq.heappop(self.bajos))
+            self.tam_bajos -= 1
+            self.tam_altos += 1
+            self._podar(self.bajos, -1)
+        elif self.tam_bajos < self.tam_altos:
+            heapq.heappush(self.bajos, -heapq.heappop(self.altos))
+            self.tam_bajos += 1
+            self.tam_altos -= 1
+            self._podar(self.altos, 1)
+
+    def agregar(self, valor):
+        if not self.bajos or valor <= -self.bajos[0]:
+            heapq.heappush(self.bajos, -valor)
+            self.tam_bajos += 1
+        else:
+            heapq.heappush(self.altos, valor)
+            self.tam_altos += 1
+        self._equilibrar()
+        self.recientes.append(valor)
+
+        if len(self.recientes) > self.ventana:
+            viejo = self.recientes.popleft()
+            self.pendientes[viejo] = self.pendientes.get(viejo, 0) + 1
+            if viejo <= -self.bajos[0]:
+                self.tam_bajos -= 1
+                if viejo == -self.bajos[0]:
+                    self._podar(self.bajos, -1)
+            else:
+                self.tam_altos -= 1
+                if viejo == self.altos[0]:
+                    self._podar(self.altos, 1)
+            self._equilibrar()
+            obsoletas = len(self.bajos) + len(self.altos) - self.tam_bajos - self.tam_altos
+            if obsoletas > self.ventana:
+                self._compactar()
+
+    def llena(self):
+        return len(self.recientes) == self.ventana
+
+    def mediana(self):
+        return -self.bajos[0]
 
 # ------------------------------------------------------------------------------
 # Clase: FiltroMediana
@@ -15,17 +112,133 @@ from montecarlo import EvaluadorMonteCarlo
 #   - ventana: tamaño de la ventana de filtrado. Se ajusta automáticamente a impar.
 # Salidas:
 #   - Método aplicar() devuelve la señal suavizada.
+#   - Métodos actualizar(muestra) y actualizar_bloque(bloque) filtran en flujo con
+#     una latencia de ventana // 2 muestras: actualizar devuelve la mediana
+#     centrada en la muestra recibida `latencia` pasos antes (o None mientras se
+#     llena la ventana) y actualizar_bloque devuelve las salidas emitidas.
+#   - Método finalizar() emite las últimas `latencia` muestras al terminar el flujo.
 # Notas:
-#   - Se utiliza la función medfilt de SciPy, ampliamente empleada en procesamiento
-#     de señales.
+#   - Se utiliza median_filter de scipy.ndimage; desde SciPy 1.15, en una
+#     dimensión usa un filtro de rango deslizante en C con costo O(n log w), de
+#     modo que las ventanas de cientos de muestras cuestan casi lo mismo que las
+#     pequeñas.
+#   - Los bordes se completan repitiendo la primera y la última muestra
+#     (mode="nearest"). Con relleno de ceros, una ventana ancha sobre una señal
+#     con nivel de base lejos de cero arrastraría la mediana hacia cero en los
+#     extremos (la mitad de la ventana son ceros en la última muestra).
+#   - El modo en flujo usa MedianaMovil con el mismo relleno en ambos extremos,
+#     por lo que su salida coincide con aplicar() sobre la señal completa.
 # ------------------------------------------------------------------------------
 class FiltroMediana:
     def __init__(self, datos, ventana):
         self.datos = datos
         self.ventana = int(ventana) | 1  # Asegura impar
+        self.latencia = self.ventana // 2
+        self.movil = None
+        self.ultima = None
 
     def aplicar(self):
-        return medfilt(self.datos, self.ventana)
+        return median_filter(np.asarray(self.datos), size=self.ventana, mode="nearest")
+
+    def actualizar(self, muestra):
+        salida = self.actualizar_bloque([muestra])
+        return salida[0] if len(salida) else None
+
+    def actualizar_bloque(self, bloque):
+        if len(bloque) == 0:
+            return np.empty(0)
+        if self.movil is None:
+            # Relleno inicial repitiendo la primera muestra, como aplicar()
+            self.movil = MedianaMovil(self.ventana)
+            for _ in range(self.latencia):
+                self.movil.agregar(float(bloque[0]))
+
+        salida = []
+        for muestra in bloque:
+            self.movil.agregar(float(muestra))
+            if self.movil.llena():
+                salida.append(self.movil.mediana())
+        self.ultima = float(bloque[-1])
+        return np.array(salida)
+
+    def finalizar(self):
+        # Relleno final repitiendo la última muestra para emitir las últimas `latencia`
+        if self.movil is None:
+            return np.empty(0)
+        return self.actualizar_bloque([self.ultima] * self.latencia)
+
+# ------------------------------------------------------------------------------
+# Función: discretizar_ventana
+# Descripción:
+#   Convierte el parámetro continuo del optimizador en una ventana impar entera.
+# ------------------------------------------------------------------------------
+def discretizar_ventana(params):
+    return (int(params[0]) | 1,)
+
+# ------------------------------------------------------------------------------
+# Clase: FitnessMediana
+# Descripción:
+#   Función fitness de FiltroMedianaOptimizado definida como clase a nivel de
+#   módulo para que pueda serializarse y evaluarse en otros procesos.
+# Métodos:
+#   - __call__(params): filtra la serie completa y la evalúa.
+#   - parcial(params, fraccion): evalúa solo las primeras muestras de la
+#     salida. Se filtra el tramo inicial más las ventana // 2 muestras
+#     siguientes, así que esas salidas son exactamente las de la serie
+#     completa. El evaluador de cada longitud de tramo se construye una vez.
+#   - subventanas(params, fraccion, ventanas=8, semilla=0): promedio sobre
+#     subventanas al azar (ver montecarlo.EvaluadorSubventanas). Igual que en
+#     parcial, cada subventana se filtra con ventana // 2 muestras de margen a
+#     cada lado, así que sus salidas son las de la serie completa.
+#   - tramo(fraccion), evaluador_subventanas(fraccion, ventanas, semilla):
+#     longitud del tramo de parcial y subventanas de subventanas.
+# ------------------------------------------------------------------------------
+class FitnessMediana:
+    version = 1  # Versión de los puntajes en la caché en disco: incrementar al cambiarlos
+    muestras_minimas = 2000      # Tramo mínimo: unas cuatro veces la ventana más ancha
+    muestras_subventana = 1000   # Subventana mínima: unas dos veces la ventana más ancha
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.evaluador = EvaluadorMonteCarlo(datos)
+        self.evaluadores_tramo = {}
+        self.subventanas_tramo = {}
+
+    def __call__(self, params):
+        ventana = discretizar_ventana(params)[0]
+        salida = FiltroMediana(self.datos, ventana).aplicar()
+        return self.evaluador.puntuar(salida)
+
+    def tramo(self, fraccion):
+        n = len(self.datos)
+        return max(int(n * fraccion), min(n, self.muestras_minimas))
+
+    def evaluador_subventanas(self, fraccion, ventanas=8, semilla=0):
+        clave = (fraccion, ventanas, semilla)
+        if clave not in self.subventanas_tramo:
+            self.subventanas_tramo[clave] = EvaluadorSubventanas(self.datos, fraccion, ventanas,
+                                                                 self.muestras_subventana, semilla)
+        return self.subventanas_tramo[clave]
+
+    def parcial(self, params, fraccion):
+        m = self.tramo(fraccion)
+        if m not in self.evaluadores_tramo:
+            self.evaluadores_tramo[m] = EvaluadorMonteCarlo(self.datos[:m])
+        ventana = discretizar_ventana(params)[0]
+        salida = FiltroMediana(self.datos[:m + ventana // 2], ventana).aplicar()[:m]
+        return self.evaluadores_tramo[m].puntuar(salida)
+
+    def subventanas(self, params, fraccion, ventanas=8, semilla=0):
+        evaluador = self.evaluador_subventanas(fraccion, ventanas, semilla)
+        ventana = discretizar_ventana(params)[0]
+        margen = ventana // 2
+
+        def puntuar(a, b, evaluador):
+            inicio = max(0, a - margen)
+            salida = FiltroMediana(self.datos[inicio:b + margen], ventana).aplicar()
+            return evaluador.puntuar(salida[a - inicio:b - inicio])
+
+        return evaluador.promediar(puntuar)
 
 # ------------------------------------------------------------------------------
 # Clase: FiltroMedianaOptimizado
@@ -34,22 +247,73 @@ class FiltroMediana:
 #   un algoritmo genético y evaluación por simulación Monte Carlo.
 # Entradas:
 #   - datos: señal original a filtrar.
+#   - ruta_cache: directorio opcional para persistir las evaluaciones de fitness.
+#   - cache_solo_lectura: si es True, el respaldo en ruta_cache solo se consulta
+#     (ver genetico.CacheFitness); para cuando varios procesos comparten la ruta.
+#   - ejecutor: ejecutor opcional (ver genetico.crear_ejecutor) para evaluar los
+#     candidatos en paralelo.
+#   - semilla: semilla del optimizador.
+#   - inicial: ventana opcional alrededor de la cual buscar (±2, es decir, la
+#     ventana impar anterior y la siguiente), por ejemplo la óptima de un
+#     segmento anterior.
+#   - presupuesto: genetico.Presupuesto opcional (en rejilla solo cuenta el
+#     límite de tiempo); por defecto, presupuesto_defecto, sin límites.
+#   - fidelidad: genetico.Fidelidad opcional con las fracciones y el sustituto
+#     de las rondas de reducción sucesiva; con ella se criba siempre, sin
+#     importar la longitud de la serie.
 # Salidas:
 #   - Método ejecutar() devuelve la señal suavizada con ventana óptima.
+#   - Atributo parametros: (ventana,) óptima.
+#   - Atributo cache: CacheFitness usada en la búsqueda (aciertos/fallos).
+#   - Atributo reporte: evaluaciones realizadas y ahorradas por el optimizador;
+#     "cache" tiene los aciertos y fallos de la caché (CacheFitness.estadisticas).
 # Notas:
 #   - Se busca minimizar la diferencia entre la señal filtrada y el comportamiento
 #     estadístico esperado a través de evaluación Monte Carlo.
+#   - Se buscan ventanas impares de 3 hasta ventana_maxima muestras, sin pasar
+#     de una cuarta parte de la serie. Se recorren como rejilla y cada ventana
+#     se evalúa una sola vez; si la serie es lo bastante larga para que el
+#     tramo de la primera ronda tenga al menos FitnessMediana.muestras_minimas
+#     muestras, las ventanas dominadas se descartan antes con evaluaciones
+#     parciales (reducción sucesiva, ver genetico.AlgoritmoGenetico).
 # ------------------------------------------------------------------------------
 class FiltroMedianaOptimizado:
-    def __init__(self, datos):
+    ventana_maxima = 501
+    presupuesto_defecto = Presupuesto()
+
+    def __init__(self, datos, ruta_cache=None, ejecutor=None, semilla=None, inicial=None,
+                 presupuesto=None, fidelidad=None, cache_solo_lectura=False):
         self.datos = datos
+        self.ruta_cache = ruta_cache
+        self.cache_solo_lectura = cache_solo_lectura
+        self.ejecutor = ejecutor
+        self.semilla = semilla
+        self.inicial = inicial
+        self.presupuesto = presupuesto if presupuesto is not None else self.presupuesto_defecto
+        self.fidelidad = fidelidad
+        self.cache = None
+        self.reporte = None
+        self.parametros = None
 
     def ejecutar(self):
-        def fitness(params):
-            ventana = int(params[0]) | 1
-            salida = FiltroMediana(self.datos, ventana).aplicar()
-            return EvaluadorMonteCarlo.evaluar(self.datos, salida)
-
-        genetico = AlgoritmoGenetico(bounds=[(3, 11)])  # ventanas impares
-        ventana_opt = genetico.optimizar(fitness)[0]
+        self.cache = CacheFitness(self.datos, discretizar_ventana, "mediana", ruta=self.ruta_cache,
+                                  version=FitnessMediana.version, solo_lectura=self.cache_solo_lectura)
+        maxima = min(self.ventana_maxima, max(11, len(self.datos) // 4))
+        genetico = AlgoritmoGenetico(bounds=[(3, maxima)], cache=self.cache,  # ventanas impares
+                                     discretizar=discretizar_ventana,
+                                     ejecutor=self.ejecutor, semilla=self.semilla,
+                                     inicial=self.inicial, radio=2, presupuesto=self.presupuesto,
+                                     fidelidad=self.fidelidad)
+        fitness = FitnessMediana(self.datos)
+        if self.fidelidad is not None:
+            parcial = self.fidelidad.parcial(fitness)
+        else:
+            tramo = len(self.datos) * genetico.eta ** -(genetico.niveles - 1)
+            parcial = fitness.parcial if tramo >= fitness.muestras_minimas else None
+        try:
+            ventana_opt = genetico.optimizar(fitness, fitness_parcial=parcial)[0]
+        finally:
+            self.cache.cerrar()
+        self.reporte = {**genetico.reporte, "cache": self.cache.estadisticas()}
+        self.parametros = discretizar_ventana([ventana_opt])
         return FiltroMediana(self.datos, ventana_opt).aplicar()
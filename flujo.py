@@ -0,0 +1,109 @@
+# Autor: Gutierrez Chavero David
+# Este módulo implementa el modo en flujo (tiempo real): lee muestras de la
+# entrada estándar o de un archivo que sigue creciendo, las filtra con Kalman y
+# mediana en flujo combinados con pesos fijos, y escribe cada salida en cuanto
+# está disponible, con memoria constante.
+
+import sys   # Entrada y salida estándar.
+import time  # Espera entre lecturas al seguir un archivo en crecimiento.
+
+from filtro_kalman import FiltroKalman
+from filtro_mediana import FiltroMediana
+from hibrido import FiltroHibridoFlujo
+
+# ------------------------------------------------------------------------------
+# Función: leer_bloques
+# Descripción:
+#   Lee muestras numéricas línea por línea y las entrega en bloques pequeños.
+# Entradas:
+#   - origen: archivo de texto abierto (o sys.stdin).
+#   - columna: índice de la columna si las líneas son CSV; las líneas con un
+#     solo valor se aceptan tal cual.
+#   - fila: número de líneas iniciales a omitir (por ejemplo, el encabezado).
+#   - seguir: si es True, al llegar al final del archivo espera nuevas líneas
+#     (como "tail -f") en lugar de terminar.
+#   - tam_bloque: máximo de muestras por bloque.
+#   - espera: segundos entre intentos de lectura al seguir el archivo.
+# Salidas:
+#   - Generador de listas de floats. Un bloque se entrega al llenarse o cuando
+#     no hay más datos disponibles por el momento.
+# Notas:
+#   - Las líneas vacías o no numéricas se ignoran.
+#   - Al seguir un archivo que aún se está escribiendo, readline() puede
+#     devolver una línea a medias (sin "\n"); se guarda hasta que llegue el
+#     resto, para no leer "1.2" de "1.234" y luego "34" como otra muestra. Sin
+#     seguir, un fragmento final sin "\n" se procesa al llegar al final.
+# ------------------------------------------------------------------------------
+def leer_bloques(origen, columna, fila=0, seguir=False, tam_bloque=64, espera=0.2):
+    omitidas = 0
+    bloque = []
+    pendiente = ""
+    while True:
+        linea = pendiente + origen.readline()
+        pendiente = ""
+        if not linea or (seguir and not linea.endswith("\n")):
+            if bloque:
+                yield bloque
+                bloque = []
+            if not seguir:
+                return
+            pendiente = linea  # Línea incompleta: se completa en la siguiente lectura
+            time.sleep(espera)
+            continue
+
+        if omitidas < fila:
+            omitidas += 1
+            continue
+
+        campos = linea.strip().split(",")
+        try:
+            bloque.append(float(campos[columna] if len(campos) > 1 else campos[0]))
+        except (ValueError, IndexError):
+            continue
+
+        if len(bloque) >= tam_bloque:
+            yield bloque
+            bloque = []
+
+# ------------------------------------------------------------------------------
+# Función: filtrar_flujo
+# Descripción:
+#   Ejecuta el filtrado híbrido en flujo con parámetros fijos.
+# Entradas:
+#   - entrada: ruta del archivo o "-" para la entrada estándar.
+#   - salida: ruta del archivo de salida o "-" para la salida estándar.
+#   - columna, fila, seguir, tam_bloque: ver leer_bloques.
+#   - Q, R: parámetros del filtro de Kalman.
+#   - ventana: tamaño de la ventana de la mediana.
+#   - pesos: pesos (Kalman, Mediana) de la combinación.
+# Salidas:
+#   - Número de muestras filtradas escritas.
+# Notas:
+#   - La salida se escribe y vacía (flush) bloque a bloque, con una latencia de
+#     ventana // 2 muestras más el tamaño de bloque.
+# ------------------------------------------------------------------------------
+def filtrar_flujo(entrada, salida, columna, fila, Q, R, ventana, pesos, seguir=False, tam_bloque=64):
+    hibrido = FiltroHibridoFlujo([FiltroKalman(None, Q, R), FiltroMediana(None, ventana)], pesos)
+
+    origen = sys.stdin if entrada == "-" else open(entrada)
+    destino = sys.stdout if salida == "-" else open(salida, "w")
+    escritas = 0
+
+    def escribir(valores):
+        destino.writelines(f"{valor:.9g}\n" for valor in valores)
+        destino.flush()
+        return len(valores)
+
+    try:
+        for bloque in leer_bloques(origen, columna, fila, seguir, tam_bloque):
+            escritas += escribir(hibrido.actualizar_bloque(bloque))
+    except KeyboardInterrupt:
+        pass  # Al interrumpir el seguimiento se vacían las muestras pendientes
+    finally:
+        escritas += escribir(hibrido.finalizar())
+        if origen is not sys.stdin:
+            origen.close()
+        if destino is not sys.stdout:
+            destino.close()
+
+    return escritas
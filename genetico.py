@@ -1,7 +1,365 @@
+import dbm
+import hashlib
+import itertools
+import json
+import os
+import shelve
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
 import numpy as np
 
 from scipy.optimize import differential_evolution
 
+from instrumentacion import REGISTRO
+
+# ------------------------------------------------------------------------------
+# Función: huella_datos
+# Descripción:
+#   Calcula una huella (hash SHA-1) del contenido de una señal, incluyendo su
+#   tipo y forma, para identificar evaluaciones hechas sobre los mismos datos.
+# Entradas:
+#   - datos: arreglo numpy o lista con la señal.
+# Salidas:
+#   - Cadena hexadecimal con la huella.
+# ------------------------------------------------------------------------------
+def huella_datos(datos):
+    arreglo = np.ascontiguousarray(datos)
+    h = hashlib.sha1()
+    h.update(f"{arreglo.dtype.str}{arreglo.shape}".encode())
+    h.update(arreglo.tobytes())
+    return h.hexdigest()
+
+# ------------------------------------------------------------------------------
+# Clase: CacheFitness
+# Descripción:
+#   Memoriza los valores de una función fitness cuyos parámetros continuos se
+#   discretizan antes de evaluar (por ejemplo, ventanas o órdenes enteros). La
+#   clave es la tupla discretizada junto con la huella de los datos, de modo que
+#   candidatos distintos de la evolución diferencial que caen en el mismo punto
+#   entero se evalúan una sola vez.
+#
+# Métodos:
+#   - __init__(datos, discretizar, nombre, capacidad=1024, ruta=None, version=1,
+#              solo_lectura=False):
+#       discretizar convierte el vector de parámetros en una tupla hashable;
+#       nombre separa los espacios de claves de cada filtro; capacidad es el
+#       máximo de entradas en memoria (desalojo LRU); ruta, si se indica, es un
+#       directorio donde se guarda un respaldo persistente (shelve) por filtro.
+#       version identifica la definición de la fitness y forma parte del
+#       nombre del respaldo, de modo que al cambiar cómo se puntúa (el
+#       evaluador, el filtro o las evaluaciones parciales) no se reutilizan
+#       puntajes viejos. Con solo_lectura, el respaldo (si existe) solo se
+#       consulta y las evaluaciones nuevas quedan únicamente en memoria.
+#
+#   - envolver(fitness, etiqueta=None):
+#       Devuelve una función fitness equivalente que consulta la caché antes de
+#       evaluar y guarda el resultado de cada evaluación nueva. La etiqueta
+#       opcional separa evaluaciones distintas de los mismos parámetros (por
+#       ejemplo, evaluaciones parciales sobre una fracción de la señal).
+#
+#   - estadisticas():
+#       Devuelve un diccionario con aciertos, fallos y aciertos en disco.
+#
+#   - cerrar():
+#       Sincroniza y cierra el respaldo en disco.
+#
+# Notas:
+#   - Con el respaldo en disco, volver a ejecutar sobre el mismo CSV reutiliza
+#     las evaluaciones previas sin volver a ajustar los modelos.
+#   - shelve (dbm.dumb en muchas instalaciones) no admite varios procesos
+#     escribiendo el mismo archivo: se pierden o corrompen entradas. Cuando
+#     varios procesos filtran a la vez con la misma ruta (modos por segmentos y
+#     por lotes), cada uno abre el respaldo con solo_lectura.
+# ------------------------------------------------------------------------------
+class CacheFitness:
+    def __init__(self, datos, discretizar, nombre, capacidad=1024, ruta=None, version=1,
+                 solo_lectura=False):
+        self.discretizar = discretizar
+        self.nombre = nombre
+        self.huella = huella_datos(datos)
+        self.capacidad = capacidad
+        self.memoria = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.aciertos_disco = 0
+
+        self.solo_lectura = solo_lectura
+        self.disco = None
+        if ruta:
+            archivo = os.path.join(ruta, f"{nombre}_fitness_v{version}")
+            if not solo_lectura:
+                os.makedirs(ruta, exist_ok=True)
+                self.disco = shelve.open(archivo)
+            elif dbm.whichdb(archivo):
+                self.disco = shelve.open(archivo, flag="r")
+
+    def clave(self, params, etiqueta=None):
+        clave = (self.huella, tuple(self.discretizar(params)))
+        return clave if etiqueta is None else clave + (etiqueta,)
+
+    def obtener(self, clave):
+        if clave in self.memoria:
+            self.memoria.move_to_end(clave)
+            self.aciertos += 1
+            return self.memoria[clave]
+
+        if self.disco is not None:
+            clave_disco = repr(clave)
+            if clave_disco in self.disco:
+                valor = self.disco[clave_disco]
+                self._recordar(clave, valor)
+                self.aciertos += 1
+                self.aciertos_disco += 1
+                return valor
+
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave, valor):
+        self._recordar(clave, valor)
+        if self.disco is not None and not self.solo_lectura:
+            self.disco[repr(clave)] = valor
+
+    def _recordar(self, clave, valor):
+        self.memoria[clave] = valor
+        self.memoria.move_to_end(clave)
+        if len(self.memoria) > self.capacidad:
+            self.memoria.popitem(last=False)  # Desaloja la menos usada
+
+    def envolver(self, fitness, etiqueta=None):
+        def fitness_memorizada(params):
+            clave = self.clave(params, etiqueta)
+            valor = self.obtener(clave)
+            if valor is None:
+                valor = float(fitness(params))
+                self.guardar(clave, valor)
+            return valor
+
+        return fitness_memorizada
+
+    def estadisticas(self):
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "aciertos_disco": self.aciertos_disco,
+        }
+
+    def cerrar(self):
+        if self.disco is not None:
+            self.disco.close()
+            self.disco = None
+
+# ------------------------------------------------------------------------------
+# Clase: RegistroOptimos
+# Descripción:
+#   Guarda en disco el óptimo encontrado por cada filtro para unos datos, para
+#   sembrar con él la búsqueda de una ejecución posterior sobre el mismo
+#   archivo.
+#
+# Métodos:
+#   - __init__(ruta): directorio donde se guardan los óptimos (por ejemplo, el
+#     mismo de la caché de fitness).
+#   - obtener(datos, nombre): parámetros guardados para la huella de los datos
+#     y el filtro, o None si no hay.
+#   - guardar(datos, nombre, parametros): guarda o reemplaza el óptimo.
+#
+# Notas:
+#   - Cada (filtro, huella) es un archivo JSON propio que se escribe en un
+#     temporal propio de cada proceso y se reemplaza de forma atómica
+#     (os.replace), así que las etapas que corren en procesos distintos pueden
+#     guardar sus óptimos a la vez, incluso para los mismos datos.
+# ------------------------------------------------------------------------------
+class RegistroOptimos:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        os.makedirs(ruta, exist_ok=True)
+
+    def _archivo(self, datos, nombre):
+        return os.path.join(self.ruta, f"{nombre}_optimo_{huella_datos(datos)}.json")
+
+    def obtener(self, datos, nombre):
+        try:
+            with open(self._archivo(datos, nombre)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def guardar(self, datos, nombre, parametros):
+        archivo = self._archivo(datos, nombre)
+        temporal = f"{archivo}.{os.getpid()}.tmp"
+        with open(temporal, "w") as f:
+            json.dump(parametros, f, default=float)
+        os.replace(temporal, archivo)
+
+# ------------------------------------------------------------------------------
+# Clase: Presupuesto
+# Descripción:
+#   Límites de una búsqueda de AlgoritmoGenetico.
+#
+# Atributos:
+#   - segundos: tiempo de reloj máximo desde que empieza la búsqueda.
+#   - evaluaciones: número máximo de evaluaciones de fitness de la evolución
+#     diferencial (se ajusta maxiter para no excederlo). Debe alcanzar al menos
+#     para la población inicial; si no, AlgoritmoGenetico lanza ValueError.
+#   - paciencia: generaciones seguidas sin que el mejor fitness mejore más de
+#     `tolerancia` (relativa) tras las cuales se detiene la búsqueda.
+#   - fin: instante absoluto (time.time()) en que debe terminar, por ejemplo el
+#     límite global de main.py; es comparable entre procesos.
+#
+# Métodos:
+#   - limitar(fin): copia del presupuesto con un instante final adicional (se
+#     conserva el más próximo).
+#   - fin_desde(inicio): instante en que se agota el tiempo si la búsqueda
+#     empezó en `inicio`, o None si no hay límite de tiempo.
+#   - acotado(): indica si hay límite de tiempo o de evaluaciones.
+# ------------------------------------------------------------------------------
+class Presupuesto:
+    def __init__(self, segundos=None, evaluaciones=None, paciencia=None, tolerancia=1e-6, fin=None):
+        self.segundos = segundos
+        self.evaluaciones = evaluaciones
+        self.paciencia = paciencia
+        self.tolerancia = tolerancia
+        self.fin = fin
+
+    def limitar(self, fin):
+        if fin is not None and self.fin is not None:
+            fin = min(fin, self.fin)
+        return Presupuesto(self.segundos, self.evaluaciones, self.paciencia, self.tolerancia,
+                           fin if fin is not None else self.fin)
+
+    def fin_desde(self, inicio):
+        limites = [f for f in (self.fin, None if self.segundos is None else inicio + self.segundos)
+                   if f is not None]
+        return min(limites) if limites else None
+
+    def acotado(self):
+        return self.segundos is not None or self.evaluaciones is not None or self.fin is not None
+
+# ------------------------------------------------------------------------------
+# Clase: Fidelidad
+# Descripción:
+#   Calendario de evaluación multifidelidad de AlgoritmoGenetico: los
+#   candidatos se evalúan primero con una fitness sustituta sobre una fracción
+#   de la señal y solo los mejores llegan a la evaluación completa.
+#
+# Atributos:
+#   - fracciones: fracciones de la señal de cada nivel de fidelidad, en orden
+#     creciente y menores que 1 (la evaluación completa se añade al final).
+#   - sustituto: "ventanas" (subventanas al azar, ver
+#     montecarlo.EvaluadorSubventanas) o "prefijo" (tramo inicial de la serie).
+#   - ventanas: número de subventanas por nivel con sustituto "ventanas".
+#   - semilla: semilla del sorteo de las subventanas.
+#   - verificar: si es True, tras la búsqueda se repite con evaluación
+#     completa para reportar cuánto peor (o mejor) fue el candidato elegido
+#     frente al de la búsqueda completa. Duplica con creces el costo; sirve
+#     para elegir el calendario.
+#
+# Métodos:
+#   - parcial(fitness): fitness_parcial(params, fraccion) del sustituto elegido;
+#     fitness debe tener los métodos parcial y subventanas.
+#   - muestras(fitness, fraccion): muestras que puntúa cada evaluación de un
+#     nivel, incluidas las que añaden las longitudes mínimas de tramos y
+#     subventanas; fitness debe tener los métodos tramo y
+#     evaluador_subventanas.
+#   - etiqueta(fraccion): etiqueta de CacheFitness de las evaluaciones de un
+#     nivel. Con sustituto "prefijo" es la fracción, igual que en la reducción
+#     sucesiva sin calendario, así que comparten las entradas de la caché.
+# ------------------------------------------------------------------------------
+class Fidelidad:
+    SUSTITUTOS = ("ventanas", "prefijo")
+
+    def __init__(self, fracciones=(1 / 9, 1 / 3), sustituto="ventanas", ventanas=8, semilla=0,
+                 verificar=False):
+        self.fracciones = tuple(sorted(float(f) for f in fracciones))
+        if not self.fracciones or not all(0 < f < 1 for f in self.fracciones):
+            raise ValueError("Las fracciones de fidelidad deben estar entre 0 y 1 (sin incluirlos)")
+        if sustituto not in self.SUSTITUTOS:
+            raise ValueError(f"Sustituto desconocido: {sustituto}")
+        self.sustituto = sustituto
+        self.ventanas = ventanas
+        self.semilla = semilla
+        self.verificar = verificar
+
+    def parcial(self, fitness):
+        if self.sustituto == "prefijo":
+            return fitness.parcial
+        return partial(fitness.subventanas, ventanas=self.ventanas, semilla=self.semilla)
+
+    def muestras(self, fitness, fraccion):
+        if self.sustituto == "prefijo":
+            return fitness.tramo(fraccion)
+        evaluador = fitness.evaluador_subventanas(fraccion, self.ventanas, self.semilla)
+        return sum(fin - inicio for inicio, fin in evaluador.tramos)
+
+    def etiqueta(self, fraccion):
+        if self.sustituto == "prefijo":
+            return fraccion
+        return (self.sustituto, self.ventanas, self.semilla, fraccion)
+
+# ------------------------------------------------------------------------------
+# Función: crear_ejecutor
+# Descripción:
+#   Crea el ejecutor con el que AlgoritmoGenetico evalúa en paralelo la población
+#   de cada generación.
+# Entradas:
+#   - tipo: "procesos" (ProcessPoolExecutor), "hilos" (ThreadPoolExecutor) o
+#     "serie" (sin paralelismo).
+#   - trabajadores: número de procesos o hilos; con 1 o menos se usa "serie".
+# Salidas:
+#   - Un EjecutorProcesos o EjecutorHilos, o None para evaluación en serie.
+#     Quien lo crea es responsable de llamar a shutdown() al terminar.
+# Notas:
+#   - Con "procesos", las funciones fitness deben ser serializables (pickle),
+#     por eso los filtros las definen como clases a nivel de módulo.
+#   - Los ejecutores guardan su número de trabajadores en el atributo
+#     `trabajadores` (ver contar_trabajadores), que usan quienes reparten el
+#     trabajo en bloques o cadenas.
+# ------------------------------------------------------------------------------
+class EjecutorProcesos(ProcessPoolExecutor):
+    def __init__(self, trabajadores):
+        super().__init__(max_workers=trabajadores)
+        self.trabajadores = trabajadores
+
+class EjecutorHilos(ThreadPoolExecutor):
+    def __init__(self, trabajadores):
+        super().__init__(max_workers=trabajadores)
+        self.trabajadores = trabajadores
+
+def crear_ejecutor(tipo="procesos", trabajadores=1):
+    if tipo == "serie" or trabajadores is None or trabajadores <= 1:
+        return None
+    if tipo == "procesos":
+        return EjecutorProcesos(trabajadores)
+    if tipo == "hilos":
+        return EjecutorHilos(trabajadores)
+    raise ValueError(f"Tipo de ejecutor desconocido: {tipo}")
+
+# ------------------------------------------------------------------------------
+# Función: contar_trabajadores
+# Descripción:
+#   Número de trabajadores de un ejecutor creado con crear_ejecutor (1 si es
+#   None, es decir, evaluación en serie).
+# ------------------------------------------------------------------------------
+def contar_trabajadores(ejecutor):
+    return 1 if ejecutor is None else ejecutor.trabajadores
+
+# ------------------------------------------------------------------------------
+# Función: nombre_fitness
+# Descripción:
+#   Nombre legible de una función fitness para el registro de instrumentación
+#   (por ejemplo, "FitnessARIMA" o "FitnessARIMA.parcial").
+# ------------------------------------------------------------------------------
+def nombre_fitness(fitness):
+    if isinstance(fitness, partial):
+        fitness = fitness.func
+    if hasattr(fitness, "__self__"):
+        return f"{type(fitness.__self__).__name__}.{fitness.__name__}"
+    return getattr(fitness, "__qualname__", type(fitness).__name__)
+
 # ------------------------------------------------------------------------------
 # Clase: AlgoritmoGenetico
 # Descripción:
@@ -9,24 +367,425 @@ from scipy.optimize import differential_evolution
 #   diferencial, utilizado para ajustar hiperparámetros de filtros de señal.
 #
 # Métodos:
-#   - __init__(bounds):
+#   - __init__(bounds, cache=None, discretizar=None, max_rejilla=512, eta=3, niveles=3,
+#              ejecutor=None, semilla=None, inicial=None, radio=1, presupuesto=None,
+#              fidelidad=None):
 #       Recibe los límites de búsqueda [(min1, max1), ..., (minN, maxN)] para
-#       cada uno de los parámetros a optimizar.
+#       cada uno de los parámetros a optimizar. Opcionalmente recibe una
+#       CacheFitness para memorizar las evaluaciones. Si se indica discretizar
+#       (función que convierte los parámetros en una tupla de enteros o
+#       categorías), el espacio se trata como discreto y, si tiene a lo sumo
+#       max_rejilla puntos distintos, se recorre como rejilla en lugar de usar
+#       evolución diferencial. eta y niveles configuran la reducción sucesiva
+#       a la mitad (successive halving) cuando hay una fitness parcial.
+#       ejecutor (ver crear_ejecutor) evalúa cada generación en paralelo y
+#       semilla fija el generador aleatorio de la evolución diferencial.
+#       inicial es un punto de arranque opcional (por ejemplo, el óptimo de una
+#       ejecución anterior): la evolución diferencial lo incluye en la población
+#       inicial y la rejilla se limita a los puntos a distancia a lo sumo radio
+#       de él en cada parámetro. presupuesto (ver Presupuesto) limita el tiempo,
+#       las evaluaciones y las generaciones sin mejora. fidelidad (ver
+#       Fidelidad) reemplaza las fracciones eta^-k de la reducción sucesiva
+#       por su calendario y activa la evaluación multifidelidad de la
+#       evolución diferencial.
 #
-#   - optimizar(fitness):
+#   - poblacion():
+#       Multiplicador popsize de SciPy para que la población total sea de
+#       por_parametro individuos por parámetro y al menos poblacion_minima.
+#
+#   - optimizar(fitness, vectorizado=False, fitness_parcial=None):
 #       Ejecuta la optimización global utilizando el método
-#       scipy.optimize.differential_evolution, con un número fijo de iteraciones.
+#       scipy.optimize.differential_evolution, con hasta maxiter generaciones.
 #       Retorna los parámetros óptimos encontrados que minimizan la función fitness.
+#       Si vectorizado es True, fitness recibe un arreglo (n_parámetros, población)
+#       con toda la generación y debe devolver un arreglo (población,) de puntajes.
+#       En espacios discretos evalúa cada candidato de la rejilla una sola vez;
+#       si se da fitness_parcial(params, fraccion), primero descarta por rondas
+#       los candidatos dominados evaluándolos sobre fracciones de la señal.
+#       Con fidelidad y fitness_parcial, la evolución diferencial completa
+#       corre sobre el nivel más bajo del calendario; la mejor 1/eta parte de
+#       la población final pasa por los niveles siguientes con reducción
+#       sucesiva y solo los supervivientes se evalúan con fitness.
+#
+#   - rejilla():
+#       Devuelve la lista de candidatos distintos del espacio discreto, o None si
+#       el espacio es continuo o demasiado grande.
+#
+# Atributos:
+#   - reporte: diccionario con el modo usado, evaluaciones completas y
+#     parciales, y las llamadas ahorradas frente al presupuesto de la evolución
+#     diferencial (población total · (maxiter + 1)). En modo rejilla
+#     incluye además "etapas": una entrada por ronda con la fracción de la
+#     señal, los candidatos evaluados y los segundos de reloj empleados. Con
+#     evolución diferencial incluye "generaciones": por cada generación, el
+#     mejor fitness, la media y desviación de la población y la convergencia.
+#     "parada" indica por qué terminó la búsqueda: "convergencia" (criterio de
+#     SciPy), "maxiter", "tiempo", "evaluaciones" o "estancamiento"; en modo
+#     rejilla, "tiempo" si se omitieron rondas de cribado. Con fidelidad, el
+#     modo multifidelidad también incluye "etapas" (la primera es la
+#     evolución diferencial; cada etapa indica las muestras puntuadas por
+#     candidato), y ambos modos incluyen "fidelidad": sustituto, fracciones,
+#     puntaje completo del candidato elegido, costo en evaluaciones completas
+#     equivalentes (según las muestras realmente puntuadas) y, con
+#     Fidelidad.verificar, el puntaje del elegido por una búsqueda con
+#     evaluación completa, la diferencia entre ambos y su tiempo.
 #
 # Notas:
 #   - Aunque el nombre de la clase es "AlgoritmoGenetico", en realidad emplea
 #     evolución diferencial, una técnica de optimización estocástica de la misma
 #     familia evolutiva.
+#   - La población se actualiza de forma diferida (una generación completa a la
+#     vez), de modo que con la misma semilla el resultado es idéntico en serie,
+#     con hilos o con procesos.
+#   - La caché se consulta en el proceso principal antes de repartir el trabajo;
+#     solo los candidatos nuevos se envían al ejecutor.
+#   - Las fitness vectorizadas se evalúan en el proceso principal y no usan ni
+#     la caché ni el ejecutor.
+#   - Con la instrumentación activa (ver instrumentacion.activar), cada lote de
+#     evaluaciones se suma al registro como "fitness:<nombre>" con el número de
+#     candidatos evaluados y el tiempo de reloj del lote.
+#   - Con límite de tiempo o de evaluaciones no se pule el resultado con
+#     L-BFGS-B al final, ya que SciPy lo haría aun después de la parada; en
+#     modo multifidelidad tampoco, porque se pulería la fitness sustituta.
+#   - En modo rejilla cada candidato se evalúa una sola vez, así que solo se
+#     respeta el límite de tiempo: agotado entre rondas de cribado, se pasa a
+#     la evaluación completa con el mejor candidato de la última ronda.
 # ------------------------------------------------------------------------------
 class AlgoritmoGenetico:
-    def __init__(self, bounds):
+    maxiter = 50
+    por_parametro = 10     # Individuos por parámetro (regla NP = 10·D)
+    poblacion_minima = 20  # Mínimo de individuos en problemas de 1 o 2 parámetros
+
+    def __init__(self, bounds, cache=None, discretizar=None, max_rejilla=512, eta=3, niveles=3,
+                 ejecutor=None, semilla=None, inicial=None, radio=1, presupuesto=None,
+                 fidelidad=None):
         self.bounds = bounds
+        self.cache = cache
+        self.discretizar = discretizar
+        self.max_rejilla = max_rejilla
+        self.eta = eta
+        self.niveles = niveles
+        self.ejecutor = ejecutor
+        self.trabajadores = contar_trabajadores(ejecutor)
+        self.semilla = semilla
+        self.inicial = None
+        if inicial is not None:
+            limites = np.array(bounds, dtype=float)
+            self.inicial = np.clip(np.asarray(inicial, dtype=float), limites[:, 0], limites[:, 1])
+        self.radio = radio
+        self.presupuesto = presupuesto or Presupuesto()
+        self.fidelidad = fidelidad
+        self.reporte = None
+        self.generaciones = []
+        self.parada = None
+        self._fin = None
+
+    def poblacion(self):
+        dimension = len(self.bounds)
+        return int(np.ceil(max(self.poblacion_minima, self.por_parametro * dimension) / dimension))
+
+    def presupuesto_de(self):
+        return self.poblacion() * len(self.bounds) * (self.maxiter + 1)
+
+    def _generaciones_maximas(self):
+        # Generaciones que caben en el presupuesto de evaluaciones (la población
+        # inicial cuenta como una)
+        if self.presupuesto.evaluaciones is None:
+            return self.maxiter
+        individuos = self.poblacion() * len(self.bounds)
+        if self.presupuesto.evaluaciones < individuos:
+            raise ValueError(f"El presupuesto de {self.presupuesto.evaluaciones} evaluaciones no "
+                             f"alcanza para la población inicial de {individuos} individuos")
+        return min(self.maxiter, self.presupuesto.evaluaciones // individuos - 1)
+
+    def _agotado(self):
+        return self._fin is not None and time.time() >= self._fin
+
+    def rejilla(self):
+        if self.discretizar is None:
+            return None
+
+        limites = self.bounds
+        if self.inicial is not None:
+            limites = [(max(lo, c - self.radio), min(hi, c + self.radio))
+                       for (lo, hi), c in zip(self.bounds, self.inicial)]
+        rangos = [np.arange(np.ceil(lo), np.floor(hi) + 1) for lo, hi in limites]
+        if np.prod([len(r) for r in rangos]) > self.max_rejilla:
+            return None
 
-    def optimizar(self, fitness):
-        resultado = differential_evolution(fitness, self.bounds, maxiter=50, disp=False)
+        candidatos = {}
+        for punto in itertools.product(*rangos):
+            params = np.array(punto, dtype=float)
+            candidatos.setdefault(tuple(self.discretizar(params)), params)
+        return list(candidatos.values())
+
+    def evaluar(self, fitness, candidatos, etiqueta=None):
+        candidatos = list(candidatos)
+        valores = [None] * len(candidatos)
+
+        # Consulta de la caché y agrupación de candidatos repetidos
+        pendientes = OrderedDict()
+        for i, params in enumerate(candidatos):
+            if self.cache is None:
+                pendientes[i] = [i]
+                continue
+            clave = self.cache.clave(params, etiqueta)
+            if clave in pendientes:
+                pendientes[clave].append(i)
+                continue
+            valor = self.cache.obtener(clave)
+            if valor is None:
+                pendientes[clave] = [i]
+            else:
+                valores[i] = valor
+
+        lotes = list(pendientes.values())
+        argumentos = [candidatos[indices[0]] for indices in lotes]
+        inicio = time.perf_counter()
+        if self.ejecutor is None:
+            resultados = map(fitness, argumentos)
+        else:
+            bloque = max(1, len(argumentos) // (4 * self.trabajadores))
+            resultados = self.ejecutor.map(fitness, argumentos, chunksize=bloque)
+
+        for clave, indices, valor in zip(pendientes.keys(), lotes, resultados):
+            valor = float(valor)
+            if self.cache is not None:
+                self.cache.guardar(clave, valor)
+            for i in indices:
+                valores[i] = valor
+
+        if REGISTRO.activo:
+            REGISTRO.agregar(f"fitness:{nombre_fitness(fitness)}", len(argumentos),
+                             time.perf_counter() - inicio)
+        return valores
+
+    def _registrar_generacion(self, intermediate_result):
+        # SciPy entrega el OptimizeResult intermedio solo si el parámetro se
+        # llama exactamente intermediate_result. Devolver True detiene la búsqueda.
+        energias = intermediate_result.population_energies
+        self.generaciones.append({
+            "generacion": int(intermediate_result.nit),
+            "mejor": float(intermediate_result.fun),
+            "media": float(np.mean(energias)),
+            "desviacion": float(np.std(energias)),
+            "convergencia": float(intermediate_result.convergence),
+            "evaluaciones": int(intermediate_result.nfev),
+        })
+
+        if self._agotado():
+            self.parada = "tiempo"
+            return True
+
+        paciencia = self.presupuesto.paciencia
+        if paciencia and len(self.generaciones) > paciencia:
+            antes = self.generaciones[-1 - paciencia]["mejor"]
+            ahora = self.generaciones[-1]["mejor"]
+            if antes - ahora <= self.presupuesto.tolerancia * max(abs(antes), 1e-12):
+                self.parada = "estancamiento"
+                return True
+        return False
+
+    def _fracciones(self):
+        if self.fidelidad is not None:
+            return list(self.fidelidad.fracciones)
+        return [self.eta ** -nivel for nivel in range(self.niveles - 1, 0, -1)]
+
+    def _etiqueta(self, fraccion):
+        return fraccion if self.fidelidad is None else self.fidelidad.etiqueta(fraccion)
+
+    def _evaluar_lote(self, fitness, candidatos, vectorizado, etiqueta=None):
+        if not vectorizado:
+            return self.evaluar(fitness, candidatos, etiqueta)
+        if REGISTRO.activo:
+            fitness = self._medir_vectorizada(fitness)
+        return list(np.asarray(fitness(np.array(candidatos, dtype=float).T), dtype=float))
+
+    def optimizar(self, fitness, vectorizado=False, fitness_parcial=None):
+        candidatos = None if vectorizado else self.rejilla()
+        if candidatos is not None:
+            return self._optimizar_rejilla(fitness, candidatos, fitness_parcial)
+        if self.fidelidad is not None and fitness_parcial is not None:
+            return self._optimizar_fidelidad(fitness, fitness_parcial, vectorizado)
+
+        resultado = self._evolucionar(fitness, vectorizado, pulir=not self.presupuesto.acotado())
+        self.reporte = {
+            "modo": "evolucion_diferencial",
+            "evaluaciones": int(resultado.nfev),
+            "evaluaciones_parciales": 0,
+            "presupuesto_de": self.presupuesto_de(),
+            "ahorradas": 0,
+            "poblacion": self.poblacion() * len(self.bounds),
+            "parada": self.parada,
+            "generaciones": self.generaciones,
+        }
         return resultado.x
+
+    def _evolucionar(self, fitness, vectorizado, pulir, etiqueta=None):
+        self.generaciones = []
+        self.parada = None
+        self._fin = self.presupuesto.fin_desde(time.time())
+        maxiter = self._generaciones_maximas()
+        opciones = {
+            "maxiter": maxiter, "popsize": self.poblacion(), "disp": False,
+            "updating": "deferred", "seed": self.semilla, "x0": self.inicial,
+            "polish": pulir, "callback": self._registrar_generacion,
+        }
+        if vectorizado:
+            if REGISTRO.activo:
+                fitness = self._medir_vectorizada(fitness)
+            resultado = differential_evolution(fitness, self.bounds, vectorized=True, **opciones)
+        else:
+            # workers recibe un mapa propio que consulta la caché y reparte el
+            # resto de la generación en el ejecutor.
+            mapa = self.evaluar if etiqueta is None else partial(self.evaluar, etiqueta=etiqueta)
+            resultado = differential_evolution(fitness, self.bounds, workers=mapa, **opciones)
+
+        if self.parada is None:
+            if resultado.nit < maxiter:
+                self.parada = "convergencia"
+            elif maxiter < self.maxiter:
+                self.parada = "evaluaciones"
+            else:
+                self.parada = "maxiter"
+        return resultado
+
+    def _medir_vectorizada(self, fitness):
+        nombre = f"fitness:{nombre_fitness(fitness)}"
+
+        def medida(poblacion):
+            inicio = time.perf_counter()
+            valores = fitness(poblacion)
+            REGISTRO.agregar(nombre, np.shape(poblacion)[-1] if np.ndim(poblacion) > 1 else 1,
+                             time.perf_counter() - inicio)
+            return valores
+        return medida
+
+    def _reducir(self, fitness_parcial, vivos, fracciones, vectorizado=False):
+        # Reducción sucesiva: cada ronda evalúa sobre una fracción mayor de la
+        # señal y conserva solo la mejor 1/eta parte de los candidatos.
+        etapas = []
+        evaluaciones = 0
+        for fraccion in fracciones:
+            if len(vivos) <= 1:
+                break
+            inicio = time.perf_counter()
+            puntajes = self._evaluar_lote(partial(fitness_parcial, fraccion=fraccion), vivos,
+                                          vectorizado, etiqueta=self._etiqueta(fraccion))
+            etapas.append({"fraccion": fraccion, "candidatos": len(vivos),
+                           "segundos": time.perf_counter() - inicio})
+            evaluaciones += len(vivos)
+            conservar = max(1, int(np.ceil(len(vivos) / self.eta)))
+            agotado = self._agotado()
+            if agotado:
+                # Sin tiempo para más rondas: solo el mejor pasa a la evaluación completa
+                conservar = 1
+                self.parada = "tiempo"
+            vivos = [vivos[i] for i in np.argsort(puntajes, kind="stable")[:conservar]]
+            if agotado:
+                break
+        return vivos, etapas, evaluaciones
+
+    def _evaluar_finalistas(self, fitness, vivos, etapas, vectorizado=False):
+        inicio = time.perf_counter()
+        puntajes = self._evaluar_lote(fitness, vivos, vectorizado)
+        etapas.append({"fraccion": 1.0, "candidatos": len(vivos),
+                       "segundos": time.perf_counter() - inicio})
+        i = int(np.argmin(puntajes))
+        return vivos[i], float(puntajes[i])
+
+    def _referencia_completa(self, fitness, candidatos, vectorizado):
+        # Búsqueda con evaluación completa, solo para comparar: la rejilla
+        # completa o la evolución diferencial de siempre. Conserva el estado de
+        # la búsqueda multifidelidad.
+        inicio = time.perf_counter()
+        if candidatos is not None:
+            puntaje = min(self._evaluar_lote(fitness, candidatos, vectorizado))
+        else:
+            generaciones, parada = self.generaciones, self.parada
+            puntaje = self._evolucionar(fitness, vectorizado, pulir=not self.presupuesto.acotado()).fun
+            self.generaciones, self.parada = generaciones, parada
+        return float(puntaje), time.perf_counter() - inicio
+
+    def _resumen_fidelidad(self, fitness, puntaje, etapas, candidatos=None, vectorizado=False):
+        # Costo según las muestras que puntuó cada etapa (las fracciones son
+        # nominales: tramos y subventanas tienen longitudes mínimas)
+        n = len(fitness.datos)
+        for etapa in etapas:
+            etapa["muestras"] = (n if etapa["fraccion"] == 1.0 else
+                                 self.fidelidad.muestras(fitness, etapa["fraccion"]))
+        resumen = {
+            "sustituto": self.fidelidad.sustituto,
+            "fracciones": list(self.fidelidad.fracciones),
+            "puntaje_completo": puntaje,
+            "puntaje_referencia": None,
+            "diferencia_puntaje": None,
+            "segundos_referencia": None,
+            "equivalente_completas": sum(e["candidatos"] * e["muestras"] for e in etapas) / n,
+        }
+        if self.fidelidad.verificar:
+            referencia, segundos = self._referencia_completa(fitness, candidatos, vectorizado)
+            resumen.update(puntaje_referencia=referencia, diferencia_puntaje=puntaje - referencia,
+                           segundos_referencia=segundos)
+        return resumen
+
+    def _optimizar_fidelidad(self, fitness, fitness_parcial, vectorizado):
+        fracciones = self._fracciones()
+        individuos = self.poblacion() * len(self.bounds)
+
+        # Evolución diferencial completa sobre el nivel más bajo. El pulido con
+        # L-BFGS-B se haría sobre la sustituta, así que se omite.
+        inicio = time.perf_counter()
+        resultado = self._evolucionar(partial(fitness_parcial, fraccion=fracciones[0]), vectorizado,
+                                      pulir=False, etiqueta=self._etiqueta(fracciones[0]))
+        evaluadas = individuos * (int(resultado.nit) + 1)
+        etapas = [{"fraccion": fracciones[0], "candidatos": evaluadas,
+                   "segundos": time.perf_counter() - inicio}]
+
+        # La mejor 1/eta parte de la población final pasa por los demás niveles
+        # y los supervivientes se evalúan sobre la señal completa
+        orden = np.argsort(resultado.population_energies, kind="stable")
+        vivos = [resultado.population[i] for i in orden[:max(1, int(np.ceil(individuos / self.eta)))]]
+        vivos, rondas, parciales = self._reducir(fitness_parcial, vivos, fracciones[1:], vectorizado)
+        etapas += rondas
+        mejor, puntaje = self._evaluar_finalistas(fitness, vivos, etapas, vectorizado)
+
+        presupuesto = self.presupuesto_de()
+        self.reporte = {
+            "modo": "multifidelidad",
+            "evaluaciones": len(vivos),
+            "evaluaciones_parciales": evaluadas + parciales,
+            "presupuesto_de": presupuesto,
+            "ahorradas": presupuesto - len(vivos) - evaluadas - parciales,
+            "poblacion": individuos,
+            "parada": self.parada,
+            "generaciones": self.generaciones,
+            "etapas": etapas,
+            "fidelidad": self._resumen_fidelidad(fitness, puntaje, etapas, vectorizado=vectorizado),
+        }
+        return mejor
+
+    def _optimizar_rejilla(self, fitness, candidatos, fitness_parcial):
+        self.parada = None
+        self._fin = self.presupuesto.fin_desde(time.time())
+
+        vivos, etapas, evaluaciones_parciales = candidatos, [], 0
+        if fitness_parcial is not None:
+            vivos, etapas, evaluaciones_parciales = self._reducir(fitness_parcial, candidatos,
+                                                                  self._fracciones())
+        mejor, puntaje = self._evaluar_finalistas(fitness, vivos, etapas)
+
+        presupuesto = self.presupuesto_de()
+        self.reporte = {
+            "modo": "rejilla" if fitness_parcial is None else "reduccion_sucesiva",
+            "candidatos": len(candidatos),
+            "evaluaciones": len(vivos),
+            "evaluaciones_parciales": evaluaciones_parciales,
+            "presupuesto_de": presupuesto,
+            "ahorradas": presupuesto - len(vivos) - evaluaciones_parciales,
+            "parada": self.parada,
+            "etapas": etapas,
+        }
+        if self.fidelidad is not None and fitness_parcial is not None:
+            self.reporte["fidelidad"] = self._resumen_fidelidad(fitness, puntaje, etapas, candidatos)
+        return mejor
@@ -1,10 +1,139 @@
 # Autor: Gutierrez Chavero David
 # Este módulo contiene funciones para graficar señales originales y filtradas,
 # así como una visualización ASCII en terminal mostrada al finalizar el proceso.
+# Las señales se reducen al ancho en píxeles de la imagen antes de graficarse y
+# las figuras pueden dibujarse en paralelo en los procesos de un ejecutor.
 
 import os   # Módulo estándar para manejo de archivos y rutas
 
-from matplotlib import pyplot as plt    # Librería de gráficos 2D
+import numpy as np
+
+# Tamaño (pulgadas) y resolución de cada panel; el ancho en píxeles fija el
+# diezmado de las señales
+TAMANO_PANEL = (10, 4)
+DPI = 100
+
+# Figuras Agg ya creadas en este proceso, por tamaño (ver _lienzo)
+_LIENZOS = {}
+
+# ------------------------------------------------------------------------------
+# Función: _extremos
+# Descripción:
+#   Divide la señal en `cubetas` tramos consecutivos de igual longitud (el
+#   último se completa repitiendo la última muestra) y localiza el mínimo y el
+#   máximo de cada tramo.
+# Salidas:
+#   - Tupla (índices de los mínimos, índices de los máximos), uno por tramo.
+# ------------------------------------------------------------------------------
+def _extremos(senal, cubetas):
+    n = len(senal)
+    largo = -(-n // cubetas)
+    cubetas = -(-n // largo)
+    bloques = np.pad(senal, (0, cubetas * largo - n), mode="edge").reshape(cubetas, largo)
+    base = np.arange(cubetas) * largo
+    return (np.minimum(base + bloques.argmin(axis=1), n - 1),
+            np.minimum(base + bloques.argmax(axis=1), n - 1))
+
+# ------------------------------------------------------------------------------
+# Función: diezmar
+# Descripción:
+#   Reduce una señal para graficarla con `ancho` píxeles horizontales: de cada
+#   tramo de muestras que cae en un píxel se conservan el mínimo y el máximo, en
+#   su orden original, de modo que los picos siguen visibles.
+# Entradas:
+#   - senal: lista o array con la señal.
+#   - ancho: número de píxeles (tramos) del eje horizontal.
+# Salidas:
+#   - Tupla (índices de las muestras conservadas, valores). Si la señal ya tiene
+#     como mucho 2 * ancho muestras se devuelve completa.
+# ------------------------------------------------------------------------------
+def diezmar(senal, ancho):
+    senal = np.asarray(senal, dtype=float)
+    if len(senal) <= 2 * ancho:
+        return np.arange(len(senal)), senal
+
+    indices = np.sort(np.stack(_extremos(senal, ancho), axis=1), axis=1).ravel()
+    return indices, senal[indices]
+
+# ------------------------------------------------------------------------------
+# Función: _lienzo
+# Descripción:
+#   Devuelve una figura de matplotlib con lienzo Agg (no interactivo) del tamaño
+#   indicado, vacía y lista para dibujar. Cada proceso crea una sola figura por
+#   tamaño y la reutiliza en las siguientes imágenes, sin pasar por pyplot.
+# ------------------------------------------------------------------------------
+def _lienzo(tamano):
+    if tamano not in _LIENZOS:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figura = Figure(figsize=tamano, dpi=DPI)
+        FigureCanvasAgg(figura)
+        _LIENZOS[tamano] = figura
+    figura = _LIENZOS[tamano]
+    figura.clear()
+    return figura
+
+# ------------------------------------------------------------------------------
+# Función: figura
+# Descripción:
+#   Describe una imagen a dibujar con renderizar(): un archivo y uno o más
+#   paneles apilados verticalmente. Las señales se diezman aquí, de modo que al
+#   enviar la descripción a otro proceso solo viajan unos miles de puntos.
+# Entradas:
+#   - archivo: ruta del PNG.
+#   - paneles: lista de tuplas (título, series, leyenda), donde series es una
+#     lista de (señal, opciones de plot) y leyenda indica si se muestra.
+# Salidas:
+#   - Diccionario con "archivo" y "paneles" (series ya diezmadas como (x, y,
+#     opciones)).
+# ------------------------------------------------------------------------------
+def figura(archivo, paneles):
+    ancho = TAMANO_PANEL[0] * DPI
+    return {
+        "archivo": archivo,
+        "paneles": [(titulo, [(*diezmar(senal, ancho), opciones) for senal, opciones in series], leyenda)
+                    for titulo, series, leyenda in paneles],
+    }
+
+# ------------------------------------------------------------------------------
+# Función: renderizar
+# Descripción:
+#   Dibuja y guarda una figura descrita por figura(), usando el lienzo Agg del
+#   proceso actual.
+# Salidas:
+#   - Ruta del archivo guardado.
+# ------------------------------------------------------------------------------
+def renderizar(descripcion):
+    paneles = descripcion["paneles"]
+    lienzo = _lienzo((TAMANO_PANEL[0], TAMANO_PANEL[1] * len(paneles)))
+    ejes = lienzo.subplots(len(paneles), 1, sharex=True, squeeze=False)[:, 0]
+
+    for eje, (titulo, series, leyenda) in zip(ejes, paneles):
+        for x, y, opciones in series:
+            eje.plot(x, y, **opciones)
+        eje.set_title(titulo)
+        eje.grid(True)
+        if leyenda:
+            eje.legend()
+
+    if len(paneles) > 1:
+        lienzo.tight_layout()
+    lienzo.savefig(descripcion["archivo"])
+    return descripcion["archivo"]
+
+# ------------------------------------------------------------------------------
+# Función: renderizar_todas
+# Descripción:
+#   Dibuja varias figuras; con un ejecutor (por ejemplo, un ProcessPoolExecutor)
+#   cada figura se dibuja en un proceso del grupo, en paralelo.
+# Salidas:
+#   - Lista con las rutas de los archivos guardados.
+# ------------------------------------------------------------------------------
+def renderizar_todas(figuras, ejecutor=None):
+    if ejecutor is None:
+        return [renderizar(descripcion) for descripcion in figuras]
+    return list(ejecutor.map(renderizar, figuras))
 
 # ------------------------------------------------------------------------------
 # Función: graficar_todo
@@ -17,35 +146,24 @@ from matplotlib import pyplot as plt    # Librería de gráficos 2D
 #   - original: lista o array con los datos crudos.
 #   - filtrada: lista o array con la señal ya procesada.
 #   - nombre_archivo: ruta del archivo de entrada, se usa para nombrar las imágenes.
+#   - ejecutor: ejecutor opcional donde dibujar las tres imágenes en paralelo.
 # ------------------------------------------------------------------------------
-def graficar_todo(original, filtrada, nombre_archivo):
+def graficar_todo(original, filtrada, nombre_archivo, ejecutor=None):
     prefijo = os.path.splitext(os.path.basename(nombre_archivo))[0]
 
-    # Señal original
-    plt.figure(figsize=(10, 4))
-    plt.plot(original, label="Original", color='blue')
-    plt.title("Señal Original")
-    plt.grid(True)
-    plt.savefig(f"{prefijo}_original.png")
-    plt.close()
-
-    # Señal filtrada
-    plt.figure(figsize=(10, 4))
-    plt.plot(filtrada, label="Filtrada", color='green')
-    plt.title("Señal Filtrada")
-    plt.grid(True)
-    plt.savefig(f"{prefijo}_filtrada.png")
-    plt.close()
-
-    # Superposición
-    plt.figure(figsize=(10, 4))
-    plt.plot(original, label="Original", alpha=0.6)
-    plt.plot(filtrada, label="Filtrada", alpha=0.7)
-    plt.title("Superposición de Señales")
-    plt.legend()
-    plt.grid(True)
-    plt.savefig(f"{prefijo}_comparacion.png")
-    plt.close()
+    figuras = [
+        # Señal original
+        figura(f"{prefijo}_original.png",
+               [("Señal Original", [(original, {"label": "Original", "color": "blue"})], False)]),
+        # Señal filtrada
+        figura(f"{prefijo}_filtrada.png",
+               [("Señal Filtrada", [(filtrada, {"label": "Filtrada", "color": "green"})], False)]),
+        # Superposición
+        figura(f"{prefijo}_comparacion.png",
+               [("Superposición de Señales", [(original, {"label": "Original", "alpha": 0.6}),
+                                              (filtrada, {"label": "Filtrada", "alpha": 0.7})], True)]),
+    ]
+    renderizar_todas(figuras, ejecutor)
 
 # ------------------------------------------------------------------------------
 # Función: graficar_filtro
@@ -61,14 +179,29 @@ def graficar_todo(original, filtrada, nombre_archivo):
 def graficar_filtro(original, filtrada, nombre_archivo, etiqueta):
     prefijo = os.path.splitext(os.path.basename(nombre_archivo))[0]
 
-    plt.figure(figsize=(10, 4))
-    plt.plot(original, label="Original", alpha=0.5)
-    plt.plot(filtrada, label=etiqueta, alpha=0.7)
-    plt.title(f"Filtro {etiqueta}")
-    plt.legend()
-    plt.grid(True)
-    plt.savefig(f"{prefijo}_{etiqueta.lower()}.png")
-    plt.close()
+    renderizar(figura(f"{prefijo}_{etiqueta.lower()}.png",
+                      [(f"Filtro {etiqueta}", [(original, {"label": "Original", "alpha": 0.5}),
+                                               (filtrada, {"label": etiqueta, "alpha": 0.7})], True)]))
+
+# ------------------------------------------------------------------------------
+# Función: graficar_panel
+# Descripción:
+#   Genera una sola imagen con un panel por señal filtrada, cada uno superpuesto
+#   a la original y con el eje horizontal compartido.
+# Entradas:
+#   - original: datos sin filtrar.
+#   - filtradas: diccionario {etiqueta: señal filtrada}, en el orden de los paneles.
+#   - nombre_archivo: nombre del archivo de entrada original.
+# Salidas:
+#   - Imagen <prefijo>_panel.png.
+# ------------------------------------------------------------------------------
+def graficar_panel(original, filtradas, nombre_archivo):
+    prefijo = os.path.splitext(os.path.basename(nombre_archivo))[0]
+
+    renderizar(figura(f"{prefijo}_panel.png",
+                      [(etiqueta, [(original, {"label": "Original", "alpha": 0.5}),
+                                   (filtrada, {"label": etiqueta, "alpha": 0.7})], True)
+                       for etiqueta, filtrada in filtradas.items()]))
 
 # ------------------------------------------------------------------------------
 # Función: terminal
@@ -82,17 +215,25 @@ def graficar_filtro(original, filtrada, nombre_archivo, etiqueta):
 # Notas:
 #   - Inspirado en representaciones tipo "sparkline" comúnmente usadas en UNIX y Python.
 #     No basado en una librería específica, desarrollado desde cero.
+#   - Cada columna resume un tramo de muestras con su mínimo y su máximo: los
+#     niveles entre ambos se dibujan con '█' y los que quedan por debajo del
+#     mínimo con '░', así que los picos en cualquier dirección no se pierden.
 # ------------------------------------------------------------------------------
 def terminal(senal, ancho=60, alto=10):
-    import numpy as np
-
-    senal = np.array(senal)
+    senal = np.asarray(senal, dtype=float)
     senal_norm = (senal - np.min(senal)) / (np.max(senal) - np.min(senal) + 1e-8)
-    senal_reducida = senal_norm[::max(1, len(senal) // ancho)]
+    i_min, i_max = _extremos(senal_norm, min(ancho, len(senal_norm)))
+    minimos, maximos = senal_norm[i_min], senal_norm[i_max]
 
     for nivel in reversed(range(alto)):
         linea = ''
         umbral = nivel / (alto - 1)
-        for valor in senal_reducida:
-            linea += '█' if valor >= umbral else ' '
-        print(linea)
\ No newline at end of file
+        siguiente = (nivel + 1) / (alto - 1)
+        for bajo, alto_columna in zip(minimos, maximos):
+            if alto_columna < umbral:
+                linea += ' '
+            elif bajo < siguiente:
+                linea += '█'
+            else:
+                linea += '░'
+        print(linea)
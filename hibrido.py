@@ -1,47 +1,247 @@
+import itertools
+import time
+
+from collections import deque
+
 import numpy as np
 
-from genetico import AlgoritmoGenetico
+from scipy.fft import rfft
+from scipy.optimize import minimize
+
+from genetico import AlgoritmoGenetico, Presupuesto
 from montecarlo import EvaluadorMonteCarlo
 
+# ------------------------------------------------------------------------------
+# Clase: FitnessHibrido
+# Descripción:
+#   Función fitness de FiltroHibrido definida como clase a nivel de módulo para
+#   que pueda serializarse y evaluarse en otros procesos.
+# ------------------------------------------------------------------------------
+class FitnessHibrido:
+    def __init__(self, señales):
+        self.señales = señales
+        self.evaluador = EvaluadorMonteCarlo(señales[0])
+
+    def __call__(self, pesos):
+        pesos = np.abs(pesos)
+        pesos /= np.sum(pesos)
+        mezcla = sum(w * s for w, s in zip(pesos, self.señales))
+        return self.evaluador.puntuar(mezcla)
+
+# ------------------------------------------------------------------------------
+# Clase: MezclaPrecalculada
+# Descripción:
+#   Evalúa en lote muchas combinaciones convexas de un mismo conjunto de señales
+#   sin recalcular la FFT de cada mezcla. Como la FFT, la segunda diferencia y la
+#   covarianza son lineales (o cuadráticas) en los pesos, basta precalcularlas
+#   una vez por señal:
+#     - espectro de la mezcla = ∑ wᵢ · rfft(señalᵢ)
+#     - segunda diferencia    = ∑ wᵢ · diff(señalᵢ, 2)
+#     - varianza              = wᵀ · Cov · w
+#   Solo la entropía del histograma necesita la mezcla en el dominio del tiempo.
+#
+# Métodos:
+#   - __init__(señales):
+#       Precalcula espectros, segundas diferencias y la matriz de covarianza.
+#
+#   - puntuar(pesos):
+#       Recibe un arreglo (candidatos, n_señales) de pesos ya normalizados y
+#       devuelve el puntaje de EvaluadorMonteCarlo de cada mezcla respecto a
+#       señales[0]. Procesa los candidatos por bloques para acotar la memoria.
+# ------------------------------------------------------------------------------
+class MezclaPrecalculada:
+    elementos_por_bloque = 2 ** 22  # Tamaño máximo de cada bloque de mezclas
+
+    def __init__(self, señales):
+        self.señales = np.asarray(señales, dtype=float)
+        self.evaluador = EvaluadorMonteCarlo(self.señales[0])
+        self.espectros = rfft(self.señales, axis=1)
+        self.segundas = np.diff(self.señales, 2, axis=1)
+        self.covarianza = np.atleast_2d(np.cov(self.señales, bias=True))
+
+    def puntuar(self, pesos):
+        pesos = np.atleast_2d(pesos)
+        bloque = max(1, self.elementos_por_bloque // self.señales.shape[1])
+        puntajes = np.empty(len(pesos))
+
+        for i in range(0, len(pesos), bloque):
+            w = pesos[i:i + bloque]
+            puntajes[i:i + bloque] = self.evaluador.combinar(
+                self.evaluador.puntaje_espectral(np.abs(w @ self.espectros)),
+                np.sum(np.abs(w @ self.segundas), axis=1),
+                self.evaluador.entropia(w @ self.señales),
+                np.einsum("gi,ij,gj->g", w, self.covarianza, w),
+            )
+        return puntajes
+
+# ------------------------------------------------------------------------------
+# Función: rejilla_simplex
+# Descripción:
+#   Genera todos los vectores de pesos no negativos que suman 1 con paso
+#   1/resolucion (rejilla regular sobre el símplex).
+# Entradas:
+#   - dimension: número de señales a combinar.
+#   - resolucion: número de divisiones de cada peso.
+# Salidas:
+#   - Arreglo (puntos, dimension) con los pesos.
+# ------------------------------------------------------------------------------
+def rejilla_simplex(dimension, resolucion):
+    puntos = []
+    for cortes in itertools.combinations(range(resolucion + dimension - 1), dimension - 1):
+        limites = (-1,) + cortes + (resolucion + dimension - 1,)
+        puntos.append([limites[i + 1] - limites[i] - 1 for i in range(dimension)])
+    return np.array(puntos, dtype=float) / resolucion
+
 # ------------------------------------------------------------------------------
 # Clase: FiltroHibrido
 # Descripción:
 #   Implementa una combinación ponderada de varias señales filtradas (por ejemplo,
-#   Kalman, ARIMA, mediana), ajustando automáticamente los pesos óptimos mediante
-#   evolución diferencial.
+#   Kalman, ARIMA, mediana), ajustando automáticamente los pesos óptimos.
 #
 # Métodos:
-#   - __init__(señales):
+#   - __init__(señales, ejecutor=None, semilla=None, metodo="simplex", resolucion=20,
+#              inicial=None, presupuesto=None):
 #       Recibe una lista de señales filtradas (arrays NumPy) que se desean combinar.
+#       metodo elige cómo se buscan los pesos: "simplex" (rejilla densa sobre el
+#       símplex evaluada en lote y refinamiento local) o "evolutivo" (evolución
+#       diferencial). Opcionalmente, un ejecutor para evaluar la población en
+#       paralelo y la semilla de la evolución diferencial. inicial son pesos
+#       opcionales (por ejemplo, los de un segmento anterior) que se añaden como
+#       candidato a la rejilla o a la población inicial. presupuesto
+#       (genetico.Presupuesto) limita la evolución diferencial; por defecto,
+#       presupuesto_defecto (parada tras 10 generaciones sin mejora). Con
+#       "simplex" solo se respeta su límite de tiempo (ver Notas).
 #
 #   - ejecutar():
 #       Realiza la combinación de las señales mediante una mezcla ponderada.
-#       Los pesos de mezcla se optimizan utilizando una estrategia evolutiva para
-#       minimizar una función de evaluación espectro-temporal basada en Monte Carlo.
-#       Devuelve la señal combinada optimizada.
+#       Los pesos de mezcla se optimizan para minimizar una función de
+#       evaluación espectro-temporal basada en Monte Carlo.
+#       Devuelve la señal combinada optimizada; los pesos quedan en self.pesos.
 #
 # Detalles del algoritmo:
 #   - Los pesos son restringidos a ser positivos y normalizados para sumar 1.
 #   - La señal combinada se calcula como suma ponderada: ∑(wᵢ * señalᵢ).
 #   - La evaluación se hace con respecto a la primera señal (señales[0]) como base.
+#   - En el método "simplex" se evalúan de una vez todos los puntos de la
+#     rejilla con MezclaPrecalculada y el mejor se refina con Nelder-Mead, usando
+#     la misma parametrización |w| / ∑|w| que la evolución diferencial.
 #
 # Notas:
 #   - Aunque el método usa el nombre "genético", internamente emplea evolución
 #     diferencial por su eficacia en espacios de búsqueda continuos.
+#   - La rejilla del método "simplex" se evalúa siempre completa (es un solo
+#     lote); si el tiempo del presupuesto se agota, el refinamiento con
+#     Nelder-Mead se omite o se detiene y se devuelve el mejor punto hallado.
+#     Los límites de evaluaciones y paciencia solo aplican a "evolutivo".
 # ------------------------------------------------------------------------------
 class FiltroHibrido:
-    def __init__(self, señales):
+    presupuesto_defecto = Presupuesto(paciencia=10)
+
+    def __init__(self, señales, ejecutor=None, semilla=None, metodo="simplex", resolucion=20,
+                 inicial=None, presupuesto=None):
         self.señales = señales
+        self.ejecutor = ejecutor
+        self.semilla = semilla
+        self.metodo = metodo
+        self.resolucion = resolucion
+        self.inicial = inicial
+        self.presupuesto = presupuesto if presupuesto is not None else self.presupuesto_defecto
+        self.pesos = None
 
     def ejecutar(self):
-        def fitness(pesos):
-            pesos = np.abs(pesos)
-            pesos /= np.sum(pesos)
-            mezcla = sum(w * s for w, s in zip(pesos, self.señales))
-            return EvaluadorMonteCarlo.evaluar(self.señales[0], mezcla)
-
-        genetico = AlgoritmoGenetico(bounds=[(0, 1)] * len(self.señales))
-        pesos_opt = genetico.optimizar(fitness)
+        if self.metodo == "simplex":
+            pesos_opt = self._pesos_simplex()
+        elif self.metodo == "evolutivo":
+            genetico = AlgoritmoGenetico(bounds=[(0, 1)] * len(self.señales), ejecutor=self.ejecutor,
+                                         semilla=self.semilla, inicial=self.inicial,
+                                         presupuesto=self.presupuesto)
+            pesos_opt = genetico.optimizar(FitnessHibrido(self.señales))
+        else:
+            raise ValueError(f"Método de combinación desconocido: {self.metodo}")
+
         pesos_opt = np.abs(pesos_opt)
         pesos_opt /= np.sum(pesos_opt)
+        self.pesos = pesos_opt
         return sum(w * s for w, s in zip(pesos_opt, self.señales))
+
+    def _pesos_simplex(self):
+        mezcla = MezclaPrecalculada(self.señales)
+
+        # Búsqueda global: todos los puntos de la rejilla en un solo lote
+        rejilla = rejilla_simplex(len(self.señales), self.resolucion)
+        if self.inicial is not None:
+            rejilla = np.vstack([rejilla, self.inicial])
+        puntajes = mezcla.puntuar(rejilla)
+        mejor = rejilla[int(np.argmin(puntajes))]
+        fin = self.presupuesto.fin_desde(time.time())
+        if fin is not None and time.time() >= fin:
+            return mejor
+
+        # Refinamiento local alrededor del mejor punto de la rejilla
+        def objetivo(v):
+            w = np.abs(v)
+            total = np.sum(w)
+            return mezcla.puntuar(w / total)[0] if total > 0 else np.inf
+
+        def vigilar(intermediate_result):
+            if fin is not None and time.time() >= fin:
+                raise StopIteration
+
+        paso = 1.0 / self.resolucion
+        simplex_inicial = np.vstack([mejor] + [mejor + paso * e for e in np.eye(len(mejor))])
+        local = minimize(objetivo, mejor, method="Nelder-Mead", callback=vigilar,
+                         options={"initial_simplex": simplex_inicial, "xatol": 1e-6, "fatol": 1e-12})
+        return local.x if local.fun < np.min(puntajes) else mejor
+
+# ------------------------------------------------------------------------------
+# Clase: FiltroHibridoFlujo
+# Descripción:
+#   Versión en flujo de la combinación ponderada: recibe muestras crudas, las pasa
+#   por varios filtros en flujo (por ejemplo, FiltroKalman y FiltroMediana) y
+#   emite ∑(wᵢ * salidaᵢ) con pesos fijos, alineando las salidas de filtros con
+#   distinta latencia.
+#
+# Métodos:
+#   - __init__(filtros, pesos):
+#       filtros es una lista de objetos con actualizar_bloque(), finalizar() y
+#       latencia; pesos se normaliza para sumar 1.
+#
+#   - actualizar(muestra) / actualizar_bloque(bloque):
+#       Procesan una muestra o un bloque y devuelven las salidas combinadas que
+#       ya están disponibles en todos los filtros.
+#
+#   - finalizar():
+#       Vacía los filtros al terminar el flujo y devuelve las salidas restantes.
+#
+# Notas:
+#   - La latencia total es la máxima de los filtros; la memoria es constante
+#     (acotada por esa latencia), independientemente de la longitud del flujo.
+# ------------------------------------------------------------------------------
+class FiltroHibridoFlujo:
+    def __init__(self, filtros, pesos):
+        pesos = np.abs(np.asarray(pesos, dtype=float))
+        self.filtros = filtros
+        self.pesos = pesos / np.sum(pesos)
+        self.latencia = max(filtro.latencia for filtro in filtros)
+        self.pendientes = [deque() for _ in filtros]
+
+    def _combinar(self):
+        listas = min(len(cola) for cola in self.pendientes)
+        salida = np.zeros(listas)
+        for peso, cola in zip(self.pesos, self.pendientes):
+            salida += peso * np.array([cola.popleft() for _ in range(listas)])
+        return salida
+
+    def actualizar(self, muestra):
+        salida = self.actualizar_bloque([muestra])
+        return salida[0] if len(salida) else None
+
+    def actualizar_bloque(self, bloque):
+        for filtro, cola in zip(self.filtros, self.pendientes):
+            cola.extend(filtro.actualizar_bloque(bloque))
+        return self._combinar()
+
+    def finalizar(self):
+        for filtro, cola in zip(self.filtros, self.pendientes):
+            cola.extend(filtro.finalizar())
+        return self._combinar()
@@ -0,0 +1,163 @@
+# Autor: Gutierrez Chavero David
+# Este módulo contiene el registro de tiempos y contadores de las rutas
+# críticas (evaluaciones de fitness, aplicar() de los filtros y el evaluador
+# Monte Carlo) que se vuelca en el reporte de --perfil.
+
+import importlib  # Importación diferida de los módulos instrumentados.
+import json       # Reporte de ejecución.
+import os         # Identificador del proceso que ejecuta cada tarea.
+import time       # Medición de tiempos.
+
+from functools import wraps
+
+# ------------------------------------------------------------------------------
+# Lista: OBJETIVOS
+# Descripción:
+#   Métodos que activar() envuelve con medición de tiempo: (módulo, clase,
+#   método). Se importan solo al activar la instrumentación.
+# ------------------------------------------------------------------------------
+OBJETIVOS = (
+    ("filtro_kalman", "FiltroKalman", "aplicar"),
+    ("filtro_kalman", "FiltroKalmanLote", "aplicar"),
+    ("filtro_kalman", "FiltroKalmanEstacionario", "aplicar"),
+    ("filtro_mediana", "FiltroMediana", "aplicar"),
+    ("filtro_arima", "FiltroARIMA", "aplicar"),
+    ("filtro_arima", "AjusteARIMA", "cribar"),
+    ("filtro_arima", "AjusteARIMA", "ajustar"),
+    ("montecarlo", "EvaluadorMonteCarlo", "evaluar"),
+    ("montecarlo", "EvaluadorMonteCarlo", "puntuar"),
+    ("montecarlo", "EvaluadorMonteCarlo", "puntuar_lote"),
+)
+
+# ------------------------------------------------------------------------------
+# Clase: Registro
+# Descripción:
+#   Acumula, por nombre, el número de llamadas y los segundos de reloj
+#   empleados.
+#
+# Métodos:
+#   - agregar(nombre, llamadas, segundos): suma una medición.
+#   - envolver(nombre, funcion): devuelve funcion con medición de cada llamada.
+#   - instantanea() / diferencia(antes): copia de los contadores y lo
+#     acumulado desde una copia anterior.
+#   - incorporar(delta): suma contadores medidos en otro proceso.
+#   - resumen(): diccionario {nombre: {"llamadas", "segundos"}} ordenado por
+#     tiempo acumulado.
+#
+# Notas:
+#   - Los tiempos son inclusivos: si un método medido llama a otro, el tiempo
+#     del segundo también cuenta en el primero.
+# ------------------------------------------------------------------------------
+class Registro:
+    def __init__(self):
+        self.activo = False
+        self.contadores = {}
+
+    def agregar(self, nombre, llamadas, segundos):
+        contador = self.contadores.setdefault(nombre, [0, 0.0])
+        contador[0] += llamadas
+        contador[1] += segundos
+
+    def envolver(self, nombre, funcion):
+        @wraps(funcion)
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                self.agregar(nombre, 1, time.perf_counter() - inicio)
+        medida.original = funcion
+        return medida
+
+    def instantanea(self):
+        return {nombre: list(contador) for nombre, contador in self.contadores.items()}
+
+    def diferencia(self, antes):
+        return {nombre: [llamadas - antes.get(nombre, [0, 0.0])[0], segundos - antes.get(nombre, [0, 0.0])[1]]
+                for nombre, (llamadas, segundos) in self.contadores.items()}
+
+    def incorporar(self, delta):
+        for nombre, (llamadas, segundos) in delta.items():
+            self.agregar(nombre, llamadas, segundos)
+
+    def resumen(self):
+        orden = sorted(self.contadores.items(), key=lambda item: -item[1][1])
+        return {nombre: {"llamadas": llamadas, "segundos": segundos} for nombre, (llamadas, segundos) in orden}
+
+
+REGISTRO = Registro()
+
+# ------------------------------------------------------------------------------
+# Función: activar
+# Descripción:
+#   Activa la instrumentación en el proceso actual: envuelve los métodos de
+#   OBJETIVOS y hace que genetico.AlgoritmoGenetico mida sus evaluaciones de
+#   fitness. Llamarla varias veces no tiene efecto adicional.
+# Notas:
+#   - Mientras no se activa, los métodos originales quedan intactos, así que
+#     la instrumentación no añade costo alguno.
+# ------------------------------------------------------------------------------
+def activar():
+    if REGISTRO.activo:
+        return
+    REGISTRO.activo = True
+    for modulo, nombre_clase, metodo in OBJETIVOS:
+        clase = getattr(importlib.import_module(modulo), nombre_clase)
+        original = clase.__dict__[metodo]
+        nombre = f"{nombre_clase}.{metodo}"
+        if isinstance(original, staticmethod):
+            setattr(clase, metodo, staticmethod(REGISTRO.envolver(nombre, original.__func__)))
+        else:
+            setattr(clase, metodo, REGISTRO.envolver(nombre, original))
+
+# ------------------------------------------------------------------------------
+# Función: llamar_medido
+# Descripción:
+#   Ejecuta funcion(*argumentos) y devuelve también lo que se acumuló en el
+#   registro durante la llamada. Sirve de envoltura para las tareas enviadas a
+#   un ejecutor de procesos, cuyos contadores de otro modo se perderían.
+# Entradas:
+#   - funcion, argumentos: tarea a ejecutar.
+#   - activo: si es True, activa la instrumentación en el proceso que ejecuta
+#     la tarea.
+# Salidas:
+#   - Tupla (resultado, contadores acumulados, pid del proceso). Quien recibe
+#     el resultado debe llamar a incorporar() solo si el pid es distinto del
+#     suyo, para no contar dos veces lo medido en su propio proceso.
+# ------------------------------------------------------------------------------
+def llamar_medido(funcion, argumentos, activo):
+    if activo:
+        activar()
+    antes = REGISTRO.instantanea()
+    resultado = funcion(*argumentos)
+    return resultado, REGISTRO.diferencia(antes), os.getpid()
+
+# ------------------------------------------------------------------------------
+# Función: recibir_medido
+# Descripción:
+#   Contraparte de llamar_medido en el proceso que recibe el resultado: suma
+#   los contadores si la tarea corrió en otro proceso y devuelve el resultado.
+# ------------------------------------------------------------------------------
+def recibir_medido(medido):
+    resultado, delta, pid = medido
+    if pid != os.getpid():
+        REGISTRO.incorporar(delta)
+    return resultado
+
+# ------------------------------------------------------------------------------
+# Función: escribir_reporte
+# Descripción:
+#   Guarda el reporte de ejecución de --perfil en JSON.
+# Entradas:
+#   - ruta: archivo de salida.
+#   - duracion: segundos totales de la ejecución.
+#   - secciones: datos adicionales de la ejecución (argumentos, parámetros
+#     elegidos, reportes de los optimizadores, línea de tiempo...).
+# Salidas:
+#   - Archivo JSON con "duracion", "llamadas" (resumen del registro) y las
+#     secciones dadas.
+# ------------------------------------------------------------------------------
+def escribir_reporte(ruta, duracion, **secciones):
+    reporte = {"duracion": duracion, "llamadas": REGISTRO.resumen(), **secciones}
+    with open(ruta, "w") as f:
+        json.dump(reporte, f, indent=2, default=float)
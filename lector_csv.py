@@ -1,6 +1,71 @@
-import pandas as pd
+import json
+import os
+
 import numpy as np
 
+# ------------------------------------------------------------------------------
+# Función: ruta_cache
+# Descripción:
+#   Construye la ruta del archivo .npy auxiliar (sidecar) donde se guarda la
+#   columna extraída de un CSV para un rango de filas dado.
+# Entradas:
+#   - archivo, fila, columna, final: mismos argumentos que cargar_csv.
+# Salidas:
+#   - Ruta del .npy; los metadatos de validación se guardan junto a él con
+#     extensión .json.
+# ------------------------------------------------------------------------------
+def ruta_cache(archivo, fila, columna, final):
+    return f"{archivo}.col{columna}_fila{fila}_final{final or 'fin'}.npy"
+
+# ------------------------------------------------------------------------------
+# Función: _firma_archivo
+# Descripción:
+#   Devuelve la fecha de modificación (ns) y el tamaño del CSV de origen, que
+#   invalidan la caché cuando cambian.
+# ------------------------------------------------------------------------------
+def _firma_archivo(archivo):
+    estado = os.stat(archivo)
+    return {"mtime_ns": estado.st_mtime_ns, "tamano": estado.st_size}
+
+def _leer_cache(ruta, archivo):
+    try:
+        with open(ruta + ".json") as f:
+            firma = json.load(f)
+        if firma != _firma_archivo(archivo):
+            return None
+        return np.load(ruta, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+def _escribir_cache(ruta, archivo, datos):
+    # Escritura atómica: primero a temporales y luego se renombran
+    try:
+        np.save(ruta + ".tmp.npy", datos)
+        os.replace(ruta + ".tmp.npy", ruta)
+        with open(ruta + ".json.tmp", "w") as f:
+            json.dump(_firma_archivo(archivo), f)
+        os.replace(ruta + ".json.tmp", ruta + ".json")
+    except OSError:
+        pass  # Directorio de solo lectura: se continúa sin caché
+
+# ------------------------------------------------------------------------------
+# Función: _indices_positivos
+# Descripción:
+#   Convierte los índices de columna negativos (contados desde la última, como
+#   en iloc) en positivos según el ancho del encabezado, ya que usecols solo
+#   acepta índices positivos.
+# Salidas:
+#   - Lista de índices no negativos, en el mismo orden.
+# ------------------------------------------------------------------------------
+def _indices_positivos(archivo, fila, columnas):
+    if all(columna >= 0 for columna in columnas):
+        return list(columnas)
+    ancho = len(nombres_columnas(archivo, fila))
+    for columna in columnas:
+        if columna < -ancho:
+            raise IndexError(f"La columna {columna} no existe: {archivo} tiene {ancho} columnas")
+    return [columna % ancho for columna in columnas]
+
 # ------------------------------------------------------------------------------
 # Función: cargar_csv
 # Descripción:
@@ -9,12 +74,95 @@ import numpy as np
 # Entradas:
 #   - archivo: ruta al archivo CSV.
 #   - fila: número de fila inicial a partir de la cual comenzar la lectura.
-#   - columna: índice de la columna que contiene los datos deseados.
+#   - columna: índice de la columna que contiene los datos deseados (los
+#     negativos cuentan desde la última, como en iloc).
 #   - final: número de fila final a utilizar (opcional; si es None o 0, se usa hasta el final).
+#   - cache: si es True, guarda la columna extraída en un .npy auxiliar y lo
+#     reutiliza en ejecuciones posteriores.
 # Salidas:
-#   - Un arreglo numpy (float32) con los datos extraídos.
+#   - Un arreglo numpy (float32) con los datos extraídos. Cuando proviene de la
+#     caché es un arreglo de solo lectura mapeado en memoria (np.memmap).
+# Notas:
+#   - Solo se analiza la columna pedida (usecols) y se detiene la lectura en la
+#     fila final (nrows), sin construir el DataFrame completo.
+#   - La caché se invalida si cambia la fecha de modificación o el tamaño del CSV.
+# ------------------------------------------------------------------------------
+def cargar_csv(archivo, fila, columna, final, cache=True):
+    return cargar_columnas(archivo, fila, [columna], final, cache=cache)[columna]
+
 # ------------------------------------------------------------------------------
-def cargar_csv(archivo, fila, columna, final):
-    df = pd.read_csv(archivo, skiprows=fila)
-    datos = df.iloc[:final, columna].values if final else df.iloc[:, columna].values
-    return datos.astype(np.float32)
+# Función: cargar_columnas
+# Descripción:
+#   Igual que cargar_csv, pero extrae varias columnas del mismo archivo con una
+#   sola lectura del CSV.
+# Entradas:
+#   - archivo, fila, final, cache: ver cargar_csv.
+#   - columnas: lista de índices de columna.
+# Salidas:
+#   - Diccionario {columna: arreglo numpy (float32)}.
+# Notas:
+#   - Las columnas que ya tienen .npy auxiliar válido no se vuelven a leer; las
+#     demás se extraen juntas en una única pasada (usecols).
+# ------------------------------------------------------------------------------
+def cargar_columnas(archivo, fila, columnas, final, cache=True):
+    datos = {}
+    faltantes = []
+    for columna in dict.fromkeys(columnas):
+        guardados = _leer_cache(ruta_cache(archivo, fila, columna, final), archivo) if cache else None
+        if guardados is None:
+            faltantes.append(columna)
+        else:
+            datos[columna] = guardados
+    if not faltantes:
+        return datos
+
+    import pandas as pd  # Solo se importa si hay que leer el CSV (sin .npy válido)
+
+    indices = dict(zip(faltantes, _indices_positivos(archivo, fila, faltantes)))
+    usecols = sorted(set(indices.values()))
+    if final and final < 0:
+        # Un final negativo recorta desde el final: requiere leer toda la columna
+        df = pd.read_csv(archivo, skiprows=fila, usecols=usecols).iloc[:final]
+    else:
+        df = pd.read_csv(archivo, skiprows=fila, usecols=usecols, nrows=final or None)
+
+    # usecols devuelve las columnas en el orden en que aparecen en el archivo
+    por_indice = dict(zip(usecols, df.columns))
+    for columna in faltantes:
+        datos[columna] = df[por_indice[indices[columna]]].to_numpy(dtype=np.float32)
+        if cache:
+            _escribir_cache(ruta_cache(archivo, fila, columna, final), archivo, datos[columna])
+    return datos
+
+# ------------------------------------------------------------------------------
+# Función: nombres_columnas
+# Descripción:
+#   Devuelve los nombres del encabezado del CSV (la línea `fila`) sin leer los
+#   datos.
+# ------------------------------------------------------------------------------
+def nombres_columnas(archivo, fila):
+    import pandas as pd
+
+    return list(pd.read_csv(archivo, skiprows=fila, nrows=0).columns)
+
+# ------------------------------------------------------------------------------
+# Función: iterar_csv
+# Descripción:
+#   Lee una columna de un CSV por bloques, sin cargar el archivo completo en
+#   memoria. Útil para archivos de varios GB o para procesamiento en flujo.
+# Entradas:
+#   - archivo, fila, columna, final: mismos argumentos que cargar_csv (final
+#     debe ser positivo o None).
+#   - tam_bloque: número de filas por bloque.
+# Salidas:
+#   - Generador de arreglos numpy (float32), uno por bloque.
+# ------------------------------------------------------------------------------
+def iterar_csv(archivo, fila, columna, final=None, tam_bloque=100000):
+    import pandas as pd
+
+    columna = _indices_positivos(archivo, fila, [columna])[0]
+    lector = pd.read_csv(archivo, skiprows=fila, usecols=[columna], nrows=final or None,
+                         chunksize=tam_bloque)
+    with lector:
+        for bloque in lector:
+            yield bloque.iloc[:, 0].to_numpy(dtype=np.float32)
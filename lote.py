@@ -0,0 +1,121 @@
+# Autor: Gutierrez Chavero David
+# Este módulo implementa el modo por lotes: filtra varias columnas (canales) de
+# uno o más archivos CSV en una sola invocación. Cada archivo se lee una sola
+# vez, los canales se reparten entre los procesos de un grupo y el resultado se
+# guarda en un único archivo con una columna por canal.
+
+import glob
+import os
+
+from instrumentacion import REGISTRO, llamar_medido, recibir_medido
+from lector_csv import cargar_columnas, nombres_columnas
+from pipeline import procesar_serie
+
+# ------------------------------------------------------------------------------
+# Función: expandir_entradas
+# Descripción:
+#   Expande los patrones glob (por ejemplo, "lineas/*.csv") de una lista de
+#   entradas, conservando el orden y sin repetir archivos.
+# Entradas:
+#   - entradas: lista de rutas o patrones.
+# Salidas:
+#   - Lista de rutas de archivo.
+# ------------------------------------------------------------------------------
+def expandir_entradas(entradas):
+    archivos = []
+    for entrada in entradas:
+        coincidencias = sorted(glob.glob(entrada)) if glob.has_magic(entrada) else [entrada]
+        if not coincidencias:
+            raise FileNotFoundError(f"Ningún archivo coincide con '{entrada}'")
+        archivos.extend(coincidencias)
+    return list(dict.fromkeys(archivos))
+
+# ------------------------------------------------------------------------------
+# Función: nombres_archivos
+# Descripción:
+#   Nombre de cada archivo para formar las claves de sus canales: el nombre sin
+#   extensión, o, si dos archivos de directorios distintos se llaman igual, su
+#   ruta relativa al directorio común (por ejemplo, "a/x" y "b/x").
+# Entradas:
+#   - archivos: lista de rutas sin repetir.
+# Salidas:
+#   - Diccionario {ruta: nombre}, con nombres distintos entre sí.
+# Notas:
+#   - Si aun así dos nombres coinciden (la misma ruta escrita de dos formas),
+#     se añade un sufijo "_2", "_3", ...
+# ------------------------------------------------------------------------------
+def nombres_archivos(archivos):
+    bases = [os.path.splitext(os.path.basename(archivo))[0] for archivo in archivos]
+    if len(set(bases)) == len(bases):
+        return dict(zip(archivos, bases))
+
+    comun = os.path.commonpath([os.path.dirname(os.path.abspath(archivo)) for archivo in archivos])
+    nombres = {}
+    for archivo in archivos:
+        base = os.path.splitext(os.path.relpath(os.path.abspath(archivo), comun))[0]
+        nombre, sufijo = base, 2
+        while nombre in nombres.values():
+            nombre, sufijo = f"{base}_{sufijo}", sufijo + 1
+        nombres[archivo] = nombre
+    return nombres
+
+# ------------------------------------------------------------------------------
+# Función: filtrar_lote
+# Descripción:
+#   Ejecuta el flujo completo (pipeline.procesar_serie) sobre cada canal de
+#   cada archivo.
+# Entradas:
+#   - archivos: lista de rutas CSV.
+#   - columnas: índices de columna a filtrar en cada archivo.
+#   - fila, final, cache: ver lector_csv.cargar_csv.
+#   - opciones: ver pipeline.procesar_serie.
+#   - ejecutor: ejecutor opcional (ver genetico.crear_ejecutor) donde repartir
+#     los canales; con None se procesan en serie.
+# Salidas:
+#   - Diccionario ordenado {"<archivo>_<columna>": (señal filtrada, parámetros)},
+#     con el nombre de archivo de nombres_archivos.
+# Notas:
+#   - Los canales de un archivo se envían al ejecutor en cuanto ese archivo se
+#     ha leído, de modo que la lectura del siguiente se solapa con el cómputo.
+#   - Con ejecutor, la caché de fitness en disco (opciones["ruta_cache"]) se
+#     abre en modo de solo lectura en cada proceso (ver genetico.CacheFitness).
+# ------------------------------------------------------------------------------
+def filtrar_lote(archivos, columnas, fila, final, opciones, ejecutor=None, cache=True):
+    if ejecutor is not None:
+        # Varios procesos no pueden escribir el mismo respaldo de la caché
+        opciones = {**opciones, "cache_solo_lectura": True}
+    pendientes = {}
+    bases = nombres_archivos(archivos)
+    for archivo in archivos:
+        nombres = nombres_columnas(archivo, fila)
+        base = bases[archivo]
+        datos = cargar_columnas(archivo, fila, columnas, final, cache=cache)
+        for columna in columnas:
+            canal = f"{base}_{nombres[columna]}"
+            if ejecutor is None:
+                pendientes[canal] = procesar_serie(datos[columna], opciones)
+            else:
+                pendientes[canal] = ejecutor.submit(llamar_medido, procesar_serie,
+                                                    (datos[columna], opciones), REGISTRO.activo)
+
+    return {canal: resultado if ejecutor is None else recibir_medido(resultado.result())
+            for canal, resultado in pendientes.items()}
+
+# ------------------------------------------------------------------------------
+# Función: guardar_lote
+# Descripción:
+#   Guarda las señales filtradas en un solo archivo, una columna por canal. Los
+#   canales más cortos se completan con valores vacíos (NaN).
+# Entradas:
+#   - resultados: salida de filtrar_lote.
+#   - salida: ruta del archivo; si termina en .parquet se guarda en Parquet
+#     (requiere pyarrow o fastparquet), en otro caso en CSV.
+# ------------------------------------------------------------------------------
+def guardar_lote(resultados, salida):
+    import pandas as pd
+
+    tabla = pd.DataFrame({canal: pd.Series(senal) for canal, (senal, _) in resultados.items()})
+    if salida.endswith(".parquet"):
+        tabla.to_parquet(salida, index=False)
+    else:
+        tabla.to_csv(salida, index=False)
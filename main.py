@@ -3,68 +3,363 @@
 # Este script permite aplicar un filtro híbrido optimizado con lógica difusa a datos de series temporales,
 # particularmente útiles en estudios de magnetometría geofísica.
 # Incluye filtros individuales (Kalman, Mediana, ARIMA), los combina y grafica los resultados.
+# Las dependencias pesadas (pandas, SciPy, statsmodels, matplotlib) se importan
+# dentro de main(), solo en el modo y las etapas que las usan.
 
 import argparse  # Módulo estándar para análisis de argumentos desde la línea de comandos.
-import pandas as pd  # Librería de análisis de datos.
-import os  # Para manipulación de rutas de archivos.
-
-from lector_csv import cargar_csv
-from filtro_kalman import FiltroKalmanOptimizado
-from filtro_mediana import FiltroMedianaOptimizado
-from filtro_arima import FiltroARIMAOptimizado
-from hibrido import FiltroHibrido
-from graficas import graficar_todo
-from graficas import graficar_filtro
-from graficas import terminal
-
-# --- Análisis de argumentos por línea de comandos ---
-parser = argparse.ArgumentParser(
-    description="Aplica un filtro con lógica difusa a datos de magnetometría u otras series temporales.\n"
-                "Permite seleccionar la columna, el rango de filas y guarda la señal filtrada."
-)
-parser.add_argument("--entrada", "--ent", type=str, required=True, help="Especifica el archivo CSV con los datos a cargar")
-parser.add_argument("--columna", "--col", type=int, required=True, help="Columna a usar")
-parser.add_argument("--fila", "-f", "--fil", type=int, default=0, help="Fila de inicio")
-parser.add_argument("--filafinal", "--final", type=int, help="Fila final a usar (opcional)")
-parser.add_argument("--salida", "--sal", type=str, default="senal_filtrada.csv", help="Nombre del archivo de salida ([Nombre].cvs)")
-args = parser.parse_args()
-
-# --- Carga de datos desde CSV ---
-# Permite seleccionar rango de filas y una sola columna.
-datos = cargar_csv(args.entrada, args.fila, args.columna, args.filafinal)
-
-# --- Aplicación de filtros individuales ---
-kalman = FiltroKalmanOptimizado(datos)
-senal_kalman = kalman.ejecutar()
-
-mediana = FiltroMedianaOptimizado(datos)
-senal_mediana = mediana.ejecutar()
-
-arima = FiltroARIMAOptimizado(datos)
-senal_arima = arima.ejecutar()
-
-# --- Graficado individual de filtros ---
-# Se generan imágenes comparativas entre la señal original y la salida de cada filtro.
-nombre_base = os.path.splitext(os.path.basename(args.entrada))[0]
-
-graficar_filtro(datos, senal_kalman, args.entrada, "Kalman")
-graficar_filtro(datos, senal_mediana, args.entrada, "Mediana")
-graficar_filtro(datos, senal_arima, args.entrada, "ARIMA")
-
-# --- Aplicación de filtro híbrido con lógica difusa ---
-# Esta clase fue implementada por el autor y combina los filtros anteriores con ponderación lógica.
-hibrido = FiltroHibrido([senal_kalman, senal_mediana, senal_arima])
-senal_final = hibrido.ejecutar()
-
-# --- Guardado del resultado final en archivo CSV ---
-pd.DataFrame({"filtrada": senal_final}).to_csv(args.salida, index=False)
-
-# --- Graficado final de la señal filtrada híbrida ---
-graficar_todo(datos, senal_final, args.entrada)
-
-# --- Finalización y reporte en terminal ---
-print("\n==============================================================\n")
-print("  Filtrado finalizado con éxito.\n")
-terminal(senal_final)
-print("==============================================================\n")
-print(f"Resultados guardados en {args.salida}.")
+import glob  # Patrones de archivos en el modo por lotes.
+import time  # Duración total para el reporte de --perfil.
+
+from instrumentacion import activar, escribir_reporte
+
+# Filtros individuales seleccionables con --filtros y su nombre en pantalla
+ETIQUETAS = {"kalman": "Kalman", "mediana": "Mediana", "arima": "ARIMA"}
+
+
+def main():
+    # --- Análisis de argumentos por línea de comandos ---
+    parser = argparse.ArgumentParser(
+        description="Aplica un filtro con lógica difusa a datos de magnetometría u otras series temporales.\n"
+                    "Permite seleccionar la columna, el rango de filas y guarda la señal filtrada."
+    )
+    parser.add_argument("--entrada", "--ent", type=str, nargs="+", required=True, help="Especifica el archivo CSV con los datos a cargar (\"-\" para la entrada estándar en modo --flujo); con varios archivos o patrones (\"lineas/*.csv\") se activa el modo por lotes")
+    parser.add_argument("--columna", "--col", type=int, nargs="+", required=True, help="Columna a usar; con varias columnas se activa el modo por lotes")
+    parser.add_argument("--fila", "-f", "--fil", type=int, default=0, help="Fila de inicio")
+    parser.add_argument("--filafinal", "--final", type=int, help="Fila final a usar (opcional)")
+    parser.add_argument("--salida", "--sal", type=str, default="senal_filtrada.csv", help="Nombre del archivo de salida ([Nombre].cvs)")
+    parser.add_argument("--sin-cache-csv", action="store_true", help="No crear ni usar el archivo .npy auxiliar con la columna extraída del CSV")
+    parser.add_argument("--cache", type=str, help="Directorio para guardar en disco las evaluaciones de fitness (Mediana y ARIMA)")
+    parser.add_argument("--kalman-estacionario", action="store_true", help="Usa la ganancia de Kalman en estado estacionario (más rápido en series largas)")
+    parser.add_argument("--workers", "--trabajadores", type=int, default=1, help="Número de procesos o hilos para evaluar la población de cada generación")
+    parser.add_argument("--ejecutor", choices=["procesos", "hilos", "serie"], default="procesos", help="Tipo de ejecutor paralelo (por defecto: procesos)")
+    parser.add_argument("--semilla", type=int, help="Semilla del optimizador para resultados reproducibles")
+    parser.add_argument("--limite-tiempo", type=float, metavar="SEGUNDOS", help="Tiempo máximo de las búsquedas de parámetros; al agotarse, cada una se queda con el mejor candidato encontrado")
+    parser.add_argument("--sembrar", action="store_true", help="Con --cache, arranca cada búsqueda desde el óptimo guardado de una ejecución anterior sobre los mismos datos")
+    parser.add_argument("--fidelidad", type=float, nargs="+", metavar="FRACCION", help="Evaluación multifidelidad: fracciones de la serie (entre 0 y 1) de cada nivel; las búsquedas evalúan primero con una fitness sustituta y solo los mejores candidatos sobre la serie completa")
+    parser.add_argument("--sustituto", choices=["ventanas", "prefijo"], default="ventanas", help="Fitness sustituta de --fidelidad: subventanas al azar o tramo inicial de la serie (por defecto: ventanas)")
+    parser.add_argument("--subventanas", type=int, default=8, help="Subventanas por nivel con --sustituto ventanas")
+    parser.add_argument("--verificar-fidelidad", action="store_true", help="Con --fidelidad, repite cada búsqueda con evaluación completa y reporta la diferencia de puntaje del candidato elegido (más del doble de costo)")
+    parser.add_argument("--hibrido", choices=["simplex", "evolutivo"], default="simplex", help="Búsqueda de pesos del híbrido: rejilla sobre el símplex con refinamiento local, o evolución diferencial")
+    parser.add_argument("--tareas", type=int, default=1, help="Procesos para ejecutar las etapas en paralelo (por defecto 1 = en serie); cada tarea crea su propio grupo de --workers, así que se usan hasta tareas × workers procesos")
+    parser.add_argument("--flujo", action="store_true", help="Modo en flujo: filtra muestra a muestra con Kalman y Mediana y parámetros fijos, con memoria constante")
+    parser.add_argument("--seguir", action="store_true", help="En modo --flujo, espera nuevas líneas al llegar al final del archivo (como tail -f)")
+    parser.add_argument("--Q", type=float, help="Covarianza del proceso de Kalman en modo --flujo (por defecto, la de --parametros o 0.01)")
+    parser.add_argument("--R", type=float, help="Varianza de observación de Kalman en modo --flujo (por defecto, la de --parametros o 0.1)")
+    parser.add_argument("--ventana", type=int, help="Ventana de la mediana en modo --flujo (por defecto, la de --parametros o 5)")
+    parser.add_argument("--pesos", type=float, nargs=2, metavar=("KALMAN", "MEDIANA"), help="Pesos de la combinación en modo --flujo (por defecto, los de --parametros o 0.5 0.5)")
+    parser.add_argument("--bloque", type=int, default=64, help="Muestras por bloque en modo --flujo")
+    parser.add_argument("--segmentos", type=int, help="Procesa la serie en ventanas solapadas de esta longitud, en paralelo con --tareas procesos")
+    parser.add_argument("--solape", type=int, help="Muestras de solape entre ventanas con --segmentos (por defecto, 10%% de la ventana)")
+    parser.add_argument("--calentar", action="store_true", help="Con --segmentos, cada ventana arranca desde los parámetros óptimos de la anterior")
+    parser.add_argument("--filtros", nargs="+", choices=list(ETIQUETAS), default=list(ETIQUETAS), help="Filtros individuales a ejecutar y combinar (por defecto: kalman mediana arima)")
+    parser.add_argument("--sin-graficas", action="store_true", help="No genera las imágenes PNG (no importa matplotlib)")
+    parser.add_argument("--panel", action="store_true", help="Guarda además una imagen combinada con un panel por filtro y el híbrido")
+    parser.add_argument("--parametros", type=str, metavar="ARCHIVO.json", help="Aplica los parámetros guardados por una ejecución anterior (archivo .json junto a la salida) sin optimizar")
+    parser.add_argument("--perfil", "--profile", type=str, metavar="REPORTE.json", help="Mide llamadas y tiempos de fitness, filtros y evaluador, y guarda un reporte JSON de la ejecución")
+    args = parser.parse_args()
+
+    # Varios archivos, patrones o columnas activan el modo por lotes
+    lote = len(args.entrada) > 1 or len(args.columna) > 1 or glob.has_magic(args.entrada[0])
+    if lote and (args.flujo or args.segmentos):
+        parser.error("El modo por lotes no se combina con --flujo ni con --segmentos")
+    if args.parametros and (lote or args.segmentos):
+        parser.error("--parametros no se combina con el modo por lotes ni con --segmentos")
+    if args.sembrar and not args.cache:
+        parser.error("--sembrar requiere --cache (directorio donde se guardan los óptimos)")
+    if args.fidelidad and not all(0 < f < 1 for f in args.fidelidad):
+        parser.error("Las fracciones de --fidelidad deben estar entre 0 y 1 (sin incluirlos)")
+    if args.verificar_fidelidad and not args.fidelidad:
+        parser.error("--verificar-fidelidad requiere --fidelidad")
+    if args.salida.lower().endswith(".parquet"):
+        # Se comprueba antes de optimizar: pandas solo falla al escribir
+        from resultados import motor_parquet
+        if motor_parquet() is None:
+            parser.error("--salida .parquet requiere pyarrow o fastparquet (pip install pyarrow)")
+    if args.subventanas < 1:
+        parser.error("--subventanas debe ser al menos 1")
+    if args.segmentos and args.solape is not None and not 0 <= args.solape <= args.segmentos // 2:
+        parser.error("--solape debe estar entre 0 y la mitad de --segmentos")
+    if not lote:
+        args.entrada, args.columna = args.entrada[0], args.columna[0]
+
+    # --- Instrumentación ---
+    # Sin --perfil los métodos medidos quedan intactos y no hay costo adicional.
+    t_inicio = time.perf_counter()
+    if args.perfil:
+        activar()
+
+    # --- Modo en flujo ---
+    # Lee la entrada (o stdin con "-") y escribe cada muestra filtrada en cuanto está disponible.
+    if args.flujo:
+        from flujo import filtrar_flujo
+        # Parámetros: los explícitos, luego los de --parametros y por último los de omisión
+        valores = {"Q": 0.01, "R": 0.1, "ventana": 5, "pesos": [0.5, 0.5]}
+        if args.parametros:
+            import sys
+            from resultados import leer_parametros, parametros_flujo
+            try:
+                guardados, descartados = parametros_flujo(leer_parametros(args.parametros))
+            except ValueError as error:
+                parser.error(str(error))
+            valores.update(guardados)
+            if descartados:
+                # A stderr: la salida estándar puede ser la señal filtrada
+                print(f"Modo en flujo: se omite {', '.join(descartados)} de {args.parametros} y los "
+                      f"pesos de Kalman y Mediana se normalizan.", file=sys.stderr)
+        for clave in valores:
+            if getattr(args, clave) is not None:
+                valores[clave] = getattr(args, clave)
+        filtrar_flujo(args.entrada, args.salida, args.columna, args.fila, valores["Q"], valores["R"],
+                      valores["ventana"], valores["pesos"], seguir=args.seguir, tam_bloque=args.bloque)
+        return
+
+    opciones = {
+        "estacionario": args.kalman_estacionario,
+        "ruta_cache": args.cache,
+        "ejecutor": args.ejecutor,
+        "workers": args.workers,
+        "semilla": args.semilla,
+        "metodo_hibrido": args.hibrido,
+        "filtros": tuple(dict.fromkeys(args.filtros)),
+        "fin": None if args.limite_tiempo is None else time.time() + args.limite_tiempo,
+        "sembrar": args.sembrar,
+        "fidelidad": None if not args.fidelidad else {
+            "fracciones": args.fidelidad, "sustituto": args.sustituto,
+            "ventanas": args.subventanas, "semilla": args.semilla or 0,
+            "verificar": args.verificar_fidelidad,
+        },
+    }
+
+    # --- Parámetros de una ejecución anterior ---
+    # Fijan los filtros, sus parámetros y los pesos; no se ejecuta ninguna búsqueda.
+    anterior = None
+    if args.parametros:
+        from resultados import leer_parametros
+        anterior = leer_parametros(args.parametros)
+        opciones["filtros"] = tuple(anterior["filtros"])
+        opciones["estacionario"] = anterior.get("estacionario", False)
+    from genetico import crear_ejecutor
+
+    # --- Modo por lotes ---
+    # Cada archivo se lee una sola vez y sus canales se reparten entre --tareas
+    # procesos; la salida tiene una columna por canal (CSV o .parquet).
+    if lote:
+        from lote import expandir_entradas, filtrar_lote, guardar_lote
+        archivos = expandir_entradas(args.entrada)
+        ejecutor_tareas = crear_ejecutor("procesos", args.tareas)
+        try:
+            resultados = filtrar_lote(archivos, args.columna, args.fila, args.filafinal, opciones,
+                                      ejecutor=ejecutor_tareas, cache=not args.sin_cache_csv)
+        finally:
+            if ejecutor_tareas is not None:
+                ejecutor_tareas.shutdown()
+
+        guardar_lote(resultados, args.salida)
+        print(f"{len(resultados)} canales de {len(archivos)} archivos:")
+        for canal, (_, parametros) in resultados.items():
+            print(f"  {canal}: {describir_parametros(parametros)}")
+        print(f"Resultados guardados en {args.salida}.")
+        if args.perfil:
+            escribir_reporte(args.perfil, time.perf_counter() - t_inicio, argumentos=vars(args),
+                             canales={canal: parametros for canal, (_, parametros) in resultados.items()})
+        return
+
+    # --- Carga de datos desde CSV ---
+    # Permite seleccionar rango de filas y una sola columna.
+    # La primera lectura deja un .npy auxiliar que las siguientes abren con np.memmap.
+    from lector_csv import cargar_csv
+    datos = cargar_csv(args.entrada, args.fila, args.columna, args.filafinal, cache=not args.sin_cache_csv)
+
+    # --- Modo por segmentos ---
+    # Cada ventana solapada recorre el flujo completo en un proceso del grupo y
+    # los resultados se unen con un fundido cruzado en los solapes.
+    if args.segmentos:
+        from segmentos import dividir, filtrar_segmentado
+        solape = args.solape if args.solape is not None else args.segmentos // 10
+        try:
+            # Al repartir el resto, las ventanas pueden acortarse: se valida antes de filtrar
+            dividir(len(datos), args.segmentos, solape)
+        except ValueError as error:
+            parser.error(str(error))
+        ejecutor_tareas = crear_ejecutor("procesos", args.tareas)
+        try:
+            senal_final, ventanas = filtrar_segmentado(datos, opciones, args.segmentos, solape,
+                                                       ejecutor=ejecutor_tareas, calentar=args.calentar)
+
+            print(f"{len(ventanas)} ventanas de hasta {args.segmentos} muestras (solape {solape}).")
+            for inicio, fin, parametros in ventanas:
+                print(f"  [{inicio}, {fin}): {describir_parametros(parametros)}")
+            if not args.sin_graficas:
+                # Las imágenes se dibujan en paralelo en el mismo grupo de procesos
+                from graficas import graficar_todo, graficar_panel
+                graficar_todo(datos, senal_final, args.entrada, ejecutor=ejecutor_tareas)
+                if args.panel:
+                    graficar_panel(datos, {"Híbrido": senal_final}, args.entrada)
+        finally:
+            if ejecutor_tareas is not None:
+                ejecutor_tareas.shutdown()
+        guardar_resultado(senal_final, args.salida, {"original": datos, "hibrido": senal_final})
+        if args.perfil:
+            escribir_reporte(args.perfil, time.perf_counter() - t_inicio, argumentos=vars(args),
+                             ventanas=[{"inicio": inicio, "fin": fin, "parametros": p}
+                                       for inicio, fin, p in ventanas])
+        return
+
+    # --- Planificación de etapas ---
+    # Los filtros optimizados son independientes y corren en paralelo; el
+    # híbrido espera a todos y las gráficas se generan en cuanto su filtro
+    # termina, solapándose con el cómputo restante.
+    from pipeline import Planificador, optimizar_filtro, combinar_filtros, aplicar_filtro, aplicar_pesos
+    from pipeline import graficar_resultado, graficar_final, graficar_combinada
+    filtros = tuple((nombre, ETIQUETAS[nombre]) for nombre in opciones["filtros"])
+
+    ejecutor_tareas = crear_ejecutor("procesos", args.tareas)
+    planificador = Planificador(ejecutor_tareas)
+
+    # --- Aplicación de filtros individuales ---
+    # Con --parametros cada etapa aplica el filtro directamente, sin búsqueda.
+    for nombre, _ in filtros:
+        if anterior is None:
+            planificador.agregar(nombre, optimizar_filtro, (nombre, datos, opciones))
+        else:
+            planificador.agregar(nombre, aplicar_filtro, (nombre, datos, opciones, anterior["filtros"][nombre]))
+
+    # --- Graficado individual de filtros ---
+    # Se generan imágenes comparativas entre la señal original y la salida de cada filtro.
+    if not args.sin_graficas:
+        for nombre, etiqueta in filtros:
+            planificador.agregar(f"grafica_{nombre}", graficar_resultado, (datos, args.entrada, etiqueta),
+                                 dependencias=(nombre,))
+
+    # --- Aplicación de filtro híbrido con lógica difusa ---
+    # Esta clase fue implementada por el autor y combina los filtros anteriores con ponderación lógica.
+    if anterior is None:
+        planificador.agregar("hibrido", combinar_filtros, (opciones,),
+                             dependencias=tuple(nombre for nombre, _ in filtros))
+    else:
+        planificador.agregar("hibrido", aplicar_pesos, (anterior["hibrido"]["pesos"],),
+                             dependencias=tuple(nombre for nombre, _ in filtros))
+
+    # --- Graficado final de la señal filtrada híbrida ---
+    if not args.sin_graficas:
+        planificador.agregar("grafica_final", graficar_final, (datos, args.entrada), dependencias=("hibrido",))
+
+    # --- Figura combinada (--panel) ---
+    # Un panel por filtro y uno para el híbrido, en una sola imagen.
+    if args.panel and not args.sin_graficas:
+        planificador.agregar("grafica_panel", graficar_combinada,
+                             (datos, args.entrada, [etiqueta for _, etiqueta in filtros] + ["Híbrido"]),
+                             dependencias=tuple(nombre for nombre, _ in filtros) + ("hibrido",))
+
+    try:
+        resultados = planificador.ejecutar()
+    finally:
+        if ejecutor_tareas is not None:
+            ejecutor_tareas.shutdown()
+    senal_final, pesos = resultados["hibrido"]
+
+    # --- Reporte de evaluaciones de fitness ---
+    for nombre, etiqueta in filtros:
+        reporte = resultados[nombre][1]
+        if reporte is None:
+            print(f"{etiqueta}: parámetros {resultados[nombre][2]} de {args.parametros}.")
+            continue
+        if nombre == "kalman":
+            print(f"{etiqueta}: {len(reporte['generaciones'])} generaciones de {reporte['poblacion']} "
+                  f"individuos (parada: {reporte['parada']}).")
+        else:
+            print(f"{etiqueta}: {reporte['evaluaciones']} evaluaciones completas, "
+                  f"{reporte['evaluaciones_parciales']} parciales ({reporte['modo']}); "
+                  f"{reporte['ahorradas']} ahorradas frente a evolución diferencial.")
+            cache = reporte.get("cache")
+            if cache is not None:
+                print(f"  Caché de fitness: {cache['aciertos']} aciertos ({cache['aciertos_disco']} "
+                      f"en disco), {cache['fallos']} fallos.")
+            for etapa in reporte.get("etapas", []):
+                if "ahorro_segundos" in etapa:
+                    print(f"  Cribado al {etapa['fraccion']:.0%}: {etapa['candidatos']} órdenes en "
+                          f"{etapa['segundos']:.2f} s (~{etapa['ahorro_segundos']:.2f} s ahorrados "
+                          f"frente a máxima verosimilitud).")
+        fidelidad = reporte.get("fidelidad")
+        if fidelidad is not None:
+            diferencia = ("" if fidelidad["diferencia_puntaje"] is None else
+                          f" ({fidelidad['diferencia_puntaje']:+.4g} frente a "
+                          f"{fidelidad['puntaje_referencia']:.4g} con evaluación completa, "
+                          f"{fidelidad['segundos_referencia']:.2f} s)")
+            print(f"  Multifidelidad ({fidelidad['sustituto']}): costo de "
+                  f"~{fidelidad['equivalente_completas']:.0f} evaluaciones completas; puntaje "
+                  f"completo {fidelidad['puntaje_completo']:.4g}{diferencia}.")
+
+    planificador.imprimir_linea_tiempo()
+    senales = {"original": datos, **{nombre: resultados[nombre][0] for nombre, _ in filtros},
+               "hibrido": senal_final}
+    guardar_resultado(senal_final, args.salida, senales)
+
+    # --- Archivo de parámetros ---
+    # Parámetros y puntajes elegidos, para reaplicarlos con --parametros.
+    from resultados import es_binaria, escribir_parametros, puntajes, ruta_parametros
+    puntaje = puntajes(datos, {nombre: senal for nombre, senal in senales.items() if nombre != "original"})
+    filtros_elegidos = {}
+    for nombre, _ in filtros:
+        filtros_elegidos[nombre] = {"parametros": resultados[nombre][2], "puntaje": puntaje[nombre]}
+        coeficientes = (resultados[nombre][1] or anterior["filtros"][nombre]).get("coeficientes")
+        if coeficientes is not None:
+            filtros_elegidos[nombre]["coeficientes"] = coeficientes
+    escribir_parametros(ruta_parametros(args.salida),
+                        {"entrada": args.entrada, "columna": args.columna, "fila": args.fila,
+                         "filafinal": args.filafinal, "muestras": len(datos)},
+                        filtros_elegidos, {"pesos": pesos, "puntaje": puntaje["hibrido"]},
+                        estacionario=opciones["estacionario"],
+                        senales=args.salida if es_binaria(args.salida) else None)
+    print(f"Parámetros guardados en {ruta_parametros(args.salida)}.")
+
+    # --- Reporte de ejecución (--perfil) ---
+    if args.perfil:
+        escribir_reporte(
+            args.perfil, time.perf_counter() - t_inicio, argumentos=vars(args),
+            filtros={nombre: {"parametros": resultados[nombre][2], "reporte": resultados[nombre][1]}
+                     for nombre, _ in filtros},
+            hibrido={"pesos": pesos},
+            etapas=[{"nombre": n, "inicio": inicio, "fin": fin}
+                    for n, inicio, fin in planificador.linea_tiempo()],
+        )
+        print(f"Reporte de ejecución guardado en {args.perfil}.")
+
+
+def describir_parametros(parametros):
+    # --- Resumen en una línea de los parámetros óptimos de una serie ---
+    partes = []
+    if "kalman" in parametros:
+        partes.append(f"Kalman Q, R = {parametros['kalman'][0]:.4g}, {parametros['kalman'][1]:.4g}")
+    if "mediana" in parametros:
+        partes.append(f"ventana {parametros['mediana'][0]}")
+    if "arima" in parametros:
+        partes.append(f"ARIMA {parametros['arima']}")
+    return "; ".join(partes)
+
+
+def guardar_resultado(senal_final, salida, senales=None):
+    from graficas import terminal
+    from resultados import es_binaria, guardar_senales
+
+    # --- Guardado del resultado final ---
+    # En .npy o .parquet se guardan todas las señales (original, filtros e
+    # híbrido); en otro caso, un CSV con la señal filtrada.
+    if es_binaria(salida):
+        guardar_senales(salida, senales or {"filtrada": senal_final})
+    else:
+        import pandas as pd  # Librería de análisis de datos.
+        pd.DataFrame({"filtrada": senal_final}).to_csv(salida, index=False)
+
+    # --- Finalización y reporte en terminal ---
+    print("\n==============================================================\n")
+    print("  Filtrado finalizado con éxito.\n")
+    terminal(senal_final)
+    print("==============================================================\n")
+    print(f"Resultados guardados en {salida}.")
+
+
+# Protección necesaria para los ejecutores de procesos: los procesos hijos
+# importan este módulo sin volver a ejecutar el flujo principal.
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import numpy as np
 
-from scipy.fft import fft
-from scipy.stats import entropy
+from scipy.fft import rfft
 
 # ------------------------------------------------------------------------------
 # Clase: EvaluadorMonteCarlo
@@ -12,42 +11,92 @@ from scipy.stats import entropy
 #   Monte Carlo.
 #
 # Métodos:
-#   - evaluar(original, filtrada):
+#   - __init__(original):
+#       Se construye una vez por señal de referencia. Precalcula el espectro
+#       normalizado de la original y los pesos por frecuencia, que son iguales
+#       en todas las evaluaciones de una misma ejecución.
+#
+#   - puntuar(filtrada):
 #       Calcula un puntaje compuesto considerando similitud espectral, suavidad,
 #       entropía y varianza. Penaliza señales demasiado planas o con pérdida de
 #       información espectral relevante.
 #
+#   - puntuar_lote(filtradas):
+#       Igual que puntuar, pero recibe un arreglo 2-D (candidatos, n) y devuelve
+#       un arreglo (candidatos,) de puntajes calculados de forma vectorizada.
+#
+#   - puntaje_espectral(espectro), entropia(filtradas), combinar(...):
+#       Componentes del puntaje, expuestos para quien ya tiene precalculados
+#       los espectros, segundas diferencias o varianzas (ver FiltroHibrido).
+#
+#   - evaluar(original, filtrada):
+#       Método estático equivalente a EvaluadorMonteCarlo(original).puntuar(filtrada),
+#       para evaluaciones aisladas.
+#
 #   - promedio_metricas(lista_resultados):
 #       Calcula el promedio de una lista de evaluaciones.
 #
 # Notas:
 #   - Las métricas utilizadas combinan heurísticas comunes en análisis de
 #     señales (FFT, entropía de Shannon, derivadas, varianza).
+#   - Se usa rfft: para señales reales el espectro completo es simétrico
+#     (|X_k| = |X_{n-k}|), así que las sumas sobre todas las frecuencias se
+#     obtienen contando dos veces los bins reflejados y sumando los pesos de
+#     cada bin con los de su reflejo.
 # ------------------------------------------------------------------------------
 class EvaluadorMonteCarlo:
-    @staticmethod
-    def evaluar(original, filtrada):
-        # Normalizar espectros
-        espectro_original = np.abs(fft(original))
-        espectro_filtrada = np.abs(fft(filtrada))
+    bins = 50  # Número de bins del histograma de entropía
+
+    def __init__(self, original):
+        original = np.asarray(original, dtype=float)
+        n = len(original)
+        self.n = n
 
-        espectro_original /= np.sum(espectro_original) + 1e-12
-        espectro_filtrada /= np.sum(espectro_filtrada) + 1e-12
+        # Bins de rfft con reflejo en la mitad negativa del espectro completo
+        m = n // 2 + 1
+        k = np.arange(m)
+        reflejado = (k > 0) & (n - k > k)
+        pesos = np.linspace(1, 0.1, n)  # más peso a bajas frecuencias
 
-        # Diferencia espectral con pesos (más peso a bajas frecuencias)
-        pesos = np.linspace(1, 0.1, len(espectro_original))
-        delta_espectro = espectro_original - espectro_filtrada
-        espectro_score = np.sum(pesos * delta_espectro**2)
+        self.multiplicidad = np.where(reflejado, 2.0, 1.0)
+        self.pesos = pesos[k].copy()
+        self.pesos[reflejado] += pesos[n - k[reflejado]]
 
-        # Suavidad: suma de segundas derivadas absolutas
-        suavidad = np.sum(np.abs(np.diff(filtrada, 2)))
+        # Espectro normalizado de la referencia
+        espectro = np.abs(rfft(original))
+        self.espectro_original = espectro / (np.sum(self.multiplicidad * espectro) + 1e-12)
 
-        # Entropía del histograma
-        hist, _ = np.histogram(filtrada, bins=50, density=True)
-        ent = entropy(hist + 1e-8)
+    def puntuar(self, filtrada):
+        return float(self.puntuar_lote(np.asarray(filtrada)[np.newaxis, :])[0])
+
+    def puntuar_lote(self, filtradas):
+        filtradas = np.atleast_2d(np.asarray(filtradas, dtype=float))
+        return self.combinar(
+            self.puntaje_espectral(np.abs(rfft(filtradas, axis=1))),
+            np.sum(np.abs(np.diff(filtradas, 2, axis=1)), axis=1),
+            self.entropia(filtradas),
+            np.var(filtradas, axis=1),
+        )
 
+    def puntaje_espectral(self, espectro):
+        # Diferencia espectral con pesos; espectro es |rfft| de cada candidata
+        espectro = espectro / (np.sum(self.multiplicidad * espectro, axis=1, keepdims=True) + 1e-12)
+        delta_espectro = self.espectro_original - espectro
+        return np.sum(self.pesos * delta_espectro**2, axis=1)
+
+    def entropia(self, filtradas):
+        # Entropía del histograma. Los bordes dependen del rango de cada
+        # candidata, así que se calcula por fila; np.histogram ya es una sola
+        # pasada en C.
+        densidad = np.array([np.histogram(fila, bins=self.bins, density=True)[0]
+                             for fila in filtradas])
+        pk = densidad + 1e-8
+        pk /= np.sum(pk, axis=1, keepdims=True)
+        return -np.sum(pk * np.log(pk), axis=1)
+
+    @staticmethod
+    def combinar(espectro_score, suavidad, ent, varianza):
         # Penalización por ser plano (varianza casi nula)
-        varianza = np.var(filtrada)
         penalizacion_plano = 1.0 / (varianza + 1e-8)
 
         # Evaluación total ponderada
@@ -58,6 +107,50 @@ class EvaluadorMonteCarlo:
             0.2 * penalizacion_plano  # Penaliza señales demasiado planas
         )
 
+    @staticmethod
+    def evaluar(original, filtrada):
+        return EvaluadorMonteCarlo(original).puntuar(filtrada)
+
     @staticmethod
     def promedio_metricas(lista_resultados):
         return np.mean(lista_resultados)
+
+# ------------------------------------------------------------------------------
+# Clase: EvaluadorSubventanas
+# Descripción:
+#   Evaluación sustituta (de baja fidelidad) de una señal larga: en lugar de
+#   puntuar la serie completa, puntúa varias subventanas elegidas al azar y
+#   promedia sus puntajes, a la manera de un muestreo Monte Carlo de la serie.
+#
+# Métodos:
+#   - __init__(original, fraccion, ventanas=8, longitud_minima=64, semilla=0):
+#       Sortea `ventanas` subventanas de igual longitud que en total cubren
+#       aproximadamente `fraccion` de la serie, cada una de al menos
+#       longitud_minima muestras (si la fracción no alcanza para todas, se usan
+#       menos subventanas). Construye un EvaluadorMonteCarlo por subventana.
+#
+#   - promediar(puntuar):
+#       puntuar(inicio, fin, evaluador) filtra la subventana [inicio, fin) y
+#       devuelve su puntaje, o un arreglo de puntajes para una población; se
+#       devuelve el promedio sobre las subventanas.
+#
+# Atributos:
+#   - tramos: lista de (inicio, fin) de las subventanas, ordenadas.
+#
+# Notas:
+#   - Con la misma semilla las subventanas son las mismas para todos los
+#     candidatos (números aleatorios comunes), así que las diferencias entre
+#     candidatos no se deben al sorteo.
+# ------------------------------------------------------------------------------
+class EvaluadorSubventanas:
+    def __init__(self, original, fraccion, ventanas=8, longitud_minima=64, semilla=0):
+        n = len(original)
+        longitud = min(n, max(longitud_minima, int(np.ceil(fraccion * n / ventanas))))
+        ventanas = max(1, min(ventanas, int(fraccion * n) // longitud))
+        inicios = np.sort(np.random.default_rng(semilla).integers(0, n - longitud + 1, ventanas))
+        self.tramos = [(int(a), int(a) + longitud) for a in inicios]
+        self.evaluadores = [EvaluadorMonteCarlo(original[a:b]) for a, b in self.tramos]
+
+    def promediar(self, puntuar):
+        return np.mean([puntuar(a, b, evaluador)
+                        for (a, b), evaluador in zip(self.tramos, self.evaluadores)], axis=0)
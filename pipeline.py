@@ -0,0 +1,350 @@
+# Autor: Gutierrez Chavero David
+# Este módulo contiene un planificador mínimo de tareas con dependencias (DAG)
+# y las etapas del flujo de filtrado que main.py ejecuta de forma concurrente.
+# Los módulos de los filtros (SciPy, statsmodels) y de gráficas (matplotlib) se
+# importan dentro de cada etapa, solo cuando esa etapa se ejecuta.
+
+import time  # Marcas de tiempo de inicio y fin de cada tarea.
+
+import numpy as np
+
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from instrumentacion import REGISTRO, llamar_medido, recibir_medido
+
+# Filtros individuales disponibles, en el orden en que se combinan
+FILTROS = ("kalman", "mediana", "arima")
+
+# ------------------------------------------------------------------------------
+# Función: _cronometrar
+# Descripción:
+#   Ejecuta una tarea y devuelve su resultado junto con las marcas de tiempo de
+#   reloj de pared en que empezó y terminó, medidas dentro del proceso que la
+#   ejecuta. El resultado va envuelto por instrumentacion.llamar_medido para
+#   que los contadores de --perfil de otros procesos lleguen al principal.
+# ------------------------------------------------------------------------------
+def _cronometrar(funcion, argumentos, perfil=False):
+    inicio = time.time()
+    medido = llamar_medido(funcion, argumentos, perfil)
+    return medido, inicio, time.time()
+
+# ------------------------------------------------------------------------------
+# Clase: Planificador
+# Descripción:
+#   Ejecuta un conjunto de tareas con dependencias sobre un ejecutor (por
+#   ejemplo, un ProcessPoolExecutor). Cada tarea se envía en cuanto todas sus
+#   dependencias han terminado, de modo que las ramas independientes del grafo
+#   corren en paralelo.
+#
+# Métodos:
+#   - __init__(ejecutor=None):
+#       Ejecutor donde correr las tareas; con None se ejecutan en serie en el
+#       proceso actual, en orden de inserción.
+#
+#   - agregar(nombre, funcion, argumentos=(), dependencias=()):
+#       Registra una tarea. Al ejecutarse se llama
+#       funcion(*argumentos, *resultados_de_dependencias), con los resultados en
+#       el mismo orden en que se listan las dependencias.
+#
+#   - ejecutar():
+#       Corre todas las tareas y devuelve un diccionario {nombre: resultado}.
+#
+#   - linea_tiempo():
+#       Devuelve una lista de (nombre, inicio, fin) en segundos relativos al
+#       arranque del planificador.
+#
+#   - ruta_critica():
+#       Devuelve la cadena de tareas dependientes con mayor duración acumulada.
+#
+#   - imprimir_linea_tiempo(ancho=40):
+#       Muestra en terminal la línea de tiempo por etapa y la ruta crítica.
+#
+# Notas:
+#   - Con un ejecutor de procesos, las funciones y sus argumentos deben ser
+#     serializables (funciones a nivel de módulo).
+# ------------------------------------------------------------------------------
+class Planificador:
+    def __init__(self, ejecutor=None):
+        self.ejecutor = ejecutor
+        self.tareas = {}
+        self.tiempos = {}
+        self.origen = None
+
+    def agregar(self, nombre, funcion, argumentos=(), dependencias=()):
+        for dependencia in dependencias:
+            if dependencia not in self.tareas:
+                raise ValueError(f"La tarea '{nombre}' depende de '{dependencia}', que no está registrada")
+        self.tareas[nombre] = (funcion, tuple(argumentos), tuple(dependencias))
+
+    def _argumentos(self, nombre, resultados):
+        funcion, argumentos, dependencias = self.tareas[nombre]
+        return argumentos + tuple(resultados[d] for d in dependencias)
+
+    def ejecutar(self):
+        self.origen = time.time()
+        resultados = {}
+
+        if self.ejecutor is None:
+            for nombre, (funcion, _, _) in self.tareas.items():
+                medido, inicio, fin = _cronometrar(funcion, self._argumentos(nombre, resultados))
+                resultados[nombre] = recibir_medido(medido)
+                self.tiempos[nombre] = (inicio, fin)
+            return resultados
+
+        pendientes = dict(self.tareas)
+        en_curso = {}
+        while pendientes or en_curso:
+            # Enviar todas las tareas cuyas dependencias ya terminaron
+            for nombre in list(pendientes):
+                funcion, _, dependencias = pendientes[nombre]
+                if all(d in resultados for d in dependencias):
+                    futuro = self.ejecutor.submit(_cronometrar, funcion,
+                                                  self._argumentos(nombre, resultados),
+                                                  REGISTRO.activo)
+                    en_curso[futuro] = nombre
+                    del pendientes[nombre]
+
+            if not en_curso:
+                raise RuntimeError("Dependencias circulares entre tareas: " + ", ".join(pendientes))
+
+            terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                nombre = en_curso.pop(futuro)
+                medido, inicio, fin = futuro.result()
+                resultados[nombre] = recibir_medido(medido)
+                self.tiempos[nombre] = (inicio, fin)
+
+        return resultados
+
+    def linea_tiempo(self):
+        return sorted(((nombre, inicio - self.origen, fin - self.origen)
+                       for nombre, (inicio, fin) in self.tiempos.items()),
+                      key=lambda etapa: etapa[1])
+
+    def ruta_critica(self):
+        # Camino de mayor duración acumulada siguiendo las dependencias
+        mejor = {}
+        for nombre, (_, _, dependencias) in self.tareas.items():
+            inicio, fin = self.tiempos[nombre]
+            previo = max((mejor[d] for d in dependencias), key=lambda r: r[0], default=(0.0, []))
+            mejor[nombre] = (previo[0] + fin - inicio, previo[1] + [nombre])
+        return max(mejor.values(), key=lambda r: r[0])[1]
+
+    def imprimir_linea_tiempo(self, ancho=40):
+        etapas = self.linea_tiempo()
+        total = max(fin for _, _, fin in etapas) or 1e-9
+        largo = max(len(nombre) for nombre, _, _ in etapas)
+
+        print("\nLínea de tiempo por etapa (segundos):")
+        for nombre, inicio, fin in etapas:
+            a = int(inicio / total * ancho)
+            b = max(a + 1, int(fin / total * ancho))
+            barra = " " * a + "█" * (b - a) + " " * (ancho - b)
+            print(f"  {nombre:<{largo}} |{barra}| {inicio:8.2f} → {fin:8.2f} ({fin - inicio:.2f} s)")
+        print("  Ruta crítica: " + " → ".join(self.ruta_critica()))
+
+# ------------------------------------------------------------------------------
+# Función: optimizar_filtro
+# Descripción:
+#   Etapa del flujo: ejecuta uno de los filtros optimizados.
+# Entradas:
+#   - nombre: "kalman", "mediana" o "arima".
+#   - datos: señal original.
+#   - opciones: diccionario con estacionario, ruta_cache, ejecutor, workers y
+#     semilla (ver main.py). Con "fin" (instante time.time()), la búsqueda
+#     termina a más tardar en ese momento; con "sembrar" y ruta_cache, arranca
+#     desde el óptimo guardado de una ejecución anterior sobre los mismos datos
+#     y guarda el nuevo (ver genetico.RegistroOptimos). "fidelidad" es un
+#     diccionario con los argumentos de genetico.Fidelidad (fracciones,
+#     sustituto, ventanas, semilla, verificar) para la evaluación multifidelidad.
+#     Con "cache_solo_lectura", la caché en ruta_cache solo se consulta (lo
+#     activan los modos que filtran varias series a la vez en procesos).
+#   - inicial: parámetros opcionales con que arrancar la búsqueda (ver el
+#     argumento inicial de cada filtro optimizado); tienen prioridad sobre el
+#     óptimo guardado.
+# Salidas:
+#   - Tupla (señal filtrada, reporte del optimizador o None, parámetros óptimos).
+# Notas:
+#   - El ejecutor interno de la evaluación de fitness se crea dentro de la
+#     etapa, ya que los ejecutores no pueden enviarse a otro proceso, y se
+#     cierra aunque la búsqueda falle.
+# ------------------------------------------------------------------------------
+def optimizar_filtro(nombre, datos, opciones, inicial=None):
+    from genetico import Fidelidad, RegistroOptimos, crear_ejecutor
+
+    if nombre not in FILTROS:
+        raise ValueError(f"Filtro desconocido: {nombre}")
+    if nombre == "kalman":
+        from filtro_kalman import FiltroKalmanOptimizado as clase
+        argumentos = {"estacionario": opciones.get("estacionario", False)}
+    elif nombre == "mediana":
+        from filtro_mediana import FiltroMedianaOptimizado as clase
+        argumentos = {"ruta_cache": opciones.get("ruta_cache"),
+                      "cache_solo_lectura": opciones.get("cache_solo_lectura", False)}
+    else:
+        from filtro_arima import FiltroARIMAOptimizado as clase
+        argumentos = {"ruta_cache": opciones.get("ruta_cache"),
+                      "cache_solo_lectura": opciones.get("cache_solo_lectura", False)}
+
+    registro = None
+    if opciones.get("sembrar") and opciones.get("ruta_cache"):
+        registro = RegistroOptimos(opciones["ruta_cache"])
+        if inicial is None:
+            inicial = registro.obtener(datos, nombre)
+
+    if opciones.get("fidelidad"):
+        argumentos["fidelidad"] = Fidelidad(**opciones["fidelidad"])
+
+    ejecutor = crear_ejecutor(opciones.get("ejecutor", "serie"), opciones.get("workers", 1))
+    filtro = clase(datos, ejecutor=ejecutor, semilla=opciones.get("semilla"), inicial=inicial,
+                   presupuesto=clase.presupuesto_defecto.limitar(opciones.get("fin")), **argumentos)
+    try:
+        senal = filtro.ejecutar()
+    finally:
+        if ejecutor is not None:
+            ejecutor.shutdown()
+    if registro is not None:
+        registro.guardar(datos, nombre, filtro.parametros)
+    reporte = getattr(filtro, "reporte", None)
+    if getattr(filtro, "coeficientes", None) is not None:
+        reporte = {**reporte, "coeficientes": filtro.coeficientes}
+    return senal, reporte, filtro.parametros
+
+# ------------------------------------------------------------------------------
+# Función: aplicar_filtro
+# Descripción:
+#   Etapa del flujo equivalente a optimizar_filtro, pero sin búsqueda: aplica
+#   un filtro con parámetros ya conocidos (por ejemplo, los del archivo de
+#   parámetros de una ejecución anterior, ver resultados.leer_parametros).
+# Entradas:
+#   - nombre, datos, opciones: ver optimizar_filtro (de opciones solo se usa
+#     "estacionario").
+#   - parametros: diccionario {"parametros": ..., "coeficientes": ...} del
+#     filtro; coeficientes solo aplica a ARIMA y evita el ajuste.
+# Salidas:
+#   - Tupla (señal filtrada, None, parámetros).
+# ------------------------------------------------------------------------------
+def aplicar_filtro(nombre, datos, opciones, parametros):
+    valores = parametros["parametros"]
+    if nombre == "kalman":
+        from filtro_kalman import FiltroKalman, FiltroKalmanEstacionario
+        clase = FiltroKalmanEstacionario if opciones.get("estacionario") else FiltroKalman
+        filtro = clase(datos, *valores)
+    elif nombre == "mediana":
+        from filtro_mediana import FiltroMediana
+        filtro = FiltroMediana(datos, *valores)
+    elif nombre == "arima":
+        from filtro_arima import FiltroARIMA
+        filtro = FiltroARIMA(datos, *valores, coeficientes=parametros.get("coeficientes"))
+    else:
+        raise ValueError(f"Filtro desconocido: {nombre}")
+    return np.asarray(filtro.aplicar(), dtype=float), None, tuple(valores)
+
+# ------------------------------------------------------------------------------
+# Función: mezclar
+# Descripción:
+#   Combina varias señales filtradas con FiltroHibrido. Con una sola señal no
+#   hay pesos que buscar y se devuelve tal cual, con peso 1.
+# Entradas:
+#   - senales: lista de señales filtradas.
+#   - opciones: mismo diccionario que optimizar_filtro.
+#   - ejecutor: ejecutor opcional para la evolución diferencial.
+#   - inicial: pesos opcionales con que arrancar la búsqueda.
+# Salidas:
+#   - Tupla (señal híbrida, pesos de la combinación).
+# ------------------------------------------------------------------------------
+def mezclar(senales, opciones, ejecutor=None, inicial=None):
+    if len(senales) == 1:
+        return senales[0], (1.0,)
+
+    from hibrido import FiltroHibrido
+
+    hibrido = FiltroHibrido(senales, ejecutor=ejecutor, semilla=opciones.get("semilla"),
+                            metodo=opciones.get("metodo_hibrido", "simplex"), inicial=inicial,
+                            presupuesto=FiltroHibrido.presupuesto_defecto.limitar(opciones.get("fin")))
+    senal = hibrido.ejecutar()
+    return senal, tuple(float(w) for w in hibrido.pesos)
+
+# ------------------------------------------------------------------------------
+# Función: aplicar_pesos
+# Descripción:
+#   Etapa del flujo equivalente a combinar_filtros con pesos ya conocidos.
+# Entradas:
+#   - pesos: pesos de la combinación, en el orden de los resultados.
+#   - *resultados: tuplas (señal, reporte, parámetros) de cada filtro.
+# Salidas:
+#   - Tupla (señal híbrida, pesos).
+# ------------------------------------------------------------------------------
+def aplicar_pesos(pesos, *resultados):
+    pesos = np.abs(np.asarray(pesos, dtype=float))
+    pesos /= np.sum(pesos)
+    return sum(w * resultado[0] for w, resultado in zip(pesos, resultados)), tuple(float(w) for w in pesos)
+
+# ------------------------------------------------------------------------------
+# Función: combinar_filtros
+# Descripción:
+#   Etapa del flujo: combina las salidas de los filtros con mezclar().
+# Entradas:
+#   - opciones: mismo diccionario que optimizar_filtro.
+#   - *resultados: tuplas (señal, reporte, parámetros) de cada filtro.
+# Salidas:
+#   - Tupla (señal híbrida, pesos de la combinación).
+# ------------------------------------------------------------------------------
+def combinar_filtros(opciones, *resultados):
+    from genetico import crear_ejecutor
+
+    ejecutor = crear_ejecutor(opciones.get("ejecutor", "serie"), opciones.get("workers", 1))
+    try:
+        return mezclar([resultado[0] for resultado in resultados], opciones, ejecutor=ejecutor)
+    finally:
+        if ejecutor is not None:
+            ejecutor.shutdown()
+
+# ------------------------------------------------------------------------------
+# Función: procesar_serie
+# Descripción:
+#   Ejecuta en el proceso actual el flujo completo sobre una serie: los filtros
+#   optimizados seleccionados y la combinación híbrida. Es la unidad de trabajo
+#   de los modos por segmentos (una ventana) y por lotes (un canal).
+# Entradas:
+#   - datos: muestras de la serie.
+#   - opciones: diccionario de opciones de optimizar_filtro; la clave opcional
+#     "filtros" indica qué filtros de FILTROS ejecutar (por defecto, todos).
+#   - inicial: diccionario opcional {"kalman", "mediana", "arima", "hibrido"}
+#     con los parámetros de arranque de cada búsqueda.
+# Salidas:
+#   - Tupla (señal híbrida, parámetros óptimos con las mismas claves).
+# ------------------------------------------------------------------------------
+def procesar_serie(datos, opciones, inicial=None):
+    inicial = inicial or {}
+    senales = []
+    parametros = {}
+    for nombre in opciones.get("filtros", FILTROS):
+        senal, _, parametros[nombre] = optimizar_filtro(nombre, datos, opciones, inicial.get(nombre))
+        senales.append(senal)
+
+    senal, parametros["hibrido"] = mezclar(senales, opciones, inicial=inicial.get("hibrido"))
+    return np.asarray(senal, dtype=float), parametros
+
+# ------------------------------------------------------------------------------
+# Funciones: graficar_resultado, graficar_final, graficar_combinada
+# Descripción:
+#   Etapas del flujo que generan las imágenes PNG de un filtro individual, de
+#   la señal híbrida final y la figura con un panel por señal (etiquetas en el
+#   mismo orden que los resultados), para que el graficado se solape con el
+#   cómputo restante.
+# ------------------------------------------------------------------------------
+def graficar_resultado(datos, nombre_archivo, etiqueta, resultado):
+    from graficas import graficar_filtro
+    graficar_filtro(datos, resultado[0], nombre_archivo, etiqueta)
+
+
+def graficar_final(datos, nombre_archivo, hibrido):
+    from graficas import graficar_todo
+    graficar_todo(datos, hibrido[0], nombre_archivo)
+
+
+def graficar_combinada(datos, nombre_archivo, etiquetas, *resultados):
+    from graficas import graficar_panel
+    graficar_panel(datos, {etiqueta: resultado[0] for etiqueta, resultado in zip(etiquetas, resultados)},
+                   nombre_archivo)
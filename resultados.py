@@ -0,0 +1,168 @@
+# Autor: Gutierrez Chavero David
+# Este módulo guarda los resultados del filtrado en formato binario (.npy o
+# Parquet) junto con un archivo JSON de parámetros, y lee ese archivo para que
+# una ejecución posterior aplique los mismos parámetros sin optimizar.
+
+import importlib.util  # Detección de los motores de Parquet sin importarlos.
+import json  # Archivo de parámetros.
+import os    # Rutas del archivo de parámetros.
+
+import numpy as np
+
+# Extensiones de salida que se guardan en binario con todas las señales
+FORMATOS_BINARIOS = (".npy", ".parquet")
+
+# ------------------------------------------------------------------------------
+# Función: es_binaria
+# Descripción:
+#   Indica si la ruta de salida corresponde a un formato binario.
+# ------------------------------------------------------------------------------
+def es_binaria(salida):
+    return os.path.splitext(salida)[1].lower() in FORMATOS_BINARIOS
+
+# ------------------------------------------------------------------------------
+# Función: motor_parquet
+# Descripción:
+#   Nombre del motor de Parquet instalado que usaría pandas ("pyarrow" o
+#   "fastparquet"), o None si no hay ninguno. No importa el módulo, así que
+#   puede consultarse antes de empezar el trabajo.
+# ------------------------------------------------------------------------------
+def motor_parquet():
+    for motor in ("pyarrow", "fastparquet"):
+        if importlib.util.find_spec(motor) is not None:
+            return motor
+    return None
+
+# ------------------------------------------------------------------------------
+# Función: ruta_parametros
+# Descripción:
+#   Ruta del archivo JSON de parámetros asociado a una salida: el mismo nombre
+#   con extensión .json (por ejemplo, senal.npy → senal.json).
+# ------------------------------------------------------------------------------
+def ruta_parametros(salida):
+    return os.path.splitext(salida)[0] + ".json"
+
+# ------------------------------------------------------------------------------
+# Función: guardar_senales
+# Descripción:
+#   Guarda varias señales de igual longitud en un solo archivo binario, una
+#   columna por señal.
+# Entradas:
+#   - salida: ruta del archivo; .npy guarda un arreglo estructurado con un
+#     campo por señal y .parquet una tabla (requiere pyarrow o fastparquet).
+#   - senales: diccionario ordenado {nombre: señal}.
+# Notas:
+#   - Cada campo del .npy conserva el tipo de su señal: float32 la original y
+#     la mediana (que se calcula en la precisión de la entrada), float64 las
+#     demás. El archivo se abre sin copiar con
+#     cargar_senales(salida) o np.load(salida, mmap_mode="r"), y cada señal se
+#     lee por su nombre: arreglo["hibrido"].
+# ------------------------------------------------------------------------------
+def guardar_senales(salida, senales):
+    if salida.lower().endswith(".parquet"):
+        import pandas as pd
+        pd.DataFrame({nombre: np.asarray(senal) for nombre, senal in senales.items()}).to_parquet(salida, index=False)
+        return
+
+    columnas = {nombre: np.asarray(senal) for nombre, senal in senales.items()}
+    tabla = np.empty(len(next(iter(columnas.values()))),
+                     dtype=[(nombre, senal.dtype) for nombre, senal in columnas.items()])
+    for nombre, senal in columnas.items():
+        tabla[nombre] = senal
+    np.save(salida, tabla)
+
+# ------------------------------------------------------------------------------
+# Función: cargar_senales
+# Descripción:
+#   Abre un .npy guardado por guardar_senales como np.memmap, sin leerlo
+#   completo en memoria.
+# Salidas:
+#   - Arreglo estructurado de solo lectura; arreglo.dtype.names da las señales.
+# ------------------------------------------------------------------------------
+def cargar_senales(salida):
+    return np.load(salida, mmap_mode="r")
+
+# ------------------------------------------------------------------------------
+# Función: puntajes
+# Descripción:
+#   Puntaje Monte Carlo (menor es mejor) de cada señal filtrada respecto de la
+#   original, con el mismo evaluador que usan los optimizadores.
+# Salidas:
+#   - Diccionario {nombre: puntaje}.
+# ------------------------------------------------------------------------------
+def puntajes(original, senales):
+    from montecarlo import EvaluadorMonteCarlo
+
+    evaluador = EvaluadorMonteCarlo(original)
+    return {nombre: evaluador.puntuar(senal) for nombre, senal in senales.items()}
+
+# ------------------------------------------------------------------------------
+# Función: escribir_parametros
+# Descripción:
+#   Guarda el archivo JSON de parámetros de una ejecución.
+# Entradas:
+#   - ruta: archivo JSON.
+#   - origen: diccionario con la entrada, columna, filas y muestras usadas.
+#   - filtros: diccionario {nombre: {"parametros", "puntaje"[, "coeficientes"]}}.
+#   - hibrido: diccionario {"pesos", "puntaje"}.
+#   - estacionario: si Kalman se aplicó en estado estacionario.
+#   - senales: ruta del archivo binario con las señales, si se guardó.
+# ------------------------------------------------------------------------------
+def escribir_parametros(ruta, origen, filtros, hibrido, estacionario=False, senales=None):
+    contenido = {
+        "origen": origen,
+        "estacionario": estacionario,
+        "filtros": filtros,
+        "hibrido": hibrido,
+        "senales": senales,
+    }
+    with open(ruta, "w") as f:
+        json.dump(contenido, f, indent=2, default=float)
+
+# ------------------------------------------------------------------------------
+# Función: leer_parametros
+# Descripción:
+#   Lee un archivo escrito por escribir_parametros.
+# Salidas:
+#   - Diccionario con "filtros" (en el orden en que se combinaron), "hibrido",
+#     "estacionario" y los datos de origen.
+# Notas:
+#   - Lanza ValueError si el archivo no tiene filtros o pesos del híbrido.
+# ------------------------------------------------------------------------------
+def leer_parametros(ruta):
+    with open(ruta) as f:
+        contenido = json.load(f)
+    if not contenido.get("filtros") or "pesos" not in contenido.get("hibrido", {}):
+        raise ValueError(f"{ruta} no contiene parámetros de filtros y pesos del híbrido")
+    return contenido
+
+# ------------------------------------------------------------------------------
+# Función: parametros_flujo
+# Descripción:
+#   Traduce un archivo de parámetros (ver leer_parametros) a los argumentos del
+#   modo en flujo (flujo.filtrar_flujo), que combina solo Kalman y Mediana.
+# Entradas:
+#   - anterior: diccionario devuelto por leer_parametros.
+# Salidas:
+#   - Tupla (valores, descartados): valores tiene "pesos" (Kalman, Mediana) y,
+#     si esos filtros están en el archivo, "Q", "R" y "ventana"; descartados
+#     son los filtros con peso que no pueden aplicarse en flujo (ARIMA).
+# Notas:
+#   - Un filtro ausente entra con peso 0. Al descartar ARIMA, FiltroHibridoFlujo
+#     normaliza los pesos restantes para que sumen 1.
+#   - Lanza ValueError si ni Kalman ni Mediana tienen peso.
+# ------------------------------------------------------------------------------
+def parametros_flujo(anterior):
+    filtros = anterior["filtros"]
+    pesos = dict(zip(filtros, anterior["hibrido"]["pesos"]))
+    valores = {"pesos": [abs(pesos.get("kalman", 0.0)), abs(pesos.get("mediana", 0.0))]}
+    if "kalman" in filtros:
+        valores["Q"], valores["R"] = filtros["kalman"]["parametros"]
+    if "mediana" in filtros:
+        valores["ventana"] = filtros["mediana"]["parametros"][0]
+    if sum(valores["pesos"]) == 0:
+        raise ValueError("El archivo de parámetros no da peso a Kalman ni a Mediana, "
+                         "los únicos filtros del modo en flujo")
+    descartados = [nombre for nombre, peso in pesos.items()
+                   if nombre not in ("kalman", "mediana") and peso != 0]
+    return valores, descartados
@@ -0,0 +1,145 @@
+# Autor: Gutierrez Chavero David
+# Este módulo implementa el procesamiento por segmentos de series largas: la
+# señal se divide en ventanas solapadas, cada ventana recorre el flujo completo
+# (filtros optimizados e híbrido) en un grupo de procesos y los segmentos
+# filtrados se unen con un fundido cruzado (crossfade) en las zonas de solape.
+
+import numpy as np
+
+from genetico import contar_trabajadores
+from instrumentacion import REGISTRO, llamar_medido, recibir_medido
+from pipeline import procesar_serie
+
+# ------------------------------------------------------------------------------
+# Función: dividir
+# Descripción:
+#   Reparte n muestras en ventanas de igual longitud (como máximo `longitud`)
+#   que se solapan exactamente `solape` muestras con la siguiente.
+# Entradas:
+#   - n: número total de muestras.
+#   - longitud: longitud máxima de cada ventana.
+#   - solape: muestras compartidas entre ventanas consecutivas.
+# Salidas:
+#   - Lista de tuplas (inicio, fin) con fin exclusivo; la última termina en n.
+# Notas:
+#   - Al repartir el resto, la longitud de las ventanas puede quedar menor que
+#     `longitud`. Si el solape pasa de la mitad de esa longitud, tres ventanas
+#     se superponen y las rampas del fundido ya no suman 1, así que se lanza
+#     ValueError.
+# ------------------------------------------------------------------------------
+def dividir(n, longitud, solape):
+    if not 0 <= solape < longitud:
+        raise ValueError("El solape debe ser no negativo y menor que la longitud de ventana")
+    if n <= longitud:
+        return [(0, n)]
+
+    # Se reparte el resto de forma pareja para no dejar una última ventana corta
+    cantidad = int(np.ceil((n - solape) / (longitud - solape)))
+    longitud = int(np.ceil((n - solape) / cantidad)) + solape
+    paso = longitud - solape
+    if solape > paso:
+        raise ValueError(f"El solape ({solape}) pasa de la mitad de las ventanas de {longitud} "
+                         f"muestras en que se reparten {n} muestras; use un solape de a lo sumo "
+                         f"{longitud // 2} o ventanas más largas")
+    return [(i * paso, min(i * paso + longitud, n)) for i in range(cantidad)]
+
+# ------------------------------------------------------------------------------
+# Función: procesar_cadena
+# Descripción:
+#   Procesa en orden una serie de ventanas consecutivas; si calentar es True,
+#   cada ventana arranca sus búsquedas desde los parámetros óptimos de la
+#   anterior.
+# Entradas:
+#   - tramos: lista de arreglos, uno por ventana.
+#   - opciones: ver pipeline.procesar_serie.
+#   - calentar: reutilizar los óptimos de la ventana previa.
+# Salidas:
+#   - Lista de tuplas (señal, parámetros), una por ventana.
+# ------------------------------------------------------------------------------
+def procesar_cadena(tramos, opciones, calentar=False):
+    resultados = []
+    inicial = None
+    for tramo in tramos:
+        senal, parametros = procesar_serie(tramo, opciones, inicial)
+        resultados.append((senal, parametros))
+        if calentar:
+            inicial = parametros
+    return resultados
+
+# ------------------------------------------------------------------------------
+# Función: pesos_fundido
+# Descripción:
+#   Pesos de una ventana para el fundido cruzado: rampa lineal de subida en el
+#   solape con la ventana anterior, rampa de bajada en el solape con la
+#   siguiente y 1 en el resto. Las rampas de dos ventanas vecinas suman 1 en
+#   cada muestra del solape.
+# ------------------------------------------------------------------------------
+def pesos_fundido(longitud, solape, primera, ultima):
+    pesos = np.ones(longitud)
+    rampa = np.arange(1, solape + 1) / (solape + 1)
+    if not primera:
+        pesos[:solape] = rampa
+    if not ultima:
+        pesos[longitud - solape:] = rampa[::-1]
+    return pesos
+
+# ------------------------------------------------------------------------------
+# Función: filtrar_segmentado
+# Descripción:
+#   Filtra una serie larga por ventanas solapadas y une los resultados.
+# Entradas:
+#   - datos: señal completa (puede ser un np.memmap).
+#   - opciones: ver pipeline.procesar_serie.
+#   - longitud: longitud de cada ventana.
+#   - solape: muestras compartidas entre ventanas consecutivas.
+#   - ejecutor: ejecutor opcional (ver genetico.crear_ejecutor) donde procesar
+#     las ventanas en paralelo; con None se procesan en serie.
+#   - calentar: arrancar cada ventana desde los óptimos de la anterior.
+# Salidas:
+#   - Tupla (señal filtrada completa, lista de (inicio, fin, parámetros) por
+#     ventana).
+# Notas:
+#   - A cada proceso solo se le envían las muestras de sus ventanas, y el
+#     costo crece de forma lineal con la longitud de la serie.
+#   - Con calentar, las ventanas se agrupan en tantas cadenas contiguas como
+#     trabajadores tenga el ejecutor; dentro de cada cadena se procesan en orden
+#     y las cadenas corren en paralelo. Sin calentar, cada ventana es una tarea
+#     independiente.
+#   - Con ejecutor, la caché de fitness en disco (opciones["ruta_cache"]) se
+#     abre en modo de solo lectura en cada proceso (ver genetico.CacheFitness).
+# ------------------------------------------------------------------------------
+def filtrar_segmentado(datos, opciones, longitud, solape, ejecutor=None, calentar=False):
+    n = len(datos)
+    ventanas = dividir(n, longitud, solape)
+
+    if calentar:
+        cadenas = contar_trabajadores(ejecutor)
+        grupos = [g for g in np.array_split(np.arange(len(ventanas)), cadenas) if len(g)]
+    else:
+        grupos = [[i] for i in range(len(ventanas))]
+    tareas = [[np.array(datos[ventanas[i][0]:ventanas[i][1]], dtype=float) for i in grupo]
+              for grupo in grupos]
+
+    if ejecutor is None:
+        resultados = (procesar_cadena(tramos, opciones, calentar) for tramos in tareas)
+    else:
+        # Varios procesos no pueden escribir el mismo respaldo de la caché
+        opciones = {**opciones, "cache_solo_lectura": True}
+        medidos = ejecutor.map(llamar_medido, [procesar_cadena] * len(tareas),
+                               [(tramos, opciones, calentar) for tramos in tareas],
+                               [REGISTRO.activo] * len(tareas))
+        resultados = map(recibir_medido, medidos)
+
+    # Unión con fundido cruzado a medida que llegan los resultados (en orden)
+    salida = np.zeros(n)
+    parametros = []
+    i = 0
+    for resultado in resultados:
+        for senal, optimos in resultado:
+            inicio, fin = ventanas[i]
+            salida[inicio:fin] += senal * pesos_fundido(fin - inicio, solape, i == 0,
+                                                        i == len(ventanas) - 1)
+            parametros.append((inicio, fin, optimos))
+            i += 1
+
+    return salida, parametros
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from filtro_kalman import FiltroKalman, FiltroKalmanEstacionario, FiltroKalmanLote
+
+
+def senal(n=2000):
+    rng = np.random.default_rng(0)
+    return np.cumsum(rng.normal(size=n)) + 5.0 * rng.normal(size=n)
+
+
+def test_lote_coincide_con_filtro_por_candidato():
+    datos = senal()
+    Q = np.array([1e-5, 1e-3, 0.1, 1.0])
+    R = np.array([1.0, 0.1, 1e-3, 1e-5])
+    lote = FiltroKalmanLote(datos, Q, R).aplicar()
+    assert lote.shape == (len(Q), len(datos))
+    for fila, q, r in zip(lote, Q, R):
+        np.testing.assert_allclose(fila, FiltroKalman(datos, q, r).aplicar(), rtol=1e-10, atol=1e-10)
+
+
+@pytest.mark.parametrize("Q, R", [(1e-5, 1.0), (0.01, 0.1), (1.0, 1e-5)])
+def test_estacionario_coincide_con_el_exacto(Q, R):
+    datos = senal()
+    filtro = FiltroKalmanEstacionario(datos, Q, R)
+    exacta = FiltroKalman(datos, Q, R).aplicar()
+    np.testing.assert_allclose(filtro.aplicar(), exacta, rtol=0, atol=1e-6 * np.max(np.abs(exacta)))
+    assert filtro.transitorio < len(datos)
+
+
+def test_flujo_coincide_con_aplicar():
+    datos = senal()
+    filtro = FiltroKalman(None, 0.01, 0.1)
+    salida = np.concatenate([filtro.actualizar_bloque(b) for b in np.array_split(datos, 13)]
+                            + [filtro.finalizar()])
+    np.testing.assert_allclose(salida, FiltroKalman(datos, 0.01, 0.1).aplicar(), rtol=1e-12, atol=1e-12)
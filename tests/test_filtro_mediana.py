@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from filtro_mediana import FiltroMediana, FitnessMediana, MedianaMovil
+from genetico import Fidelidad
+from montecarlo import EvaluadorMonteCarlo, EvaluadorSubventanas
+
+
+def senales(n):
+    rng = np.random.default_rng(0)
+    return {
+        "rampa": np.arange(n, dtype=float),
+        "ruido": rng.normal(size=n),
+        "repetidos": rng.integers(0, 5, n).astype(float),
+    }
+
+
+@pytest.mark.parametrize("nombre", ["rampa", "ruido", "repetidos"])
+def test_memoria_acotada_por_la_ventana(nombre):
+    ventana = 7
+    movil = MedianaMovil(ventana)
+    maximo = 0
+    for valor in senales(100_000)[nombre]:
+        movil.agregar(valor)
+        maximo = max(maximo, len(movil.bajos) + len(movil.altos) + len(movil.pendientes))
+    assert maximo <= 4 * ventana + 2
+
+
+@pytest.mark.parametrize("nombre", ["rampa", "ruido", "repetidos"])
+@pytest.mark.parametrize("ventana", [1, 3, 7, 51])
+def test_mediana_movil_coincide_con_la_ventana(nombre, ventana):
+    datos = senales(2000)[nombre]
+    movil = MedianaMovil(ventana)
+    for i, valor in enumerate(datos):
+        movil.agregar(valor)
+        if movil.llena():
+            assert movil.mediana() == np.median(datos[i - ventana + 1:i + 1])
+
+
+@pytest.mark.parametrize("ventana", [3, 9, 101])
+def test_flujo_coincide_con_aplicar(ventana):
+    datos = senales(3000)["ruido"]
+    filtro = FiltroMediana(None, ventana)
+    salida = [filtro.actualizar_bloque(bloque) for bloque in np.array_split(datos, 17)]
+    salida.append(filtro.finalizar())
+    np.testing.assert_array_equal(np.concatenate(salida), FiltroMediana(datos, ventana).aplicar())
+
+
+def test_bordes_conservan_el_nivel_de_la_senal():
+    datos = -10.24 + 0.1 * senales(600)["ruido"]
+    salida = FiltroMediana(datos, 499).aplicar()
+    assert np.all(np.abs(salida + 10.24) < 0.5)
+
+
+@pytest.mark.parametrize("ventana", [3, 51, 301])
+def test_evaluaciones_parciales_usan_las_salidas_de_la_serie_completa(ventana):
+    datos = np.cumsum(senales(6000)["ruido"])
+    fitness = FitnessMediana(datos)
+    completa = FiltroMediana(datos, ventana).aplicar()
+
+    m = fitness.tramo(0.4)
+    assert fitness.parcial([ventana], 0.4) == EvaluadorMonteCarlo(datos[:m]).puntuar(completa[:m])
+
+    sorteo = EvaluadorSubventanas(datos, 0.4, 4, fitness.muestras_subventana, 0)
+    esperado = np.mean([EvaluadorMonteCarlo(datos[a:b]).puntuar(completa[a:b]) for a, b in sorteo.tramos])
+    assert fitness.subventanas([ventana], 0.4, ventanas=4) == pytest.approx(esperado, rel=1e-12)
+    assert Fidelidad(sustituto="ventanas", ventanas=4).muestras(fitness, 0.4) == \
+        sum(b - a for a, b in sorteo.tramos)
+    assert Fidelidad(sustituto="prefijo").muestras(fitness, 0.4) == m
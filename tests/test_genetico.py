@@ -0,0 +1,82 @@
+import numpy as np
+
+from genetico import CacheFitness, RegistroOptimos
+
+
+def discretizar(params):
+    return (int(params[0]),)
+
+
+def test_cache_en_disco_se_reutiliza(tmp_path):
+    datos = np.arange(10.0)
+    cache = CacheFitness(datos, discretizar, "prueba", ruta=str(tmp_path))
+    cache.guardar(cache.clave([3.2]), 1.5)
+    cache.cerrar()
+
+    cache = CacheFitness(datos, discretizar, "prueba", ruta=str(tmp_path))
+    assert cache.obtener(cache.clave([3.9])) == 1.5
+    assert cache.estadisticas() == {"aciertos": 1, "fallos": 0, "aciertos_disco": 1}
+    cache.cerrar()
+
+
+def test_cache_solo_lectura_no_escribe(tmp_path):
+    datos = np.arange(10.0)
+    ausente = CacheFitness(datos, discretizar, "prueba", ruta=str(tmp_path), solo_lectura=True)
+    assert ausente.disco is None
+    ausente.guardar(ausente.clave([1]), 2.0)
+    ausente.cerrar()
+    assert not list(tmp_path.iterdir())
+
+    cache = CacheFitness(datos, discretizar, "prueba", ruta=str(tmp_path))
+    cache.guardar(cache.clave([3]), 1.5)
+    cache.cerrar()
+
+    lectura = CacheFitness(datos, discretizar, "prueba", ruta=str(tmp_path), solo_lectura=True)
+    assert lectura.obtener(lectura.clave([3])) == 1.5
+    lectura.guardar(lectura.clave([4]), 7.0)
+    assert lectura.obtener(lectura.clave([4])) == 7.0  # En memoria
+    lectura.cerrar()
+
+    cache = CacheFitness(datos, discretizar, "prueba", ruta=str(tmp_path))
+    assert cache.obtener(cache.clave([4])) is None
+    cache.cerrar()
+
+
+def test_cache_separa_versiones(tmp_path):
+    datos = np.arange(10.0)
+    cache = CacheFitness(datos, discretizar, "prueba", ruta=str(tmp_path), version=1)
+    cache.guardar(cache.clave([3]), 1.5)
+    cache.cerrar()
+    cache = CacheFitness(datos, discretizar, "prueba", ruta=str(tmp_path), version=2)
+    assert cache.obtener(cache.clave([3])) is None
+    cache.cerrar()
+
+
+def test_registro_optimos(tmp_path):
+    registro = RegistroOptimos(str(tmp_path))
+    datos = np.arange(5.0)
+    assert registro.obtener(datos, "mediana") is None
+    registro.guardar(datos, "mediana", (7,))
+    assert registro.obtener(datos, "mediana") == [7]
+    assert [p.suffix for p in tmp_path.iterdir()] == [".json"]
+
+
+def test_resultados_identicos_con_cualquier_ejecutor():
+    from filtro_arima import FiltroARIMAOptimizado
+    from filtro_kalman import FiltroKalmanOptimizado
+    from filtro_mediana import FiltroMedianaOptimizado
+    from genetico import crear_ejecutor
+
+    rng = np.random.default_rng(0)
+    datos = np.cumsum(rng.normal(size=600)) + rng.normal(size=600)
+    for clase in (FiltroKalmanOptimizado, FiltroMedianaOptimizado, FiltroARIMAOptimizado):
+        referencia = clase(datos, semilla=0)
+        salida = referencia.ejecutar()
+        for tipo in ("hilos", "procesos"):
+            ejecutor = crear_ejecutor(tipo, 2)
+            try:
+                filtro = clase(datos, ejecutor=ejecutor, semilla=0)
+                np.testing.assert_array_equal(filtro.ejecutar(), salida)
+            finally:
+                ejecutor.shutdown()
+            assert filtro.parametros == referencia.parametros
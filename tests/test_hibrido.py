@@ -0,0 +1,35 @@
+import numpy as np
+
+from hibrido import FiltroHibridoFlujo, FitnessHibrido, MezclaPrecalculada, rejilla_simplex
+from filtro_kalman import FiltroKalman
+from filtro_mediana import FiltroMediana
+
+
+def senales(n=800):
+    rng = np.random.default_rng(0)
+    base = np.cumsum(rng.normal(size=n))
+    return [base + rng.normal(size=n), base, np.convolve(base, np.ones(15) / 15, "same")]
+
+
+def test_mezcla_precalculada_coincide_con_la_mezcla_directa():
+    lista = senales()
+    pesos = rejilla_simplex(3, 6)
+    fitness = FitnessHibrido(lista)
+    np.testing.assert_allclose(MezclaPrecalculada(lista).puntuar(pesos),
+                               [fitness(w.copy()) for w in pesos], rtol=1e-9)
+
+
+def test_rejilla_simplex_suma_uno():
+    pesos = rejilla_simplex(3, 20)
+    assert len(pesos) == 231
+    np.testing.assert_allclose(pesos.sum(axis=1), 1.0)
+    assert np.all(pesos >= 0)
+
+
+def test_hibrido_en_flujo_coincide_con_la_mezcla_por_lotes():
+    datos = senales()[0]
+    hibrido = FiltroHibridoFlujo([FiltroKalman(None, 0.01, 0.1), FiltroMediana(None, 9)], [0.6, 0.2])
+    salida = np.concatenate([hibrido.actualizar_bloque(b) for b in np.array_split(datos, 11)]
+                            + [hibrido.finalizar()])
+    lotes = 0.75 * FiltroKalman(datos, 0.01, 0.1).aplicar() + 0.25 * FiltroMediana(datos, 9).aplicar()
+    np.testing.assert_allclose(salida, lotes, rtol=1e-12, atol=1e-12)
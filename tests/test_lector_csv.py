@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lector_csv import cargar_columnas, cargar_csv, iterar_csv, ruta_cache
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    rng = np.random.default_rng(0)
+    ruta = tmp_path / "linea.csv"
+    pd.DataFrame({"t": np.arange(50), "bx": rng.normal(size=50), "by": rng.normal(size=50)}).to_csv(ruta, index=False)
+    return str(ruta)
+
+
+def test_columna_coincide_con_pandas(archivo):
+    tabla = pd.read_csv(archivo)
+    np.testing.assert_array_equal(cargar_csv(archivo, 0, 1, None, cache=False),
+                                  tabla["bx"].to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(cargar_csv(archivo, 0, 2, 20, cache=False),
+                                  tabla["by"].to_numpy(dtype=np.float32)[:20])
+
+
+def test_indices_negativos(archivo):
+    datos = cargar_columnas(archivo, 0, [-1, 1, -3], None, cache=False)
+    tabla = pd.read_csv(archivo)
+    np.testing.assert_array_equal(datos[-1], tabla["by"].to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(datos[-3], tabla["t"].to_numpy(dtype=np.float32))
+    with pytest.raises(IndexError):
+        cargar_csv(archivo, 0, -4, None, cache=False)
+
+
+def test_cache_npy(archivo):
+    primera = cargar_csv(archivo, 0, 1, None)
+    assert os.path.exists(ruta_cache(archivo, 0, 1, None))
+    segunda = cargar_csv(archivo, 0, 1, None)
+    assert isinstance(segunda, np.memmap)
+    np.testing.assert_array_equal(primera, segunda)
+
+
+def test_iterar_csv_coincide_con_cargar(archivo):
+    bloques = list(iterar_csv(archivo, 0, 2, tam_bloque=7))
+    np.testing.assert_array_equal(np.concatenate(bloques), cargar_csv(archivo, 0, 2, None, cache=False))
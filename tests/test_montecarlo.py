@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from montecarlo import EvaluadorMonteCarlo
+
+
+def evaluar_referencia(original, filtrada):
+    # Fórmula con la FFT completa, antes de usar rfft y el espectro en caché
+    espectro_original = np.abs(np.fft.fft(original))
+    espectro_filtrada = np.abs(np.fft.fft(filtrada))
+    espectro_original /= np.sum(espectro_original) + 1e-12
+    espectro_filtrada /= np.sum(espectro_filtrada) + 1e-12
+    pesos = np.linspace(1, 0.1, len(espectro_original))
+    espectro_score = np.sum(pesos * (espectro_original - espectro_filtrada) ** 2)
+    suavidad = np.sum(np.abs(np.diff(filtrada, 2)))
+    hist, _ = np.histogram(filtrada, bins=50, density=True)
+    pk = (hist + 1e-8) / np.sum(hist + 1e-8)
+    ent = -np.sum(pk * np.log(pk))
+    return espectro_score + 0.3 * suavidad + 0.5 * ent + 0.2 / (np.var(filtrada) + 1e-8)
+
+
+@pytest.mark.parametrize("n", [257, 1000])
+def test_puntuar_coincide_con_la_fft_completa(n):
+    rng = np.random.default_rng(n)
+    original = np.cumsum(rng.normal(size=n))
+    evaluador = EvaluadorMonteCarlo(original)
+    for filtrada in (original, original + rng.normal(size=n), np.convolve(original, np.ones(9) / 9, "same")):
+        assert evaluador.puntuar(filtrada) == pytest.approx(evaluar_referencia(original, filtrada), rel=1e-9)
+
+
+def test_puntuar_lote_coincide_con_puntuar():
+    rng = np.random.default_rng(1)
+    original = np.cumsum(rng.normal(size=500))
+    filtradas = original + rng.normal(size=(6, 500))
+    evaluador = EvaluadorMonteCarlo(original)
+    np.testing.assert_allclose(evaluador.puntuar_lote(filtradas),
+                               [evaluador.puntuar(f) for f in filtradas], rtol=1e-12)
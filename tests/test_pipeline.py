@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from lote import filtrar_lote
+from pipeline import aplicar_filtro, optimizar_filtro, procesar_serie
+from resultados import cargar_senales, guardar_senales
+
+
+def senal(n=600, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return (np.cumsum(rng.normal(size=n)) + rng.normal(size=n)).astype(np.float32)
+
+
+@pytest.mark.parametrize("nombre", ["kalman", "mediana", "arima"])
+def test_parametros_guardados_reproducen_la_salida(nombre):
+    datos = senal()
+    senal_optima, reporte, parametros = optimizar_filtro(nombre, datos, {"semilla": 0})
+    guardados = {"parametros": list(parametros)}
+    if reporte and "coeficientes" in reporte:
+        guardados["coeficientes"] = reporte["coeficientes"]
+    aplicada = aplicar_filtro(nombre, datos, {}, guardados)[0]
+    np.testing.assert_allclose(aplicada, senal_optima, rtol=1e-9, atol=1e-9)
+
+
+def test_senales_binarias_ida_y_vuelta(tmp_path):
+    ruta = str(tmp_path / "senales.npy")
+    senales = {"original": senal(), "hibrido": senal(semilla=1).astype(float)}
+    guardar_senales(ruta, senales)
+    leidas = cargar_senales(ruta)
+    assert leidas.dtype.names == ("original", "hibrido")
+    for nombre, valores in senales.items():
+        assert leidas[nombre].dtype == valores.dtype
+        np.testing.assert_array_equal(leidas[nombre], valores)
+
+
+def test_lote_coincide_con_cada_canal(tmp_path):
+    import pandas as pd
+
+    archivos = []
+    for i in range(2):
+        ruta = tmp_path / f"linea{i}.csv"
+        pd.DataFrame({"bx": senal(300, i), "by": senal(300, 10 + i)}).to_csv(ruta, index=False)
+        archivos.append(str(ruta))
+    opciones = {"semilla": 0, "filtros": ("kalman", "mediana")}
+    resultados = filtrar_lote(archivos, [0, 1], 0, None, opciones, cache=False)
+    assert list(resultados) == ["linea0_bx", "linea0_by", "linea1_bx", "linea1_by"]
+    for (canal, (senal_lote, parametros)), (archivo, columna) in zip(
+            resultados.items(), [(a, c) for a in archivos for c in ("bx", "by")]):
+        datos = pd.read_csv(archivo)[columna].to_numpy(dtype=np.float32)
+        esperada, esperados = procesar_serie(datos, opciones)
+        np.testing.assert_array_equal(senal_lote, esperada)
+        assert parametros == esperados
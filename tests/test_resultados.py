@@ -0,0 +1,26 @@
+import pytest
+
+from resultados import parametros_flujo
+
+
+def anterior(pesos, filtros=("kalman", "mediana", "arima")):
+    parametros = {"kalman": [0.01, 0.2], "mediana": [9], "arima": [1, 1, 1]}
+    return {"filtros": {nombre: {"parametros": parametros[nombre]} for nombre in filtros},
+            "hibrido": {"pesos": pesos}}
+
+
+def test_parametros_flujo():
+    valores, descartados = parametros_flujo(anterior([0.2, 0.5, 0.3]))
+    assert valores == {"Q": 0.01, "R": 0.2, "ventana": 9, "pesos": [0.2, 0.5]}
+    assert descartados == ["arima"]
+
+
+def test_parametros_flujo_sin_kalman():
+    valores, descartados = parametros_flujo(anterior([0.4, 0.6], ("mediana", "arima")))
+    assert valores == {"ventana": 9, "pesos": [0.0, 0.4]}
+    assert descartados == ["arima"]
+
+
+def test_parametros_flujo_solo_arima():
+    with pytest.raises(ValueError):
+        parametros_flujo(anterior([0.0, 0.0, 1.0]))
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from segmentos import dividir, pesos_fundido
+
+
+def pesos_unidos(n, longitud, solape):
+    ventanas = dividir(n, longitud, solape)
+    total = np.zeros(n)
+    for i, (inicio, fin) in enumerate(ventanas):
+        total[inicio:fin] += pesos_fundido(fin - inicio, solape, i == 0, i == len(ventanas) - 1)
+    return ventanas, total
+
+
+@pytest.mark.parametrize("n, longitud, solape", [
+    (100, 100, 10), (1000, 100, 0), (1000, 100, 10), (1000, 100, 50), (29, 18, 6),
+    (150000, 100000, 10000), (150000, 100000, 37500), (12345, 1000, 333),
+])
+def test_pesos_suman_uno(n, longitud, solape):
+    ventanas, total = pesos_unidos(n, longitud, solape)
+    assert ventanas[0][0] == 0 and ventanas[-1][1] == n
+    assert all(fin - inicio <= longitud for inicio, fin in ventanas)
+    assert all(b[0] - a[0] == ventanas[1][0] - ventanas[0][0] for a, b in zip(ventanas, ventanas[1:]))
+    np.testing.assert_allclose(total, 1.0)
+
+
+@pytest.mark.parametrize("n, longitud, solape", [
+    (150000, 100000, 60000), (29, 18, 8), (1001, 100, 50), (1000, 100, 100), (1000, 100, -1),
+])
+def test_solape_excesivo_se_rechaza(n, longitud, solape):
+    with pytest.raises(ValueError):
+        dividir(n, longitud, solape)